@@ -435,6 +435,47 @@ class TestStdioTransport:
         # Should not raise
         await transport.disconnect()
 
+    @pytest.mark.asyncio
+    async def test_read_stderr_from_ring_buffer(self):
+        import sys
+
+        transport = StdioTransport(
+            command=sys.executable,
+            args=["-c", "import sys; sys.stderr.write('boot\\n'); sys.stderr.flush(); sys.stdin.read()"],
+        )
+        await transport.connect()
+        try:
+            for _ in range(100):
+                if await transport.read_stderr():
+                    break
+                await asyncio.sleep(0.02)
+            assert await transport.read_stderr() == "boot\n"
+        finally:
+            await transport.disconnect()
+        assert transport._stderr_task is None
+
+    @pytest.mark.asyncio
+    async def test_stderr_survives_overlong_line(self):
+        import sys
+
+        script = (
+            "import sys, time; sys.stderr.write('x' * 100000 + '\\n'); sys.stderr.flush(); "
+            "time.sleep(0.1); sys.stderr.write('after\\n'); sys.stderr.flush(); sys.stdin.read()"
+        )
+        transport = StdioTransport(command=sys.executable, args=["-c", script])
+        await transport.connect()
+        try:
+            for _ in range(200):
+                if (await transport.read_stderr()).endswith("after\n"):
+                    break
+                await asyncio.sleep(0.02)
+            output = await transport.read_stderr()
+            assert output.endswith("after\n")
+            assert output.count("x") == 100000
+            assert not transport._stderr_task.done()
+        finally:
+            await transport.disconnect()
+
     @pytest.mark.asyncio
     async def test_context_manager(self):
         transport = StdioTransport(command="echo")
@@ -501,6 +542,113 @@ class TestMCPClientManager:
             "write": MCPTool(name="write"),
         }
         manager._clients["fs"] = mock_client
+        manager.refresh_server_tools("fs")
         all_tools = manager.get_all_tools()
         assert "fs:read" in all_tools
         assert "fs:write" in all_tools
+
+    @pytest.mark.asyncio
+    async def test_get_all_tools_after_remove(self):
+        manager = MCPClientManager()
+        for name in ("fs", "git"):
+            mock_client = MagicMock(spec=MCPClient)
+            mock_client.tools = {"read": MCPTool(name="read")}
+            mock_client.disconnect = AsyncMock()
+            manager._clients[name] = mock_client
+            manager.refresh_server_tools(name)
+        assert set(manager.get_all_tools()) == {"fs:read", "git:read"}
+        await manager.remove_server("fs")
+        assert set(manager.get_all_tools()) == {"git:read"}
+
+    def test_get_all_tools_read_only_and_refreshable(self):
+        manager = MCPClientManager()
+        mock_client = MagicMock(spec=MCPClient)
+        mock_client.tools = {"read": MCPTool(name="read")}
+        manager._clients["fs"] = mock_client
+        manager.refresh_server_tools("fs")
+
+        with pytest.raises(TypeError):
+            manager.get_all_tools()["fs:other"] = ("fs", MCPTool(name="other"))
+
+        mock_client.tools["write"] = MCPTool(name="write")
+        manager.refresh_server_tools("fs")
+        assert set(manager.get_all_tools()) == {"fs:read", "fs:write"}
+
+
+class TestParseToolResult:
+    """tools/call 响应解析测试"""
+
+    def test_text_fast_path(self):
+        from xiaotie.mcp.client import _parse_tool_result
+
+        result = _parse_tool_result(
+            {"content": [{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]}
+        )
+        assert not result.isError
+        assert all(isinstance(c, TextContent) for c in result.content)
+        assert [c.text for c in result.content] == ["a", "b"]
+
+    def test_empty_content_error(self):
+        from xiaotie.mcp.client import _parse_tool_result
+
+        result = _parse_tool_result({"isError": True})
+        assert result.isError
+        assert result.content == []
+
+    def test_mixed_content_falls_back(self):
+        from xiaotie.mcp.client import _parse_tool_result
+
+        result = _parse_tool_result(
+            {
+                "content": [
+                    {"type": "text", "text": "a"},
+                    {"type": "image", "data": "abc", "mimeType": "image/png"},
+                ]
+            }
+        )
+        assert isinstance(result.content[1], ImageContent)
+
+
+class TestStdioTransportBatching:
+    """Stdio 批量发送测试"""
+
+    def _connected_transport(self):
+        transport = StdioTransport(command="echo")
+        process = MagicMock()
+        process.returncode = None
+        process.stdin.write = MagicMock()
+        process.stdin.drain = AsyncMock()
+        transport._process = process
+        return transport, process
+
+    def test_send_nowait_not_connected(self):
+        transport = StdioTransport(command="echo")
+        with pytest.raises(TransportError, match="未连接"):
+            transport.send_nowait(JSONRPCRequest(id=1, method="test"))
+
+    @pytest.mark.asyncio
+    async def test_send_batch_drains_once(self):
+        transport, process = self._connected_transport()
+        await transport.send_batch(
+            [JSONRPCRequest(id=i, method="test") for i in range(3)]
+        )
+        assert process.stdin.write.call_count == 3
+        process.stdin.drain.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_send_writes_and_drains(self):
+        transport, process = self._connected_transport()
+        await transport.send(JSONRPCNotification(method="notifications/initialized"))
+        data = process.stdin.write.call_args[0][0]
+        assert data.endswith(b"\n")
+        assert json.loads(data)["method"] == "notifications/initialized"
+        process.stdin.drain.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_client_notification_skips_drain(self):
+        transport, process = self._connected_transport()
+        client = MCPClient(command="echo")
+        client._transport = transport
+        await client._send_notification("notifications/initialized")
+        process.stdin.write.assert_called_once()
+        process.stdin.drain.assert_not_awaited()
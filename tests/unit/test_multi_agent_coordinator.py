@@ -6,6 +6,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 import pytest
 
 from xiaotie.multi_agent.coordinator import (
+    AgentCoordinator,
     AgentRole,
     AgentState,
     Task,
@@ -15,6 +16,9 @@ from xiaotie.multi_agent.coordinator import (
     SupervisorAgent,
     MultiAgentSystem,
 )
+from xiaotie.multi_agent.roles import AgentRole as SubAgentRole
+from xiaotie.multi_agent.task_agent import TaskAgent
+from xiaotie.schema import LLMResponse
 
 
 # ---------------------------------------------------------------------------
@@ -238,3 +242,242 @@ class TestMultiAgentSystem:
         with pytest.raises(asyncio.TimeoutError):
             await asyncio.wait_for(system.execute_task(task), timeout=0.5)
         assert system.coordinator is not None
+
+
+# ---------------------------------------------------------------------------
+# AgentCoordinator
+# ---------------------------------------------------------------------------
+
+
+def _make_llm(content="answer"):
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=LLMResponse(content=content))
+    return llm
+
+
+class TestAgentCoordinator:
+    @pytest.mark.asyncio
+    async def test_spawn_agent(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[])
+        result = await coord.spawn_agent("find usages of foo")
+        assert result.success
+        assert result.content == "answer"
+        assert coord.get_task(result.task_id).status == "completed"
+        assert not coord._active_agents
+        # slots 数据类不带实例 __dict__
+        assert not hasattr(result, "__dict__")
+
+    @pytest.mark.asyncio
+    async def test_spawn_agents_parallel_keeps_order(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_concurrent_agents=2)
+        results = await coord.spawn_agents_parallel(
+            [(f"task {i}", SubAgentRole.ANALYZER) for i in range(5)]
+        )
+        assert len(results) == 5
+        assert len({r.task_id for r in results}) == 5
+        assert all(r.success for r in results)
+
+    @pytest.mark.asyncio
+    async def test_plan_cache_hit_skips_llm(self):
+        llm = _make_llm()
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        first = await coord.spawn_agent("Find usages of foo in src")
+        second = await coord.spawn_agent("find usages of foo, in src!")
+        assert llm.chat.await_count == 1
+        assert second.cached
+        assert second.content == first.content
+        assert second.task_id != first.task_id
+
+    @pytest.mark.asyncio
+    async def test_plan_cache_miss_on_dissimilar_prompt(self):
+        llm = _make_llm()
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        await coord.spawn_agent("find usages of foo")
+        await coord.spawn_agent("list all test files")
+        assert llm.chat.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_plan_cache_miss_when_identifier_differs(self):
+        llm = _make_llm()
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        await coord.spawn_agent(
+            "find all usages of the function foo in the src directory and list the files"
+        )
+        result = await coord.spawn_agent(
+            "find all usages of the function bar in the src directory and list the files"
+        )
+        assert llm.chat.await_count == 2
+        assert not result.cached
+
+    @pytest.mark.asyncio
+    async def test_invalidate_cache(self):
+        llm = _make_llm()
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        await coord.spawn_agent("find usages of foo")
+        coord.invalidate_cache()
+        await coord.spawn_agent("find usages of foo")
+        assert llm.chat.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_prompts_share_one_run(self):
+        llm = _make_llm()
+        release = asyncio.Event()
+
+        async def slow_chat(*args, **kwargs):
+            await release.wait()
+            return LLMResponse(content="answer")
+
+        llm.chat = AsyncMock(side_effect=slow_chat)
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        first = asyncio.create_task(coord.spawn_agent("find usages of foo"))
+        second = asyncio.create_task(coord.spawn_agent("Find usages of foo!"))
+        await asyncio.sleep(0)
+        release.set()
+        a, b = await asyncio.gather(first, second)
+        assert llm.chat.await_count == 1
+        assert a.content == b.content == "answer"
+        assert b.cached and b.task_id != a.task_id
+        assert not coord._inflight
+
+    @pytest.mark.asyncio
+    async def test_plan_cache_only_for_task_role(self):
+        llm = _make_llm()
+        coord = AgentCoordinator(llm_client=llm, tools=[])
+        await coord.spawn_agent("run the tests", role=SubAgentRole.TESTER)
+        await coord.spawn_agent("run the tests", role=SubAgentRole.TESTER)
+        assert llm.chat.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_total_tokens_accumulate(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[])
+        fake = MagicMock()
+        fake.token_usage = {"prompt": 3, "completion": 2}
+        fake.success = True
+        with patch.object(TaskAgent, "run", AsyncMock(return_value=fake)):
+            await coord.spawn_agent("one", role=SubAgentRole.ANALYZER)
+            await coord.spawn_agent("two", role=SubAgentRole.ANALYZER)
+        totals = coord.get_total_tokens()
+        assert totals == {"prompt": 6, "completion": 4}
+        totals["prompt"] = 0
+        assert coord.get_total_tokens()["prompt"] == 6
+
+    @pytest.mark.asyncio
+    async def test_task_records_are_bounded(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_tasks=2)
+        results = [
+            await coord.spawn_agent(f"task {i}", role=SubAgentRole.ANALYZER) for i in range(3)
+        ]
+        assert len(coord._tasks) == 2
+        assert coord.get_task(results[0].task_id) is None
+        assert coord.get_task(results[2].task_id).status == "completed"
+
+    def test_tools_prefiltered_per_role(self):
+        tools = []
+        for name in ("read_file", "grep", "bash"):
+            tool = MagicMock()
+            tool.name = name
+            tools.append(tool)
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=tools)
+        task_tools = coord._tools_by_role[SubAgentRole.TASK]
+        assert [t.name for t in task_tools] == ["read_file", "grep"]
+        assert coord._tools_by_role[SubAgentRole.MAIN] is tools
+
+        agent = coord._acquire_agent(SubAgentRole.TASK, coord.roles[SubAgentRole.TASK], "find foo")
+        assert agent.tools is task_tools
+
+    @pytest.mark.asyncio
+    async def test_agents_are_pooled(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_concurrent_agents=1)
+        await coord.spawn_agent("first", role=SubAgentRole.ANALYZER)
+        pooled = coord._agent_pool[SubAgentRole.ANALYZER]
+        assert len(pooled) == 1
+        agent = pooled[0]
+        old_id = agent.id
+
+        await coord.spawn_agent("second", role=SubAgentRole.ANALYZER)
+        assert coord._agent_pool[SubAgentRole.ANALYZER] == [agent]
+        assert agent.id != old_id
+        assert agent.config.prompt == "second"
+
+    @pytest.mark.asyncio
+    async def test_spawn_agents_parallel_captures_errors(self):
+        coord = AgentCoordinator(
+            llm_client=_make_llm(), tools=[], roles={}, max_concurrent_agents=2
+        )
+        results = await coord.spawn_agents_parallel([("a", SubAgentRole.TASK)] * 3)
+        assert [r.success for r in results] == [False, False, False]
+        assert "未知角色" in results[0].error
+
+    @pytest.mark.asyncio
+    async def test_iter_spawn_agents_streams_results(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_concurrent_agents=2)
+        tasks = [(f"task {i}", SubAgentRole.ANALYZER) for i in range(5)]
+        results = [r async for r in coord.iter_spawn_agents(tasks)]
+        assert len(results) == 5
+        assert all(r.success for r in results)
+
+    @pytest.mark.asyncio
+    async def test_iter_spawn_agents_limits_concurrency(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_concurrent_agents=2)
+        running = 0
+        peak = 0
+        original = coord.spawn_agent
+
+        async def tracked(*args, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                running -= 1
+
+        coord.spawn_agent = tracked
+        tasks = [(f"task {i}", SubAgentRole.ANALYZER) for i in range(6)]
+        results = [r async for r in coord.iter_spawn_agents(tasks)]
+        assert len(results) == 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_nested_spawn_inherits_parent_from_context(self):
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[])
+        nested = {}
+
+        async def chat(**kwargs):
+            if "started" not in nested:
+                nested["started"] = True
+                nested["result"] = await coord.spawn_agent("inner", role=SubAgentRole.ANALYZER)
+            return LLMResponse(content="done")
+
+        coord.llm_client.chat = chat
+        outer = await coord.spawn_agent("outer", role=SubAgentRole.ANALYZER)
+
+        assert coord.get_task(outer.task_id).parent_id == "root"
+        inner_task = coord.get_task(nested["result"].task_id)
+        assert inner_task.parent_id == outer.task_id
+
+    @pytest.mark.asyncio
+    async def test_iter_spawn_agents_early_stop_cleans_up(self):
+        release = asyncio.Event()
+
+        async def chat(**kwargs):
+            if "fast" in kwargs["messages"][-1].content:
+                return LLMResponse(content="done")
+            await release.wait()
+            return LLMResponse(content="late")
+
+        coord = AgentCoordinator(llm_client=_make_llm(), tools=[], max_concurrent_agents=3)
+        coord.llm_client.chat = chat
+        tasks = [("fast", SubAgentRole.ANALYZER)] + [
+            (f"slow {i}", SubAgentRole.ANALYZER) for i in range(2)
+        ]
+
+        agen = coord.iter_spawn_agents(tasks)
+        first = await agen.__anext__()
+        await agen.aclose()
+
+        assert first.content == "done"
+        statuses = sorted(t.status for t in coord._tasks.values())
+        assert statuses == ["completed", "failed", "failed"]
+        assert not coord._active_agents
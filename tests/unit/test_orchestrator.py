@@ -7,6 +7,7 @@ import asyncio
 from unittest.mock import Mock, AsyncMock
 
 from xiaotie.orchestrator import (
+    AgentCache,
     Step,
     StepResult,
     StepStatus,
@@ -49,6 +50,15 @@ async def counter_agent(input_data):
     return len(str(input_data))
 
 
+class TaggedStep(Step):
+    """重写 execute 的步骤 (验证工作流统一经过 execute)"""
+
+    async def execute(self, input_data, context=None):
+        result = await super().execute(input_data, context)
+        result.metadata["tagged"] = True
+        return result
+
+
 class TestStepResult:
     """测试步骤结果"""
 
@@ -105,6 +115,33 @@ class TestWorkflowResult:
         assert result.get_step("step2") is step2
         assert result.get_step("step3") is None
 
+    def test_get_step_after_steps_change(self):
+        """测试步骤变化后索引重建，同名步骤返回第一个"""
+        first = StepResult(name="dup", status=StepStatus.FAILED)
+        result = WorkflowResult(success=True, steps=[first])
+        assert result.get_step("dup") is first
+
+        extra = StepResult(name="extra", status=StepStatus.COMPLETED)
+        result.steps.extend([StepResult(name="dup", status=StepStatus.COMPLETED), extra])
+        assert result.get_step("dup") is first
+        assert result.get_step("extra") is extra
+
+    def test_get_step_after_in_place_replacement(self):
+        """测试步骤数量不变但被原地替换时不返回错误的步骤"""
+        a = StepResult(name="a", status=StepStatus.COMPLETED)
+        b = StepResult(name="b", status=StepStatus.COMPLETED)
+        result = WorkflowResult(success=True, steps=[a, b])
+        assert result.get_step("a") is a
+
+        result.steps.reverse()
+        assert result.get_step("a") is a
+        assert result.get_step("b") is b
+
+        c = StepResult(name="c", status=StepStatus.COMPLETED)
+        result.steps[0] = c
+        assert result.get_step("c") is c
+        assert result.get_step("b") is None
+
 
 class TestStep:
     """测试步骤"""
@@ -188,6 +225,83 @@ class TestStep:
         assert result.metadata.get("fallback") is True
 
 
+    @pytest.mark.asyncio
+    async def test_execute_with_cache(self):
+        """测试相同输入命中缓存"""
+        agent = AsyncMock(return_value="result")
+        cache = AgentCache()
+        step = Step(name="cached", agent=agent, cache=cache)
+
+        first = await step.execute({"q": "hello", "n": 1})
+        second = await step.execute({"n": 1, "q": "hello"})
+        third = await step.execute({"q": "world", "n": 1})
+
+        assert agent.await_count == 2
+        assert second.output == "result"
+        assert second.metadata == {"cache": "hit"}
+        assert "cache" not in first.metadata
+        assert "cache" not in third.metadata
+
+        cache.clear()
+        await step.execute({"q": "hello", "n": 1})
+        assert agent.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_cache_does_not_store_failures(self):
+        """测试失败结果不写入缓存"""
+        cache = AgentCache()
+        step = Step(name="error", agent=error_agent, cache=cache)
+        result = await step.execute("hello")
+
+        assert result.status == StepStatus.FAILED
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_shared_cache_applies_each_transform(self):
+        """测试共享缓存保存原始输出，各步骤分别转换"""
+        agent = AsyncMock(return_value="result")
+        cache = AgentCache()
+        upper = Step(name="upper", agent=agent, cache=cache, transform_output=str.upper)
+        plain = Step(name="plain", agent=agent, cache=cache)
+
+        first = await upper.execute("hello")
+        second = await plain.execute("hello")
+        third = await upper.execute("hello")
+
+        assert agent.await_count == 1
+        assert first.output == "RESULT"
+        assert second.output == "result"
+        assert third.output == "RESULT"
+
+    @pytest.mark.asyncio
+    async def test_cache_skips_unhashable_agent(self):
+        """测试不可哈希的 agent 不缓存但正常执行"""
+
+        class UnhashableAgent:
+            __hash__ = None
+
+            async def __call__(self, input_data):
+                return input_data
+
+        cache = AgentCache()
+        step = Step(name="unhashable", agent=UnhashableAgent(), cache=cache)
+        result = await step.execute("hello")
+
+        assert result.status == StepStatus.COMPLETED
+        assert result.output == "hello"
+        assert len(cache) == 0
+
+    def test_cache_lru_eviction(self):
+        """测试缓存按 LRU 淘汰"""
+        cache = AgentCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b", None) is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
 class TestPipeline:
     """测试管道"""
 
@@ -244,6 +358,40 @@ class TestPipeline:
         assert callbacks == ["echo", "upper"]
 
 
+    @pytest.mark.asyncio
+    async def test_pipeline_skipped_step(self):
+        """测试跳过的步骤不调用 agent 且不影响后续输入"""
+        skipped_agent = AsyncMock()
+        p = Pipeline([
+            ("echo", echo_agent),
+            ("skip", skipped_agent, {"condition": lambda x: False}),
+            ("upper", upper_agent),
+        ])
+        result = await p.run("hello")
+
+        skipped_agent.assert_not_called()
+        assert result.get_step("skip").status == StepStatus.SKIPPED
+        assert result.final_output == "ECHO: HELLO"
+
+
+    @pytest.mark.asyncio
+    async def test_pipeline_all_skipped_has_no_output(self):
+        """测试全部步骤跳过时没有最终输出"""
+        p = Pipeline([("echo", echo_agent, {"condition": lambda x: False})])
+        result = await p.run("hello")
+
+        assert result.success is True
+        assert result.final_output is None
+
+    @pytest.mark.asyncio
+    async def test_pipeline_uses_step_execute(self):
+        """测试管道调用步骤的 execute (子类重写生效)"""
+        p = Pipeline([TaggedStep("echo", echo_agent), TaggedStep("upper", upper_agent)])
+        result = await p.run("hello")
+
+        assert result.final_output == "ECHO: HELLO"
+        assert all(step.metadata.get("tagged") for step in result.steps)
+
 class TestParallel:
     """测试并行执行"""
 
@@ -286,6 +434,53 @@ class TestParallel:
         result = await p.run("hello")
         assert result.success is True
 
+    def test_parallel_rejects_invalid_step(self):
+        """测试无效步骤类型报错而不是被静默丢弃"""
+        with pytest.raises(ValueError):
+            Parallel([("echo", echo_agent), "not a step"])
+
+    @pytest.mark.asyncio
+    async def test_parallel_semaphore_reused_and_limits(self):
+        """测试并发信号量跨多次运行复用且限制并发"""
+        running = 0
+        peak = 0
+
+        async def tracked_agent(x):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return x
+
+        p = Parallel([(f"s{i}", tracked_agent) for i in range(5)], max_concurrency=2)
+        await p.run("a")
+        semaphore = p._semaphore
+        await p.run("b")
+
+        assert p._semaphore is semaphore
+        assert peak == 2
+
+    def test_parallel_reused_across_event_loops(self):
+        """测试同一 Parallel 可在不同事件循环中运行"""
+        p = Parallel([("echo", echo_agent)], max_concurrency=1)
+        assert asyncio.run(p.run("a")).success is True
+        assert asyncio.run(p.run("b")).success is True
+
+    @pytest.mark.asyncio
+    async def test_parallel_step_raising_does_not_cancel_others(self):
+        """测试单个步骤抛出异常时其余步骤仍完成"""
+        broken = Step(name="broken", agent=echo_agent)
+        broken.execute = AsyncMock(side_effect=RuntimeError("boom"))
+        p = Parallel([broken, ("slow", slow_agent)])
+
+        result = await p.run("hello")
+
+        assert result.success is False
+        assert result.get_step("broken").status == StepStatus.FAILED
+        assert result.get_step("broken").error == "boom"
+        assert result.final_output == {"slow": "slow: hello"}
+
 
 class TestRouter:
     """测试路由"""
@@ -329,6 +524,37 @@ class TestRouter:
         assert "No matching route" in result.error
 
 
+    @pytest.mark.asyncio
+    async def test_key_router(self):
+        """测试键路由"""
+        key_fn = Mock(side_effect=lambda x: x["kind"])
+        r = Router(
+            {"echo": ("echo", echo_agent), "upper": ("upper", upper_agent)},
+            key=key_fn,
+            default=("count", counter_agent),
+        )
+
+        result = await r.run({"kind": "upper"})
+        assert result.steps[0].name == "upper"
+        assert key_fn.call_count == 1
+
+        result = await r.run({"kind": "other"})
+        assert result.steps[0].name == "count"
+
+    def test_key_router_requires_dict(self):
+        """测试键路由必须使用字典"""
+        with pytest.raises(ValueError):
+            Router([(lambda x: True, ("echo", echo_agent))], key=lambda x: x)
+
+    @pytest.mark.asyncio
+    async def test_router_uses_step_execute(self):
+        """测试路由调用步骤的 execute (子类重写生效)"""
+        r = Router([(lambda x: True, TaggedStep("echo", echo_agent))])
+        result = await r.run("hello")
+
+        assert result.final_output == "echo: hello"
+        assert result.steps[0].metadata.get("tagged") is True
+
 class TestOrchestrator:
     """测试编排器"""
 
@@ -364,6 +590,55 @@ class TestOrchestrator:
         assert result.success is True
         assert result.final_output == "ECHO: HELLO"
 
+    @pytest.mark.asyncio
+    async def test_run_sequence_speculative(self):
+        """测试提前启动不依赖上游输出的工作流"""
+        lookup_started = asyncio.Event()
+
+        async def first_agent(x):
+            # 只有下一个工作流被提前启动时才能等到事件
+            await asyncio.wait_for(lookup_started.wait(), timeout=1)
+            return "first"
+
+        async def lookup_agent(x):
+            lookup_started.set()
+            return f"lookup: {x}"
+
+        orch = Orchestrator()
+        orch.register("first", Pipeline([("first", first_agent)]))
+        orch.register("lookup", Pipeline([("lookup", lookup_agent)]), needs_previous_output=False)
+        orch.register("upper", Pipeline([("upper", upper_agent)]))
+
+        result = await orch.run_sequence(["first", "lookup", "upper"], "session", speculative=True)
+
+        assert result.success is True
+        assert result.final_output == "LOOKUP: SESSION"
+
+    @pytest.mark.asyncio
+    async def test_run_sequence_cancels_prefetch_on_failure(self):
+        """测试前序失败时取消预启动的工作流"""
+        cancelled = []
+
+        async def blocking_agent(x):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(x)
+                raise
+
+        async def failing_after_start(x):
+            await asyncio.sleep(0)
+            raise ValueError("late")
+
+        orch = Orchestrator()
+        orch.register("broken", Pipeline([("broken", failing_after_start)]))
+        orch.register("block", Pipeline([("block", blocking_agent)]), needs_previous_output=False)
+        result = await orch.run_sequence(["broken", "block"], "x", speculative=True)
+
+        assert result.success is False
+        assert cancelled == ["x"]
+        assert [s.name for s in result.steps] == ["broken"]
+
     @pytest.mark.asyncio
     async def test_run_parallel(self):
         """测试并行执行"""
@@ -376,6 +651,106 @@ class TestOrchestrator:
         assert "echo" in result.final_output
         assert "upper" in result.final_output
 
+    @pytest.mark.asyncio
+    async def test_configure_loop(self):
+        """测试启用 eager 任务工厂"""
+        loop = asyncio.get_running_loop()
+        old_factory = loop.get_task_factory()
+        try:
+            enabled = Orchestrator.configure_loop()
+            assert enabled is hasattr(asyncio, "eager_task_factory")
+            if enabled:
+                assert loop.get_task_factory() is asyncio.eager_task_factory
+        finally:
+            loop.set_task_factory(old_factory)
+
+    def test_install_uvloop(self, monkeypatch):
+        """测试安装 uvloop 事件循环策略"""
+        import sys
+        import types
+
+        fake_uvloop = types.ModuleType("uvloop")
+        fake_uvloop.EventLoopPolicy = Mock(return_value="policy")
+        set_policy = Mock()
+        monkeypatch.setitem(sys.modules, "uvloop", fake_uvloop)
+        monkeypatch.setattr(asyncio, "set_event_loop_policy", set_policy)
+
+        assert Orchestrator.install_uvloop() is True
+        set_policy.assert_called_once_with("policy")
+
+    def test_install_uvloop_unavailable(self, monkeypatch):
+        """测试未安装 uvloop 时静默跳过"""
+        import sys
+
+        monkeypatch.setitem(sys.modules, "uvloop", None)
+        assert Orchestrator.install_uvloop() is False
+
+    @pytest.mark.asyncio
+    async def test_run_parallel_with_concurrency_window(self):
+        """测试滑动窗口限制并发且结果按名称顺序合并"""
+        running = 0
+        peak = 0
+
+        async def tracked_agent(x):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return x
+
+        orch = Orchestrator()
+        names = [f"wf{i}" for i in range(5)]
+        for name in names:
+            orch.register(name, Pipeline([(name, tracked_agent)]))
+        orch.register("broken", Pipeline([("broken", error_agent)]))
+
+        result = await orch.run_parallel(names + ["broken"], "x", max_concurrency=2)
+
+        assert peak == 2
+        assert result.success is False
+        assert [s.name for s in result.steps] == names + ["broken"]
+        assert set(result.final_output) == set(names)
+
+    @pytest.mark.asyncio
+    async def test_run_parallel_cancel_cleans_up(self):
+        """测试取消 run_parallel 时等待子工作流结束"""
+        started = asyncio.Event()
+        cancelled = []
+
+        async def blocking_agent(x):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(x)
+                raise
+
+        orch = Orchestrator()
+        orch.register("block", Pipeline([("block", blocking_agent)]))
+        task = asyncio.create_task(orch.run_parallel(["block"], "x"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert cancelled == ["x"]
+
+    @pytest.mark.asyncio
+    async def test_run_parallel_cancelled_workflow_fails(self):
+        """测试单个工作流被取消时记为失败，其他工作流结果保留"""
+
+        async def cancelled_agent(x):
+            raise asyncio.CancelledError()
+
+        orch = Orchestrator()
+        orch.register("echo", Pipeline([("echo", echo_agent)]))
+        orch.register("cancelled", Pipeline([("cancelled", cancelled_agent)]))
+
+        result = await orch.run_parallel(["echo", "cancelled"], "x")
+
+        assert result.success is False
+        assert result.final_output == {"echo": "echo: x"}
+
     @pytest.mark.asyncio
     async def test_context(self):
         """测试上下文"""
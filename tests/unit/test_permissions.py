@@ -1,5 +1,7 @@
 """权限系统测试"""
 
+from unittest.mock import Mock
+
 import pytest
 
 from xiaotie.permissions import (
@@ -56,6 +58,39 @@ class TestPermissionManagerRisk:
         level = pm._get_risk_level("bash", {"command": "git status"})
         assert level == RiskLevel.LOW
 
+    def test_safe_patterns_anchored_after_fusion(self):
+        pm = PermissionManager()
+        # ^pwd$ 合并进交替正则后仍只匹配整条命令
+        assert pm._get_risk_level("bash", {"command": "pwd"}) == RiskLevel.LOW
+        assert pm._get_risk_level("bash", {"command": "pwd && make"}) == RiskLevel.HIGH
+
+    def test_custom_deny_patterns(self):
+        pm = PermissionManager(deny_patterns=[r"make\s+clean", r"shutdown"])
+        level = pm._get_risk_level("bash", {"command": "SHUTDOWN now"})
+        assert level == RiskLevel.CRITICAL
+        level = pm._get_risk_level("bash", {"command": "rm -rf build"})
+        assert level == RiskLevel.HIGH
+
+    def test_patterns_changed_after_init_apply(self):
+        pm = PermissionManager()
+        # 默认 deny_patterns 就是 DANGEROUS_PATTERNS，原地修改全局列表同样生效
+        DANGEROUS_PATTERNS.append(r"shutdown")
+        try:
+            assert pm._get_risk_level("bash", {"command": "shutdown now"}) == RiskLevel.CRITICAL
+        finally:
+            DANGEROUS_PATTERNS.remove(r"shutdown")
+        assert pm._get_risk_level("bash", {"command": "shutdown now"}) == RiskLevel.HIGH
+
+        pm.auto_approve_patterns = [r"^make\s"]
+        assert pm._get_risk_level("bash", {"command": "make build"}) == RiskLevel.LOW
+
+    def test_unfusable_patterns_fall_back(self):
+        pm = PermissionManager(deny_patterns=[r"(\w+)\s+\1", r"(?i)halt", r"shutdown"])
+        assert pm._get_risk_level("bash", {"command": "rm rm"}) == RiskLevel.CRITICAL
+        assert pm._get_risk_level("bash", {"command": "rm -f x"}) == RiskLevel.HIGH
+        assert pm._get_risk_level("bash", {"command": "HALT"}) == RiskLevel.CRITICAL
+        assert pm._get_risk_level("bash", {"command": "shutdown"}) == RiskLevel.CRITICAL
+
     def test_unknown_tool_defaults_medium(self):
         pm = PermissionManager()
         level = pm._get_risk_level("unknown_tool", {})
@@ -101,11 +136,70 @@ class TestPermissionCheck:
         assert allowed is True
         assert "白名单" in reason
 
+    async def test_whitelist_skips_request_formatting(self, monkeypatch):
+        pm = PermissionManager()
+        pm.add_to_whitelist("write_file")
+        fmt = Mock(side_effect=AssertionError("should not format"))
+        monkeypatch.setattr(pm, "_format_request_description", fmt)
+        allowed, _ = await pm.check_permission("write_file", {"path": "c.txt"})
+        assert allowed is True
+
     async def test_permanent_whitelist(self):
         pm = PermissionManager()
         pm.add_to_whitelist("bash", permanent=True)
         assert "bash" in pm._permanent_whitelist
 
+    async def test_whitelist_pattern_case_insensitive(self):
+        pm = PermissionManager(interactive=False)
+        assert pm._is_whitelisted("bash", {"command": "make build"}) is False
+        pm.add_to_whitelist(r"^make\s")
+        assert pm._is_whitelisted("bash", {"command": "MAKE build"}) is True
+
+    async def test_whitelist_regex_rebuilt_only_after_change(self, monkeypatch):
+        import xiaotie.permissions as permissions
+
+        calls = []
+        fuse = permissions._fuse_patterns
+        monkeypatch.setattr(
+            permissions, "_fuse_patterns", lambda p: calls.append(1) or fuse(p)
+        )
+        pm = PermissionManager(interactive=False)
+        pm.add_to_whitelist("ls", permanent=True)
+        pm.add_to_whitelist("pwd")
+        for _ in range(3):
+            assert pm._is_whitelisted("bash", {"command": "pwd"}) is True
+        assert len(calls) == 1
+
+    async def test_settings_changed_after_init_apply(self):
+        pm = PermissionManager(auto_approve_low_risk=False, interactive=False)
+        allowed, reason = await pm.check_permission("read_file", {"path": "a"})
+        assert allowed is True
+        assert reason == "非交互模式自动批准"
+
+        pm.auto_approve_low_risk = True
+        allowed, reason = await pm.check_permission("read_file", {"path": "a"})
+        assert reason == "低风险自动批准"
+
+    async def test_non_bool_settings(self):
+        pm = PermissionManager(interactive=False)
+        pm.auto_approve_low_risk = None
+        pm.interactive = 0
+        allowed, reason = await pm.check_permission("read_file", {"path": "a"})
+        assert allowed is True
+        assert reason == "非交互模式自动批准"
+
+        pm.auto_approve_low_risk = 1
+        allowed, reason = await pm.check_permission("read_file", {"path": "a"})
+        assert reason == "低风险自动批准"
+
+    async def test_high_risk_single_confirm(self):
+        pm = PermissionManager(require_double_confirm_high_risk=False)
+        calls = []
+        pm.set_approval_callback(lambda req: calls.append(req) or True)
+        allowed, _ = await pm.check_permission("bash", {"command": "python x.py"})
+        assert allowed is True
+        assert len(calls) == 1
+
     async def test_custom_callback(self):
         pm = PermissionManager()
         pm.set_approval_callback(lambda req: True)
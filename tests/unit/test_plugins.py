@@ -0,0 +1,227 @@
+"""插件系统单元测试"""
+
+import os
+import sys
+
+import pytest
+
+from xiaotie.plugins import LazyToolProxy, PluginManager
+
+PLUGIN_SOURCE = '''
+from xiaotie.tools import Tool, ToolResult
+
+IMPORTED = True
+
+
+class EchoTool(Tool):
+    @property
+    def name(self) -> str:
+        return "echo_plugin"
+
+    @property
+    def description(self) -> str:
+        """描述"""
+        return "回显输入"
+
+    @property
+    def parameters(self) -> dict:
+        return {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, text: str) -> ToolResult:
+        return ToolResult(success=True, content=text)
+'''
+
+DYNAMIC_SOURCE = """
+from xiaotie.tools import Tool, ToolResult
+
+PREFIX = "dyn"
+
+
+class DynamicTool(Tool):
+    @property
+    def name(self) -> str:
+        return f"{PREFIX}_tool"
+
+    @property
+    def description(self) -> str:
+        return "动态名称"
+
+    @property
+    def parameters(self) -> dict:
+        return {"type": "object", "properties": {}}
+
+    async def execute(self) -> ToolResult:
+        return ToolResult(success=True, content="ok")
+"""
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    yield tmp_path
+    for name in [m for m in sys.modules if m.startswith("xiaotie_plugin_")]:
+        del sys.modules[name]
+
+
+class TestLazyPluginLoading:
+    def test_static_metadata_does_not_import(self, plugin_dir):
+        (plugin_dir / "echo.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+
+        tools = manager.load_all_plugins()
+
+        assert len(tools) == 1
+        tool = tools[0]
+        assert isinstance(tool, LazyToolProxy)
+        assert tool.name == "echo_plugin"
+        assert tool.description == "回显输入"
+        assert tool.parameters["properties"]["text"]["type"] == "string"
+        assert not tool.is_loaded
+        assert "xiaotie_plugin_echo" not in sys.modules
+
+    @pytest.mark.asyncio
+    async def test_first_execute_imports_module(self, plugin_dir):
+        (plugin_dir / "echo.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+        tool = manager.load_all_plugins()[0]
+
+        result = await tool.execute(text="hi")
+
+        assert result.success
+        assert result.content == "hi"
+        assert tool.is_loaded
+        assert sys.modules["xiaotie_plugin_echo"].IMPORTED is True
+
+    def test_dynamic_metadata_falls_back_to_eager(self, plugin_dir):
+        (plugin_dir / "dynamic.py").write_text(DYNAMIC_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+
+        tools = manager.load_all_plugins()
+
+        assert [t.name for t in tools] == ["dyn_tool"]
+        assert not isinstance(tools[0], LazyToolProxy)
+
+    def test_eager_load_only_instantiates_module_tools(self, plugin_dir):
+        source = DYNAMIC_SOURCE.replace(
+            "from xiaotie.tools import Tool, ToolResult",
+            "from xiaotie.tools import ReadTool, Tool, ToolResult",
+        )
+        (plugin_dir / "dynamic.py").write_text(source, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+
+        tools = manager.load_all_plugins()
+
+        assert [t.name for t in tools] == ["dyn_tool"]
+
+    def test_local_tool_subclass_falls_back_to_eager(self, plugin_dir):
+        source = (
+            PLUGIN_SOURCE
+            + """
+
+class LoudEchoTool(EchoTool):
+    @property
+    def name(self) -> str:
+        return "loud_echo"
+"""
+        )
+        (plugin_dir / "echo.py").write_text(source, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+
+        tools = manager.load_all_plugins()
+
+        assert [t.name for t in tools] == ["echo_plugin", "loud_echo"]
+        assert not any(isinstance(t, LazyToolProxy) for t in tools)
+
+    def test_toml_manifest(self, plugin_dir):
+        pytest.importorskip("tomllib")
+        (plugin_dir / "dynamic.py").write_text(DYNAMIC_SOURCE, encoding="utf-8")
+        (plugin_dir / "dynamic.toml").write_text(
+            '[[tools]]\nclass = "DynamicTool"\nname = "dyn_tool"\ndescription = "清单描述"\n',
+            encoding="utf-8",
+        )
+        manager = PluginManager([plugin_dir])
+
+        tools = manager.load_all_plugins()
+
+        assert isinstance(tools[0], LazyToolProxy)
+        assert tools[0].description == "清单描述"
+        assert "xiaotie_plugin_dynamic" not in sys.modules
+        assert tools[0].resolve().name == "dyn_tool"
+
+    def test_template_plugin_is_lazy(self, plugin_dir):
+        manager = PluginManager([plugin_dir])
+        manager.create_plugin_template("my_tool", plugin_dir)
+
+        tools = manager.load_all_plugins()
+
+        assert isinstance(tools[0], LazyToolProxy)
+        assert tools[0].name == "my_tool"
+
+
+class TestPluginMessages:
+    def test_load_all_writes_messages_once(self, plugin_dir, monkeypatch):
+        (plugin_dir / "echo.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        (plugin_dir / "dynamic.py").write_text(DYNAMIC_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+        calls = []
+        monkeypatch.setattr("builtins.print", lambda *args, **kwargs: calls.append(args))
+
+        manager.load_all_plugins()
+
+        assert len(calls) == 1
+        lines = calls[0][0].splitlines()
+        assert lines[0] == "📦 发现 2 个插件..."
+        assert sorted(lines[1:]) == ["  ✓ 加载工具: dyn_tool", "  ✓ 注册工具: echo_plugin"]
+
+
+class TestPluginReload:
+    def test_unchanged_plugin_is_not_reparsed(self, plugin_dir, monkeypatch):
+        (plugin_dir / "echo.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+        first = manager.load_all_plugins()
+
+        monkeypatch.setattr(manager, "read_manifests", lambda path: pytest.fail("should use cache"))
+        assert manager.load_all_plugins() == first
+
+    def test_reload_picks_up_changes(self, plugin_dir):
+        plugin_path = plugin_dir / "echo.py"
+        plugin_path.write_text(PLUGIN_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+        manager.load_all_plugins()
+
+        plugin_path.write_text(PLUGIN_SOURCE.replace("回显输入", "新描述"), encoding="utf-8")
+        assert manager.reload_plugin("echo") is True
+        assert manager.get_loaded_tools()["echo_plugin"].description == "新描述"
+
+    @pytest.mark.asyncio
+    async def test_modified_plugin_runs_new_code(self, plugin_dir):
+        plugin_path = plugin_dir / "echo.py"
+        plugin_path.write_text(PLUGIN_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+        tool = manager.load_all_plugins()[0]
+        assert (await tool.execute(text="hi")).content == "hi"
+
+        source = PLUGIN_SOURCE.replace('"echo_plugin"', '"echo_v2"').replace(
+            "content=text", "content=text.upper()"
+        )
+        plugin_path.write_text(source, encoding="utf-8")
+        stat = plugin_path.stat()
+        os.utime(plugin_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        tools = manager.load_all_plugins()
+
+        assert [t.name for t in tools] == ["echo_v2"]
+        assert list(manager.get_loaded_tools()) == ["echo_v2"]
+        assert (await tools[0].execute(text="hi")).content == "HI"
+
+    def test_import_does_not_retain_tool_classes(self, plugin_dir):
+        from xiaotie.tools import Tool
+
+        (plugin_dir / "dynamic.py").write_text(DYNAMIC_SOURCE, encoding="utf-8")
+        manager = PluginManager([plugin_dir])
+
+        manager.load_all_plugins()
+
+        assert Tool._collector is None
+        assert [c.__name__ for c in manager._module_tool_classes["xiaotie_plugin_dynamic"]] == [
+            "DynamicTool"
+        ]
@@ -85,6 +85,18 @@ class TestProfileManager:
         loaded = manager.load_profile("cached")
         assert loaded.name == "cached"
 
+    def test_load_reparses_modified_file(self, manager, profiles_dir):
+        manager.save_profile(ProfileConfig(name="edited", description="old"))
+        assert manager.load_profile("edited").description == "old"
+
+        path = os.path.join(profiles_dir, "edited.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("description: new\n")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert manager.load_profile("edited").description == "new"
+
     def test_load_nonexistent_raises(self, manager):
         with pytest.raises(FileNotFoundError, match="Profile"):
             manager.load_profile("nonexistent")
@@ -182,6 +194,16 @@ class TestEnvExpansion:
         finally:
             del os.environ["XIAOTIE_NESTED"]
 
+    def test_no_refs_returns_same_dict(self, manager):
+        data = {"model": "gpt-4", "env": {"A": "1"}, "enabled_tools": ["${NOT_EXPANDED}"]}
+        assert manager._expand_env_vars(data) is data
+
+    def test_expand_does_not_mutate_input(self, manager):
+        data = {"outer": {"inner": "${MISSING_VAR_XYZ}"}, "model": "gpt-4"}
+        result = manager._expand_env_vars(data)
+        assert result == {"outer": {"inner": ""}, "model": "gpt-4"}
+        assert data["outer"]["inner"] == "${MISSING_VAR_XYZ}"
+
 
 # ---------------------------------------------------------------------------
 # Merge with config
@@ -205,6 +227,17 @@ class TestMergeWithConfig:
         base = ProfileConfig(name="base", env={"A": "1"})
         merged = manager.merge_with_config(base, {"env": {"B": "2"}})
         assert merged.env == {"A": "1", "B": "2"}
+        assert base.env == {"A": "1"}
+
+    def test_merge_ignores_unknown_and_identity_keys(self, manager):
+        base = ProfileConfig(name="base", description="desc")
+        merged = manager.merge_with_config(
+            base, {"name": "other", "description": "x", "unknown": 1, "lint_cmd": "ruff"}
+        )
+        assert merged.name == "base"
+        assert merged.description == "desc"
+        assert merged.lint_cmd == "ruff"
+        assert merged is not base
 
 
 # ---------------------------------------------------------------------------
@@ -103,6 +103,12 @@ class TestShouldIgnore:
         rm = RepoMap(str(sample_workspace))
         assert not rm._should_ignore(Path(".gitignore"))
 
+    def test_custom_wildcard_patterns(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace), ignore_patterns={"build", "*.gen.ts"})
+        assert rm._should_ignore(Path("build"))
+        assert rm._should_ignore(Path("api.gen.ts"))
+        assert not rm._should_ignore(Path("api.ts"))
+
 
 class TestIsCodeFile:
     def test_python_is_code(self, sample_workspace):
@@ -137,13 +143,31 @@ class TestExtractPythonDefinitions:
 
     def test_extract_method(self, sample_workspace):
         rm = RepoMap(str(sample_workspace))
-        # The regex uses ^def (MULTILINE) so indented methods won't match.
-        # Only the class-level scan picks up methods via the indent check,
-        # but the func_pattern requires ^ so indented def lines are skipped.
-        # Verify class A is extracted instead.
         content = "class A:\n    def method(self):\n        pass\n"
         defs = rm._extract_python_definitions(content, "test.py")
         assert any(d.name == "A" and d.kind == "class" for d in defs)
+        method = next(d for d in defs if d.name == "method")
+        assert method.kind == "method"
+        assert method.line_number == 2
+
+    def test_nested_closure_not_extracted(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        content = "def outer():\n    def inner():\n        pass\n    return inner\n"
+        defs = rm._extract_python_definitions(content, "test.py")
+        assert [(d.name, d.kind) for d in defs] == [("outer", "function")]
+
+    def test_signature(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        content = "@decorator\ndef bar(x: int) -> int:\n    return x\n"
+        defs = rm._extract_python_definitions(content, "test.py")
+        assert defs[0].signature == "def bar(x: int) -> int"
+        assert defs[0].line_number == 2
+
+    def test_syntax_error_falls_back_to_regex(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        content = "class Foo:\n    pass\n\ndef broken(:\n"
+        defs = rm._extract_python_definitions(content, "test.py")
+        assert any(d.name == "Foo" and d.kind == "class" for d in defs)
 
     def test_extract_async_function(self, sample_workspace):
         rm = RepoMap(str(sample_workspace))
@@ -178,6 +202,23 @@ class TestExtractJsDefinitions:
         defs = rm._extract_js_definitions(content, "app.js")
         assert any(d.name == "handler" for d in defs)
 
+    def test_definitions_in_source_order(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        content = (
+            "const a = function () {}\n"
+            "export class B {\n"
+            "}\n"
+            "async function c() {}\n"
+            "const d = (x) => x\n"
+        )
+        defs = rm._extract_js_definitions(content, "app.js")
+        assert [(d.name, d.kind, d.line_number) for d in defs] == [
+            ("a", "function", 1),
+            ("B", "class", 2),
+            ("c", "function", 4),
+            ("d", "function", 5),
+        ]
+
 
 class TestScanFiles:
     def test_scans_code_files(self, sample_workspace):
@@ -185,6 +226,10 @@ class TestScanFiles:
         files = rm.scan_files()
         paths = [f.relative_path for f in files]
         assert "main.py" in paths
+        # slots 数据类不带实例 __dict__
+        main = next(f for f in files if f.relative_path == "main.py")
+        assert not hasattr(main, "__dict__")
+        assert not hasattr(main.definitions[0], "__dict__")
 
     def test_ignores_pycache(self, sample_workspace):
         rm = RepoMap(str(sample_workspace))
@@ -211,6 +256,26 @@ class TestScanFiles:
         main = next(f for f in files if f.relative_path == "main.py")
         assert len(main.definitions) >= 3  # MyApp, run, helper, async_helper
 
+    def test_crlf_and_invalid_utf8(self, sample_workspace):
+        (sample_workspace / "win.py").write_bytes(b"# \xff\r\nclass Win:\r\n    pass\r\n")
+        rm = RepoMap(str(sample_workspace))
+        rm.scan_files()
+        info = rm._cache["win.py"]
+        assert info.lines == 4
+        assert [(d.name, d.line_number) for d in info.definitions] == [("Win", 2)]
+
+    def test_many_files_read_in_parallel(self, sample_workspace):
+        pkg = sample_workspace / "pkg"
+        pkg.mkdir()
+        for i in range(40):
+            (pkg / f"mod{i}.py").write_text(f"def func_{i}():\n    pass\n")
+        rm = RepoMap(str(sample_workspace))
+        rm.scan_files()
+        for i in range(40):
+            info = rm._cache[os.path.join("pkg", f"mod{i}.py")]
+            assert [d.name for d in info.definitions] == [f"func_{i}"]
+            assert info.lines == 3
+
     def test_skips_large_files(self, sample_workspace):
         big_file = sample_workspace / "big.py"
         big_file.write_text("x = 1\n" * 20000)
@@ -218,6 +283,21 @@ class TestScanFiles:
         files = rm.scan_files()
         assert not any(f.relative_path == "big.py" for f in files)
 
+    def test_nested_paths_and_symlinked_dirs(self, sample_workspace):
+        nested = sample_workspace / "pkg" / "sub"
+        nested.mkdir(parents=True)
+        (nested / "mod.py").write_text("def f():\n    pass\n")
+        os.symlink(sample_workspace / "pkg", sample_workspace / "pkg_link")
+
+        rm = RepoMap(str(sample_workspace))
+        files = rm.scan_files()
+        paths = [f.relative_path for f in files]
+
+        assert os.path.join("pkg", "sub", "mod.py") in paths
+        assert not any(p.startswith("pkg_link") for p in paths)
+        mod = next(f for f in files if f.relative_path.endswith("mod.py"))
+        assert mod.path == str(nested / "mod.py")
+
 
 class TestGetTree:
     def test_returns_string(self, sample_workspace):
@@ -272,8 +352,60 @@ class TestFindRelevantFiles:
         results = rm.find_relevant_files("zzz_nonexistent_xyz")
         assert len(results) <= 1
 
+    def test_index_refreshed_after_rescan(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        assert rm.find_relevant_files("brand_new")[0].relative_path == "README.md"
+
+        (sample_workspace / "extra.py").write_text("def brand_new_helper():\n    pass\n")
+        rm.scan_files()
+        results = rm.find_relevant_files("brand_new")
+        assert results[0].relative_path == "extra.py"
+
     def test_scans_if_cache_empty(self, sample_workspace):
         rm = RepoMap(str(sample_workspace))
         # Don't call scan_files() first
         results = rm.find_relevant_files("main")
         assert len(results) >= 1
+
+
+class TestScanCache:
+    def test_unchanged_files_are_not_reparsed(self, sample_workspace, monkeypatch):
+        rm = RepoMap(str(sample_workspace))
+        first = rm.scan_files()
+
+        monkeypatch.setattr(rm, "_extract_definitions", lambda *a: pytest.fail("reparsed"))
+        second = rm.scan_files()
+        assert [f.relative_path for f in second] == [f.relative_path for f in first]
+
+    def test_changed_and_deleted_files_are_refreshed(self, sample_workspace):
+        rm = RepoMap(str(sample_workspace))
+        rm.scan_files()
+
+        (sample_workspace / "main.py").write_text("def renamed_helper():\n    pass\n")
+        (sample_workspace / "data.txt").unlink()
+        rm.scan_files()
+
+        names = [d.name for d in rm._cache["main.py"].definitions]
+        assert names == ["renamed_helper"]
+        assert "data.txt" not in rm._cache
+
+    def test_disk_cache_round_trip(self, sample_workspace, tmp_path, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        RepoMap(str(sample_workspace), cache_dir=cache_dir).scan_files()
+        assert len(list(cache_dir.glob("repomap_*.json"))) == 1
+
+        rm = RepoMap(str(sample_workspace), cache_dir=cache_dir)
+        monkeypatch.setattr(rm, "_extract_definitions", lambda *a: pytest.fail("reparsed"))
+        results = rm.find_relevant_files("MyApp")
+        assert any(f.relative_path == "main.py" for f in results)
+        main = rm._cache["main.py"]
+        assert isinstance(main.definitions[0], CodeDefinition)
+
+    def test_corrupt_disk_cache_is_ignored(self, sample_workspace, tmp_path):
+        cache_dir = tmp_path / "cache"
+        rm = RepoMap(str(sample_workspace), cache_dir=cache_dir)
+        rm.scan_files()
+        rm._cache_file.write_text("not json", encoding="utf-8")
+
+        rm = RepoMap(str(sample_workspace), cache_dir=cache_dir)
+        assert any(f.relative_path == "main.py" for f in rm.scan_files())
@@ -68,20 +68,29 @@ class TestRetryConfig:
         assert config.jitter is True
 
     def test_should_retry_retryable(self):
-        config = RetryConfig()
-        config.retryable_exceptions = (RetryableError,)
+        config = RetryConfig(retryable_exceptions=(RetryableError,))
         assert config.should_retry(RateLimitError()) is True
         assert config.should_retry(TimeoutError()) is True
         assert config.should_retry(ServerError()) is True
 
     def test_should_retry_non_retryable(self):
-        config = RetryConfig()
-        config.retryable_exceptions = (RetryableError,)
+        config = RetryConfig(retryable_exceptions=(RetryableError,))
         assert config.should_retry(AuthenticationError()) is False
         assert config.should_retry(InvalidRequestError()) is False
         assert config.should_retry(ValueError()) is False
 
 
+    def test_retryable_exceptions_list_is_normalized(self):
+        config = RetryConfig(retryable_exceptions=[RateLimitError, ServerError])
+        assert config.retryable_exceptions == (RateLimitError, ServerError)
+        assert config.should_retry(ServerError()) is True
+        assert config.should_retry(TimeoutError()) is False
+
+    def test_disabled_never_retries(self):
+        config = RetryConfig(enabled=False)
+        assert config.should_retry(ServerError()) is False
+
+
 class TestCalculateDelay:
     """calculate_delay 测试"""
 
@@ -102,16 +111,35 @@ class TestCalculateDelay:
         assert config.calculate_delay(1) == 2.0
         assert config.calculate_delay(2) == 4.0
 
+    def test_fibonacci_strategy(self):
+        config = RetryConfig(
+            backoff=BackoffStrategy.FIBONACCI, initial_delay=1.0, max_delay=1e30, jitter=False
+        )
+        assert [config.calculate_delay(i) for i in range(7)] == [1, 1, 2, 3, 5, 8, 13]
+        # 超出预计算表的尝试次数
+        assert config.calculate_delay(70) == 308061521170129
+
     def test_max_delay(self):
         config = RetryConfig(backoff=BackoffStrategy.EXPONENTIAL, initial_delay=1.0, max_delay=10.0, jitter=False)
         assert config.calculate_delay(10) == 10.0
 
+    def test_delays_precomputed_beyond_max_retries(self):
+        config = RetryConfig(max_retries=2, initial_delay=1.0, jitter=False)
+        assert config._delays_ms == (1000, 2000, 4000)
+        assert config.calculate_delay(4) == 16.0
+
+    def test_config_is_frozen(self):
+        config = RetryConfig()
+        with pytest.raises(AttributeError):
+            config.max_retries = 5
+
     def test_jitter(self):
         config = RetryConfig(backoff=BackoffStrategy.CONSTANT, initial_delay=10.0, jitter=True)
         delays = [config.calculate_delay(0) for _ in range(10)]
         assert len(set(delays)) > 1
         for d in delays:
-            assert 7.5 <= d <= 12.5
+            assert 0 <= d <= 10.0
+            assert abs(d * 1000 - round(d * 1000)) < 1e-6
 
 
 class TestCircuitBreaker:
@@ -144,6 +172,31 @@ class TestCircuitBreaker:
         assert cb.state == CircuitBreaker.State.HALF_OPEN
         assert cb.allow_request()
 
+    def test_half_open_transitions(self):
+        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=0, half_open_max_calls=2)
+        cb.record_failure()
+        assert cb.state == CircuitBreaker.State.HALF_OPEN
+        cb.record_failure()
+        assert cb._state == 1  # OPEN
+        assert cb.state == CircuitBreaker.State.HALF_OPEN
+        cb.record_success()
+        cb.record_success()
+        assert cb.state == CircuitBreaker.State.CLOSED
+
+    def test_state_read_has_no_side_effects(self):
+        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        cb.record_failure()
+        assert cb.state == CircuitBreaker.State.HALF_OPEN
+        assert cb._state == 1  # OPEN，只读不落实转换
+        assert cb.allow_request()
+        assert cb._state == 2  # HALF_OPEN
+
+    def test_recovery_ignores_wall_clock_jumps(self, monkeypatch):
+        cb = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+        cb.record_failure()
+        monkeypatch.setattr(time, "time", lambda: 1e12)
+        assert cb.state == CircuitBreaker.State.OPEN
+
 
 class TestAsyncRetryDecorator:
     """async_retry 测试"""
@@ -188,6 +241,8 @@ class TestAsyncRetryDecorator:
         with pytest.raises(RetryExhaustedError) as exc_info:
             await always_fail()
         assert isinstance(exc_info.value.last_exception, ServerError)
+        assert exc_info.value.attempts == 3
+        assert exc_info.value.__cause__ is exc_info.value.last_exception
 
     @pytest.mark.asyncio
     async def test_non_retryable_error(self):
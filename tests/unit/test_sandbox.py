@@ -2,6 +2,8 @@
 代码执行沙箱测试
 """
 
+import asyncio
+
 import pytest
 import sys
 import time
@@ -127,6 +129,42 @@ class TestImportChecker:
         violations = checker.check_code(code)
         assert len(violations) == 1
 
+    def test_prefix_matching(self):
+        """测试规则与模块名互为前缀即命中"""
+        checker = ImportChecker(blocked=["os.path"], allowed=["json", "os"])
+        assert not checker._is_allowed("os")
+        assert not checker._is_allowed("os.path.join")
+        assert checker._is_allowed("os.sep")
+        assert checker._is_allowed("json.decoder")
+        assert not checker._is_allowed("math")
+
+    def test_nested_imports(self):
+        """测试函数、类与异常处理体内的导入同样被检查"""
+        checker = ImportChecker(blocked=["subprocess", "ctypes"])
+        code = """
+class A:
+    def run(self):
+        import subprocess
+
+try:
+    pass
+except ImportError:
+    from ctypes import CDLL
+"""
+        violations = checker.check_code(code)
+        assert violations == ["import subprocess", "from ctypes import CDLL"]
+
+    def test_check_code_cached(self):
+        """测试相同代码的检查结果被缓存"""
+        checker = ImportChecker(blocked=["subprocess"])
+        code = "import subprocess"
+        first = checker.check_code(code)
+        with patch.object(checker, "_scan_code", side_effect=AssertionError("不应重新解析")):
+            second = checker.check_code(code)
+        assert first == second == ["import subprocess"]
+        second.append("x")
+        assert checker.check_code(code) == ["import subprocess"]
+
     def test_syntax_error_code(self):
         """测试语法错误的代码"""
         checker = ImportChecker()
@@ -187,6 +225,118 @@ print(x + y)
         assert result.status == ExecutionStatus.SUCCESS
         assert "test_value" in result.stdout
 
+    def test_stdin_is_closed(self):
+        """测试代码经 stdin 传入后，读取 stdin 立即得到 EOF"""
+        config = SandboxConfig(timeout=10.0)
+        executor = SubprocessExecutor(config)
+        result = executor.execute("import sys; print(repr(sys.stdin.read()))")
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout.strip() == "''"
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="输出截断仅在 Unix 上生效")
+    def test_output_truncated(self):
+        """测试超出上限的输出被截断且子进程不会阻塞"""
+        config = SandboxConfig(timeout=10.0, max_output_bytes=100)
+        executor = SubprocessExecutor(config)
+        result = executor.execute("print('x' * 1_000_000)")
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout.startswith("x" * 100)
+        assert "已截断" in result.stdout
+        assert len(result.stdout) < 200
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="常驻 worker 依赖 select 管道")
+class TestWarmWorker:
+    """测试常驻 worker 执行"""
+
+    def test_reuses_process(self):
+        """测试多次执行复用同一进程"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=10.0, warm_workers=1))
+        try:
+            first = executor.execute("import os; print(os.getpid())")
+            second = executor.execute("import os; print(os.getpid())")
+        finally:
+            executor.close()
+        assert first.status == ExecutionStatus.SUCCESS
+        assert first.stdout == second.stdout
+
+    def test_fresh_namespace(self):
+        """测试各次执行之间不共享全局变量"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=10.0, warm_workers=1))
+        try:
+            executor.execute("leaked = 1")
+            result = executor.execute("print('leaked' in globals())")
+        finally:
+            executor.close()
+        assert result.stdout.strip() == "False"
+
+    def test_error(self):
+        """测试异常输出到 stderr"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=10.0, warm_workers=1))
+        try:
+            result = executor.execute("raise ValueError('test error')")
+        finally:
+            executor.close()
+        assert result.status == ExecutionStatus.ERROR
+        assert result.exit_code == 1
+        assert "ValueError: test error" in result.stderr
+
+    def test_low_level_output_captured(self):
+        """测试绕过 sys.stdout 的输出也被捕获，且不破坏控制协议"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=10.0, warm_workers=1))
+        code = (
+            "import os, sys\n"
+            "sys.__stdout__.write('a\\n')\n"
+            "sys.__stdout__.flush()\n"
+            "os.write(1, b'b\\n')\n"
+            "os.write(2, b'c\\n')\n"
+            "os.system('echo d')\n"
+        )
+        try:
+            result = executor.execute(code)
+            again = executor.execute("print('ok')")
+        finally:
+            executor.close()
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout == "a\nb\nd\n"
+        assert result.stderr == "c\n"
+        assert again.stdout == "ok\n"
+
+    def test_stdin_is_not_control_pipe(self):
+        """测试用户代码读取 stdin 立即得到 EOF 而不是阻塞"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=5.0, warm_workers=1))
+        try:
+            result = executor.execute("import sys; print(repr(sys.stdin.readline()))")
+        finally:
+            executor.close()
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout == "''\n"
+
+    def test_output_truncated(self):
+        """测试常驻 worker 同样按 max_output_bytes 截断输出"""
+        config = SandboxConfig(timeout=10.0, warm_workers=1, max_output_bytes=100)
+        executor = SubprocessExecutor(config)
+        try:
+            result = executor.execute("print('x' * 1_000_000)")
+        finally:
+            executor.close()
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout.startswith("x" * 100)
+        assert "已截断" in result.stdout
+        assert len(result.stdout) < 200
+
+    def test_timeout_replaces_worker(self):
+        """测试超时后丢弃 worker 并重新启动"""
+        executor = SubprocessExecutor(SandboxConfig(timeout=1.0, warm_workers=1))
+        try:
+            result = executor.execute("import time; time.sleep(10)")
+            assert result.status == ExecutionStatus.TIMEOUT
+            result = executor.execute("print('ok')")
+        finally:
+            executor.close()
+        assert result.status == ExecutionStatus.SUCCESS
+        assert result.stdout == "ok\n"
+
 
 class TestSandbox:
     """测试沙箱"""
@@ -332,6 +482,44 @@ class TestSandboxPool:
         result = await pool.execute("print('test')")
         assert result.success is True
 
+    def test_release_is_idempotent(self):
+        """测试重复释放或释放外部沙箱不影响计数"""
+        pool = SandboxPool(pool_size=1)
+        sandbox = pool.acquire()
+        pool.release(sandbox)
+        pool.release(sandbox)
+        pool.release(Sandbox())
+        assert pool.available_count == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_async_waits_for_release(self):
+        """测试池空时 acquire_async 等待释放"""
+        pool = SandboxPool(pool_size=1)
+        sandbox = pool.acquire()
+
+        waiter = asyncio.create_task(pool.acquire_async())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        pool.release(sandbox)
+        assert await asyncio.wait_for(waiter, 1.0) is sandbox
+        assert pool.available_count == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_async_cancelled(self):
+        """测试取消的等待者不会占用沙箱"""
+        pool = SandboxPool(pool_size=1)
+        sandbox = pool.acquire()
+
+        waiter = asyncio.create_task(pool.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        pool.release(sandbox)
+        assert pool.available_count == 1
+
 
 class TestDockerExecutor:
     """测试 Docker 执行器"""
@@ -360,6 +548,39 @@ class TestDockerExecutor:
             with pytest.raises(SandboxError, match="超时"):
                 Sandbox(config)
 
+    def test_build_docker_command(self, mock_docker):
+        """测试 Docker 命令复用预先构建的参数"""
+        config = SandboxConfig(runtime="docker", env_vars={"A": "1"})
+        executor = Sandbox(config)._executor
+        cmd = executor._build_docker_command("/tmp/code", "sandbox_test")
+        assert cmd[:4] == ["docker", "run", "--rm", "--name=sandbox_test"]
+        assert "--network=none" in cmd
+        assert cmd[cmd.index("-e") + 1] == "A=1"
+        assert cmd[-3:] == [config.docker_image, "python", "/code/code.py"]
+
+    def test_persistent_container_reused(self, mock_docker):
+        """测试常驻容器只创建一次，代码经 docker exec 的 stdin 传入"""
+        config = SandboxConfig(runtime="docker", docker_persistent=True)
+        sandbox = Sandbox(config)
+        with patch("subprocess.Popen") as mock_popen:
+            process = mock_popen.return_value
+            process.communicate.return_value = (b"ok\n", b"")
+            process.returncode = 0
+
+            first = sandbox._executor.execute("print('ok')")
+            second = sandbox._executor.execute("print('ok')")
+
+        assert first.success and second.success
+        assert first.stdout == "ok\n"
+        run_cmds = [c.args[0] for c in mock_docker.call_args_list]
+        assert sum(cmd[:3] == ["docker", "run", "-d"] for cmd in run_cmds) == 1
+        assert mock_popen.call_count == 2
+        assert mock_popen.call_args.args[0][:3] == ["docker", "exec", "-i"]
+        process.communicate.assert_called_with(input=b"print('ok')", timeout=config.timeout)
+
+        sandbox._executor.close()
+        assert mock_docker.call_args.args[0][:3] == ["docker", "rm", "-f"]
+
 
 class TestIntegration:
     """集成测试"""
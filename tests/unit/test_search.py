@@ -2,6 +2,8 @@
 
 import importlib.util
 import os
+import sqlite3
+from contextlib import contextmanager
 
 import pytest
 
@@ -53,6 +55,60 @@ class TestDummyEmbeddings:
         assert embeddings.dimension == 384
 
 
+class _FakeEmbeddingsAPI:
+    """记录请求的假 embeddings 接口"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, input):
+        from types import SimpleNamespace
+
+        self.calls.append(list(input))
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(len(text)), 0.5])
+                for i, text in enumerate(input)
+            ]
+        )
+
+
+class TestOpenAIEmbeddingsCache:
+    """测试 OpenAIEmbeddings 的磁盘缓存"""
+
+    def _make(self, cache_dir):
+        from types import SimpleNamespace
+
+        from xiaotie.search.embeddings import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(api_key="test", cache_dir=cache_dir)
+        api = _FakeEmbeddingsAPI()
+        embeddings.client = SimpleNamespace(embeddings=api)
+        return embeddings, api
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_requested(self, tmp_path):
+        """测试只为未命中且去重后的文本请求 API，结果保持原顺序"""
+        embeddings, api = self._make(tmp_path)
+
+        first = await embeddings.embed_texts(["a", "bb", "a"])
+        second = await embeddings.embed_texts(["ccc", "bb"])
+
+        assert api.calls == [["a", "bb"], ["ccc"]]
+        assert first == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+        assert second == [[3.0, 0.5], [2.0, 0.5]]
+
+    @pytest.mark.asyncio
+    async def test_cache_persists_across_instances(self, tmp_path):
+        """测试缓存落盘后新实例可直接命中"""
+        embeddings, _ = self._make(tmp_path)
+        await embeddings.embed_texts(["hello"])
+
+        embeddings, api = self._make(tmp_path)
+        assert await embeddings.embed_text("hello") == [5.0, 0.5]
+        assert api.calls == []
+
+
 class TestEmbeddingProviderInterface:
     """测试 EmbeddingProvider 接口"""
 
@@ -296,6 +352,168 @@ def multiply(a, b):
         assert search_engine.count() == 0
 
 
+class _FakeVectorStore:
+    """记录写入操作的内存向量存储"""
+
+    def __init__(self, embedding_provider, persist_directory=None):
+        self.chunks = {}
+        self.added_batches = []
+        self.deleted = []
+        self.bulk_loads = 0
+
+    @contextmanager
+    def bulk_mode(self):
+        self.bulk_loads += 1
+        yield
+
+    def count(self):
+        return len(self.chunks)
+
+    async def add_chunks_batched(self, chunks, batch_size=200):
+        self.added_batches.append([c.file_path for c in chunks])
+        self.chunks.update((c.id, c) for c in chunks)
+
+    async def delete_by_files(self, file_paths, batch_size=200):
+        self.deleted.append(list(file_paths))
+        paths = set(file_paths)
+        self.chunks = {k: c for k, c in self.chunks.items() if c.file_path not in paths}
+
+
+class TestIndexDirectoryBatching:
+    """测试 index_directory 跨文件批量写入"""
+
+    @pytest.fixture
+    def search_engine(self, tmp_path, monkeypatch):
+        from xiaotie.search import semantic_search
+
+        monkeypatch.setattr(semantic_search, "CodeVectorStore", _FakeVectorStore)
+        for i in range(3):
+            (tmp_path / f"mod{i}.py").write_text(f"x = {i}\n", encoding="utf-8")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "dep.js").write_text("var a = 1;\n", encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("not code\n", encoding="utf-8")
+        return semantic_search.SemanticSearch(DummyEmbeddings(), workspace_dir=str(tmp_path))
+
+    @pytest.mark.asyncio
+    async def test_files_added_in_one_batch(self, search_engine):
+        """测试首次索引一次性写入所有文件且不删除旧数据"""
+        store = search_engine.vector_store
+
+        assert await search_engine.index_directory() == 3
+
+        assert len(store.added_batches) == 1
+        assert sorted(os.path.basename(p) for p in store.added_batches[0]) == [
+            "mod0.py",
+            "mod1.py",
+            "mod2.py",
+        ]
+        assert store.deleted == []
+        assert store.bulk_loads == 1
+
+    @pytest.mark.asyncio
+    async def test_reindex_replaces_existing(self, search_engine):
+        """测试重新索引时先删除旧数据，块数不变"""
+        store = search_engine.vector_store
+        await search_engine.index_directory()
+        count = store.count()
+
+        assert await search_engine.index_directory() == 3
+
+        assert len(store.deleted) == 1
+        assert store.count() == count
+        # 增量更新不进入批量导入模式
+        assert store.bulk_loads == 1
+
+    def test_iter_code_files(self, search_engine, tmp_path):
+        """测试遍历跳过忽略目录，扩展名匹配不区分大小写"""
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "Main.PY").write_text("pass\n", encoding="utf-8")
+
+        found = search_engine._iter_code_files(str(tmp_path), search_engine.CODE_EXTENSIONS)
+
+        assert sorted(os.path.relpath(p, tmp_path) for p in found) == [
+            "mod0.py",
+            "mod1.py",
+            "mod2.py",
+            os.path.join("pkg", "Main.PY"),
+        ]
+
+
+class TestBulkMode:
+    """测试 CodeVectorStore.bulk_mode"""
+
+    def _store(self, conn):
+        from types import SimpleNamespace
+
+        from xiaotie.search.vector_store import CodeVectorStore
+
+        store = object.__new__(CodeVectorStore)
+        pool = SimpleNamespace(connect=lambda: conn)
+        store.client = SimpleNamespace(_server=SimpleNamespace(_sysdb=SimpleNamespace(_conn_pool=pool)))
+        return store
+
+    def test_pragmas_switched_and_restored(self, tmp_path):
+        """测试进入时放宽 pragma，退出时恢复原值"""
+        conn = sqlite3.connect(tmp_path / "chroma.sqlite3")
+        conn.execute("PRAGMA journal_mode=WAL")
+        store = self._store(conn)
+
+        with store.bulk_mode():
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "memory"
+
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    def test_missing_internals_is_noop(self):
+        """测试拿不到底层连接时不报错"""
+        from types import SimpleNamespace
+
+        from xiaotie.search.vector_store import CodeVectorStore
+
+        store = object.__new__(CodeVectorStore)
+        store.client = SimpleNamespace()
+        with store.bulk_mode():
+            pass
+
+
+class TestAddChunksBatched:
+    """测试 CodeVectorStore.add_chunks_batched"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_embedding_ordered_adds(self):
+        """测试嵌入请求受限并发，写入按批次顺序进行"""
+        import asyncio
+        from types import SimpleNamespace
+
+        from xiaotie.search.vector_store import CodeChunk, CodeVectorStore
+
+        state = {"active": 0, "peak": 0}
+
+        class SlowEmbeddings(DummyEmbeddings):
+            async def embed_texts(self, texts):
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+                return await super().embed_texts(texts)
+
+        added = []
+        store = object.__new__(CodeVectorStore)
+        store.embedding_provider = SlowEmbeddings(dimension=4)
+        store.collection = SimpleNamespace(add=lambda **kwargs: added.append(kwargs["ids"]))
+        chunks = [
+            CodeChunk(id=str(i), file_path="/a.py", content=f"x{i}", start_line=i, end_line=i)
+            for i in range(10)
+        ]
+
+        await store.add_chunks_batched(chunks, batch_size=2, max_concurrency=3)
+
+        assert added == [["0", "1"], ["2", "3"], ["4", "5"], ["6", "7"], ["8", "9"]]
+        assert state["peak"] == 3
+
+
 class TestSearchResult:
     """测试 SearchResult"""
 
@@ -0,0 +1,346 @@
+"""multi_agent/task_agent.py 单元测试"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from xiaotie.multi_agent.task_agent import TaskAgent, TaskAgentConfig
+from xiaotie.schema import FunctionCall, LLMResponse, ToolCall, ToolResult
+
+
+def _make_tool(name, content="ok"):
+    tool = MagicMock()
+    tool.name = name
+    tool.description = f"{name} tool"
+    tool.parameters = {"type": "object", "properties": {}}
+    tool.execute = AsyncMock(return_value=ToolResult(success=True, content=content))
+    return tool
+
+
+def _tool_call(call_id, name, **arguments):
+    return ToolCall(id=call_id, function=FunctionCall(name=name, arguments=arguments))
+
+
+@pytest.fixture
+def tools():
+    return [_make_tool("read_file"), _make_tool("grep"), _make_tool("bash")]
+
+
+class TestTaskAgentInit:
+    def test_filters_tools(self, tools):
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+        assert [t.name for t in agent.tools] == ["read_file", "grep"]
+
+    def test_precomputes_prompt_and_tool_defs(self, tools):
+        config = TaskAgentConfig(prompt="p", system_prompt_prefix="PREFIX ")
+        agent = TaskAgent(config, MagicMock(), tools)
+        assert agent._system_prompt.startswith("PREFIX ")
+        assert [d["function"]["name"] for d in agent._tool_defs] == ["read_file", "grep"]
+
+
+    def test_prompt_prefix_separated_by_blank_line(self, tools):
+        config = TaskAgentConfig(prompt="p", system_prompt_prefix="你是代码审查员。")
+        agent = TaskAgent(config, MagicMock(), tools)
+        prefix, rest = agent._system_prompt.split("\n\n", 1)
+        assert prefix == "你是代码审查员。"
+        assert rest.startswith("你是一个专注于代码探索")
+
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+        assert agent._system_prompt.startswith("你是一个专注于代码探索")
+
+
+class TestTaskAgentRun:
+    @pytest.mark.asyncio
+    async def test_final_answer(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(return_value=LLMResponse(content="done"))
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+
+        result = await agent.run()
+
+        assert result.success
+        assert result.content == "done"
+        assert result.iterations == 1
+        assert llm.chat.call_args.kwargs["tools"] is agent._tool_defs
+
+    @pytest.mark.asyncio
+    async def test_tool_round_trip(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(
+            side_effect=[
+                LLMResponse(content="", tool_calls=[_tool_call("c1", "grep", pattern="x")]),
+                LLMResponse(content="found"),
+            ]
+        )
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+
+        result = await agent.run()
+
+        assert result.content == "found"
+        assert result.iterations == 2
+        tools[1].execute.assert_awaited_once_with(pattern="x")
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool(self, tools):
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+        results = await agent._execute_tools([_tool_call("c1", "bash", command="ls")])
+        assert not results[0].success
+        assert "未知工具" in results[0].error
+
+    @pytest.mark.asyncio
+    async def test_cancelled_before_run(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock()
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+        agent.cancel()
+
+        result = await agent.run()
+
+        assert not result.success
+        assert result.error == "任务已取消"
+        llm.chat.assert_not_called()
+
+
+class TestTaskAgentClose:
+    @pytest.mark.asyncio
+    async def test_aclose_cancels_inflight_execution(self, tools):
+        started = asyncio.Event()
+
+        async def slow_chat(**kwargs):
+            started.set()
+            await asyncio.sleep(10)
+
+        llm = MagicMock()
+        llm.chat = slow_chat
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+
+        runner = asyncio.create_task(agent.run())
+        await started.wait()
+        inner = agent._run_task
+        await agent.aclose()
+
+        assert inner.cancelled()
+        assert agent._run_task is None
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_aclose_without_run(self, tools):
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+        await agent.aclose()
+
+
+class TestRoleToolSets:
+    def test_default_roles_share_configs(self):
+        from xiaotie.multi_agent.roles import AgentRole, create_default_roles
+
+        first = create_default_roles()
+        second = create_default_roles()
+        assert first is not second
+        assert first[AgentRole.TASK] is second[AgentRole.TASK]
+        assert isinstance(first[AgentRole.TASK].allowed_tools, tuple)
+        assert first[AgentRole.TASK].allowed_set is first[AgentRole.TASK].allowed_set
+        assert first[AgentRole.MAIN].allowed_set == frozenset()
+
+    def test_role_config_is_immutable(self):
+        import dataclasses
+
+        from xiaotie.multi_agent.roles import AgentRole, RoleConfig, create_default_roles
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            create_default_roles()[AgentRole.TASK].max_iterations = 1
+        assert create_default_roles()[AgentRole.TASK].max_iterations == 10
+
+        custom = dataclasses.replace(create_default_roles()[AgentRole.TASK], allowed_tools=["grep"])
+        assert custom.allowed_tools == ("grep",)
+        assert custom.allowed_set == frozenset({"grep"})
+        assert isinstance(custom, RoleConfig)
+
+    def test_filter_with_frozenset(self, tools):
+        config = TaskAgentConfig(prompt="p", allowed_tools=frozenset({"bash"}))
+        agent = TaskAgent(config, MagicMock(), tools)
+        assert [t.name for t in agent.tools] == ["bash"]
+
+
+class TestTaskAgentParallelTools:
+    @pytest.mark.asyncio
+    async def test_tools_run_concurrently_in_order(self, tools):
+        active = 0
+        peak = 0
+
+        def slow(content):
+            async def execute(**kwargs):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+                return ToolResult(success=True, content=content)
+
+            return execute
+
+        tools[0].execute = slow("file")
+        tools[1].execute = slow("match")
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+
+        results = await agent._execute_tools(
+            [_tool_call("c1", "read_file"), _tool_call("c2", "grep"), _tool_call("c3", "nope")]
+        )
+
+        assert [r.content for r in results[:2]] == ["file", "match"]
+        assert not results[2].success
+        assert peak == 2
+
+    def test_parallel_only_for_read_only_tool_sets(self, tools):
+        read_only = TaskAgent(TaskAgentConfig(prompt="p"), MagicMock(), tools)
+        unfiltered = TaskAgent(TaskAgentConfig(prompt="p", allowed_tools=[]), MagicMock(), tools)
+        assert read_only._parallel_tools
+        assert not unfiltered._parallel_tools
+
+    @pytest.mark.asyncio
+    async def test_sequential_when_disabled(self, tools):
+        config = TaskAgentConfig(prompt="p", parallel_tools=False)
+        agent = TaskAgent(config, MagicMock(), tools)
+        tools[1].execute = AsyncMock(side_effect=RuntimeError("boom"))
+
+        results = await agent._execute_tools(
+            [_tool_call("c1", "read_file"), _tool_call("c2", "grep")]
+        )
+
+        assert results[0].success
+        assert "boom" in results[1].error
+
+
+class TestTaskAgentCancel:
+    @pytest.mark.asyncio
+    async def test_cancel_interrupts_inflight_llm_call(self, tools):
+        started = asyncio.Event()
+
+        async def slow_chat(**kwargs):
+            started.set()
+            await asyncio.sleep(10)
+
+        llm = MagicMock()
+        llm.chat = slow_chat
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+
+        runner = asyncio.create_task(agent.run())
+        await started.wait()
+        agent.cancel()
+        result = await asyncio.wait_for(runner, timeout=1)
+
+        assert not result.success
+        assert result.error == "任务已取消"
+        assert result.iterations == 1
+
+
+class TestTaskAgentHistory:
+    def test_trim_history_keeps_prefix_and_whole_turns(self, tools):
+        from collections import deque
+
+        from xiaotie.schema import Message
+
+        config = TaskAgentConfig(prompt="p", max_history_messages=5)
+        agent = TaskAgent(config, MagicMock(), tools)
+        messages = deque([Message(role="system"), Message(role="user", content="p")])
+        for turn in range(3):
+            messages.append(Message(role="assistant", content=f"a{turn}"))
+            messages.append(Message(role="tool", content=f"t{turn}-1"))
+            messages.append(Message(role="tool", content=f"t{turn}-2"))
+
+        agent._trim_history(messages)
+
+        assert [m.role for m in messages] == ["system", "user", "assistant", "tool", "tool"]
+        assert messages[2].content == "a2"
+
+    def test_trim_history_keeps_oversized_latest_turn(self, tools):
+        from collections import deque
+
+        from xiaotie.schema import Message
+
+        config = TaskAgentConfig(prompt="p", max_history_messages=5)
+        agent = TaskAgent(config, MagicMock(), tools)
+        messages = deque([Message(role="system"), Message(role="user", content="p")])
+        messages.append(Message(role="assistant", content="a0"))
+        messages.extend(Message(role="tool", content=f"t{i}") for i in range(4))
+
+        agent._trim_history(messages)
+
+        assert [m.role for m in messages] == ["system", "user", "assistant"] + ["tool"] * 4
+
+    def test_trim_history_drops_old_turns_before_oversized_latest(self, tools):
+        from collections import deque
+
+        from xiaotie.schema import Message
+
+        config = TaskAgentConfig(prompt="p", max_history_messages=5)
+        agent = TaskAgent(config, MagicMock(), tools)
+        messages = deque([Message(role="system"), Message(role="user", content="p")])
+        messages.append(Message(role="assistant", content="a0"))
+        messages.append(Message(role="tool", content="t0"))
+        messages.append(Message(role="assistant", content="a1"))
+        messages.extend(Message(role="tool", content=f"t1-{i}") for i in range(4))
+
+        agent._trim_history(messages)
+
+        assert messages[2].role == "assistant"
+        assert messages[2].content == "a1"
+        assert len(messages) == 7
+
+    @pytest.mark.asyncio
+    async def test_llm_receives_list(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(return_value=LLMResponse(content="done"))
+        agent = TaskAgent(TaskAgentConfig(prompt="p"), llm, tools)
+
+        await agent.run()
+
+        assert isinstance(llm.chat.call_args.kwargs["messages"], list)
+
+
+class TestTaskAgentPromptTemplates:
+    @pytest.mark.asyncio
+    async def test_grep_prompt_skips_llm(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(return_value=LLMResponse(content="unused"))
+        grep = tools[1]
+        grep.execute.return_value = ToolResult(success=True, content="a.py:1: TODO")
+        agent = TaskAgent(TaskAgentConfig(prompt="grep 'TODO' in src"), llm, tools)
+
+        result = await agent.run()
+
+        assert result.success
+        assert result.content == "a.py:1: TODO"
+        assert result.iterations == 0
+        llm.chat.assert_not_awaited()
+        grep.execute.assert_awaited_once_with(pattern="TODO", path="src")
+
+    @pytest.mark.asyncio
+    async def test_natural_language_prompt_uses_llm(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(return_value=LLMResponse(content="done"))
+        agent = TaskAgent(TaskAgentConfig(prompt="find usages of foo"), llm, tools)
+
+        result = await agent.run()
+
+        assert result.content == "done"
+        llm.chat.assert_awaited_once()
+        tools[1].execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_template_call_falls_back_to_llm(self, tools):
+        llm = MagicMock()
+        llm.chat = AsyncMock(return_value=LLMResponse(content="done"))
+        tools[0].execute.return_value = ToolResult(success=False, error="not found")
+        agent = TaskAgent(TaskAgentConfig(prompt="read missing.py"), llm, tools)
+
+        result = await agent.run()
+
+        assert result.content == "done"
+        llm.chat.assert_awaited_once()
+
+    def test_template_requires_available_tool(self, tools):
+        config = TaskAgentConfig(prompt="p", allowed_tools=["read_file"])
+        agent = TaskAgent(config, MagicMock(), tools)
+        assert agent._match_template("grep TODO") is None
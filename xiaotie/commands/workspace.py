@@ -27,10 +27,10 @@ class WorkspaceCommandsMixin(CommandsBase):
 
     def cmd_map(self, args: str) -> tuple[bool, str]:
         """显示代码库概览（类、函数定义）"""
-        from xiaotie.repomap import RepoMap
+        from xiaotie.repomap import DEFAULT_CACHE_DIR, RepoMap
 
         workspace = self.agent.workspace_dir
-        repo_map = RepoMap(workspace)
+        repo_map = RepoMap(workspace, cache_dir=DEFAULT_CACHE_DIR)
 
         max_tokens = 2000
         if args:
@@ -47,10 +47,10 @@ class WorkspaceCommandsMixin(CommandsBase):
         if not args:
             return True, "用法: /find <关键词>"
 
-        from xiaotie.repomap import RepoMap
+        from xiaotie.repomap import DEFAULT_CACHE_DIR, RepoMap
 
         workspace = self.agent.workspace_dir
-        repo_map = RepoMap(workspace)
+        repo_map = RepoMap(workspace, cache_dir=DEFAULT_CACHE_DIR)
 
         files = repo_map.find_relevant_files(args.strip(), limit=10)
 
@@ -8,7 +8,8 @@ from __future__ import annotations
 import asyncio
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Union
 
 from .protocol import (
     LATEST_PROTOCOL_VERSION,
@@ -21,6 +22,7 @@ from .protocol import (
     ListToolsResult,
     MCPTool,
     MCPToolResult,
+    TextContent,
 )
 from .transport import StdioTransport
 
@@ -33,6 +35,27 @@ class MCPClientError(Exception):
     pass
 
 
+def _parse_tool_result(result: Dict[str, Any]) -> MCPToolResult:
+    """解析 tools/call 响应
+
+    绝大多数响应只包含文本内容，此时跳过 pydantic 的联合类型校验，
+    直接构造模型；包含图片/资源等其他内容时回退到完整校验。
+    """
+    content = result.get("content") or []
+    for item in content:
+        if (
+            not isinstance(item, dict)
+            or item.get("type") != "text"
+            or not isinstance(item.get("text"), str)
+        ):
+            return MCPToolResult(**result)
+
+    return MCPToolResult.model_construct(
+        content=[TextContent.model_construct(type="text", text=c["text"]) for c in content],
+        isError=bool(result.get("isError")),
+    )
+
+
 class MCPClient:
     """MCP 客户端
 
@@ -80,7 +103,13 @@ class MCPClient:
         self._server_capabilities: Optional[Dict[str, Any]] = None
         self._tools: Dict[str, MCPTool] = {}
         self._request_id = 0
-        self._lock = asyncio.Lock()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """获取锁 (在运行中的事件循环内惰性创建)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
 
     @property
     def is_connected(self) -> bool:
@@ -113,7 +142,7 @@ class MCPClient:
         params: Optional[Dict[str, Any]] = None,
     ) -> Any:
         """发送请求并等待响应"""
-        async with self._lock:
+        async with self._get_lock():
             request_id = self._next_id()
             request = JSONRPCRequest(
                 id=request_id,
@@ -141,12 +170,15 @@ class MCPClient:
         method: str,
         params: Optional[Dict[str, Any]] = None,
     ) -> None:
-        """发送通知 (不等待响应)"""
+        """发送通知 (不等待响应)
+
+        通知只写入缓冲区，不单独 drain；下一次请求的 ``send()`` 会一并排空。
+        """
         notification = JSONRPCNotification(
             method=method,
             params=params,
         )
-        await self._transport.send(notification)
+        self._transport.send_nowait(notification)
 
     async def connect(self) -> None:
         """连接到 MCP 服务器"""
@@ -254,10 +286,7 @@ class MCPClient:
 
         result = await self._send_request("tools/call", params)
 
-        # 解析结果
-        tool_result = MCPToolResult(**result)
-
-        return tool_result
+        return _parse_tool_result(result)
 
     async def __aenter__(self) -> "MCPClient":
         """异步上下文管理器入口"""
@@ -279,25 +308,44 @@ class MCPClientManager:
 
     def __init__(self):
         self._clients: Dict[str, MCPClient] = {}
+        # server:tool -> (server_name, tool)，在添加/移除服务器时增量维护
+        self._all_tools: Dict[str, tuple[str, MCPTool]] = {}
 
     @property
     def clients(self) -> Dict[str, MCPClient]:
         """所有客户端"""
         return self._clients
 
-    def get_all_tools(self) -> Dict[str, tuple[str, MCPTool]]:
+    def get_all_tools(self) -> Mapping[str, tuple[str, MCPTool]]:
         """获取所有服务器的工具
 
+        工具索引在添加/移除服务器时增量维护；若在添加后又通过
+        ``client.list_tools(cursor=...)`` 分页发现了新工具，需调用
+        ``refresh_server_tools()`` 更新索引。
+
         Returns:
-            Dict[tool_name, (server_name, tool)]
+            只读映射 Dict[tool_name, (server_name, tool)]
         """
-        all_tools: Dict[str, tuple[str, MCPTool]] = {}
-        for server_name, client in self._clients.items():
-            for tool_name, tool in client.tools.items():
-                # 使用 server_name:tool_name 格���避免冲突
-                full_name = f"{server_name}:{tool_name}"
-                all_tools[full_name] = (server_name, tool)
-        return all_tools
+        return MappingProxyType(self._all_tools)
+
+    def refresh_server_tools(self, name: str) -> None:
+        """按客户端当前的工具列表重建指定服务器的索引
+
+        Args:
+            name: 服务器名称
+        """
+        self._unindex_server(name)
+        client = self._clients.get(name)
+        if client is None:
+            return
+        for tool_name, tool in client.tools.items():
+            # 使用 server_name:tool_name 格式避免冲突
+            self._all_tools[f"{name}:{tool_name}"] = (name, tool)
+
+    def _unindex_server(self, name: str) -> None:
+        """从工具索引中移除指定服务器的工具"""
+        for key in [k for k, (server, _) in self._all_tools.items() if server == name]:
+            del self._all_tools[key]
 
     async def add_server(
         self,
@@ -335,6 +383,7 @@ class MCPClientManager:
         await client.list_tools()
 
         self._clients[name] = client
+        self.refresh_server_tools(name)
         logger.info(f"已添加 MCP 服务器: {name}")
 
         return client
@@ -349,6 +398,7 @@ class MCPClientManager:
             return
 
         client = self._clients.pop(name)
+        self._unindex_server(name)
         await client.disconnect()
         logger.info(f"已移除 MCP 服务器: {name}")
 
@@ -39,21 +39,26 @@ class MCPToolWrapper(Tool):
         self._client = client
         self._server_name = server_name
 
+        # 工具定义在包装器生命周期内不变，预先计算以避免每次访问重新格式化
+        desc = mcp_tool.description or f"MCP 工具: {mcp_tool.name}"
+        self._name = f"mcp_{server_name}_{mcp_tool.name}"
+        self._description = f"[MCP:{server_name}] {desc}"
+        self._parameters = mcp_tool.inputSchema
+
     @property
     def name(self) -> str:
         """工具名称 (带服务器前缀)"""
-        return f"mcp_{self._server_name}_{self._mcp_tool.name}"
+        return self._name
 
     @property
     def description(self) -> str:
         """工具描述"""
-        desc = self._mcp_tool.description or f"MCP 工具: {self._mcp_tool.name}"
-        return f"[MCP:{self._server_name}] {desc}"
+        return self._description
 
     @property
     def parameters(self) -> Dict[str, Any]:
         """参数 JSON Schema"""
-        return self._mcp_tool.inputSchema
+        return self._parameters
 
     async def execute(self, **kwargs) -> ToolResult:
         """执行工具"""
@@ -111,15 +116,14 @@ def create_mcp_tools(
     Returns:
         MCPToolWrapper 列表
     """
-    tools = []
-    for mcp_tool in client.tools.values():
-        wrapper = MCPToolWrapper(
-            mcp_tool=mcp_tool,
-            client=client,
-            server_name=server_name,
-        )
-        tools.append(wrapper)
-        logger.debug(f"创建 MCP 工具: {wrapper.name}")
+    tools = [
+        MCPToolWrapper(mcp_tool=mcp_tool, client=client, server_name=server_name)
+        for mcp_tool in client.tools.values()
+    ]
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for wrapper in tools:
+            logger.debug("创建 MCP 工具: %s", wrapper.name)
 
     return tools
 
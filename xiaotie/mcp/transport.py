@@ -6,13 +6,15 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
 import json
 import logging
 import os
 import sys
 from abc import ABC, abstractmethod
+from collections import deque
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Union
 
 from .protocol import JSONRPCNotification, JSONRPCRequest, JSONRPCResponse
 
@@ -78,6 +80,12 @@ DEFAULT_INHERITED_ENV_VARS = (
 # 进程终止超时
 PROCESS_TERMINATION_TIMEOUT = 2.0
 
+# stderr 环形缓冲区保留的行数
+STDERR_BUFFER_LINES = 256
+
+# stderr 分块读取大小 (也是单个缓冲条目的最大长度)
+STDERR_CHUNK_SIZE = 64 * 1024
+
 
 def get_default_environment() -> Dict[str, str]:
     """获取默认环境变量"""
@@ -120,7 +128,15 @@ class StdioTransport(Transport):
 
         self._process: Optional[asyncio.subprocess.Process] = None
         self._read_buffer = ""
-        self._lock = asyncio.Lock()
+        self._lock: Optional[asyncio.Lock] = None
+        self._stderr_ring: deque[str] = deque(maxlen=STDERR_BUFFER_LINES)
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """获取锁 (在运行中的事件循环内惰性创建)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
 
     @property
     def is_connected(self) -> bool:
@@ -149,6 +165,10 @@ class StdioTransport(Transport):
 
             logger.info(f"MCP 服务器已启动 (PID: {self._process.pid})")
 
+            # 后台持续读取 stderr，避免管道写满导致子进程阻塞
+            self._stderr_ring.clear()
+            self._stderr_task = asyncio.create_task(self._drain_stderr())
+
         except FileNotFoundError:
             raise TransportError(f"找不到命令: {self.command}")
         except PermissionError:
@@ -161,6 +181,11 @@ class StdioTransport(Transport):
         if self._process is None:
             return
 
+        if self._stderr_task is not None:
+            self._stderr_task.cancel()
+            await asyncio.gather(self._stderr_task, return_exceptions=True)
+            self._stderr_task = None
+
         try:
             # 关闭 stdin
             if self._process.stdin:
@@ -187,8 +212,11 @@ class StdioTransport(Transport):
             self._process = None
             self._read_buffer = ""
 
-    async def send(self, message: Union[JSONRPCRequest, JSONRPCNotification]) -> None:
-        """发送 JSON-RPC 消息"""
+    def send_nowait(self, message: Union[JSONRPCRequest, JSONRPCNotification]) -> None:
+        """写入 JSON-RPC 消息但不等待 drain
+
+        数据进入 StreamWriter 缓冲区，由后续的 ``flush()`` 统一处理背压。
+        """
         if not self.is_connected or self._process.stdin is None:
             raise TransportError("未连接到服务器")
 
@@ -197,21 +225,41 @@ class StdioTransport(Transport):
             json_str = message.model_dump_json(exclude_none=True)
             data = (json_str + "\n").encode(self.encoding)
 
-            logger.debug(f"发送: {json_str[:200]}...")
+            logger.debug("发送: %.200s...", json_str)
 
             # 写入 stdin
             self._process.stdin.write(data)
-            await self._process.stdin.drain()
 
         except Exception as e:
             raise TransportError(f"发送消息失败: {e}")
 
+    async def flush(self) -> None:
+        """等待 stdin 缓冲区排空"""
+        if not self.is_connected or self._process.stdin is None:
+            raise TransportError("未连接到服务器")
+
+        try:
+            await self._process.stdin.drain()
+        except Exception as e:
+            raise TransportError(f"发送消息失败: {e}")
+
+    async def send(self, message: Union[JSONRPCRequest, JSONRPCNotification]) -> None:
+        """发送 JSON-RPC 消息"""
+        self.send_nowait(message)
+        await self.flush()
+
+    async def send_batch(self, messages: List[Union[JSONRPCRequest, JSONRPCNotification]]) -> None:
+        """连续写入多条消息，最后只 drain 一次"""
+        for message in messages:
+            self.send_nowait(message)
+        await self.flush()
+
     async def receive(self, timeout: Optional[float] = 30.0) -> JSONRPCResponse:
         """接收 JSON-RPC 响应"""
         if not self.is_connected or self._process.stdout is None:
             raise TransportError("未连接到服务器")
 
-        async with self._lock:
+        async with self._get_lock():
             try:
                 # 读取直到获得完整的一行
                 while "\n" not in self._read_buffer:
@@ -243,17 +291,41 @@ class StdioTransport(Transport):
             except Exception as e:
                 raise TransportError(f"接收消息失败: {e}")
 
-    async def read_stderr(self) -> str:
-        """读取 stderr 输出 (用于调试)"""
-        if not self.is_connected or self._process.stderr is None:
-            return ""
+    async def _drain_stderr(self) -> None:
+        """将 stderr 输出持续读入环形缓冲区
 
-        try:
-            # 非阻塞读取
-            data = await asyncio.wait_for(self._process.stderr.read(4096), timeout=0.1)
-            return data.decode(self.encoding) if data else ""
-        except asyncio.TimeoutError:
-            return ""
+        按块读取并自行切分行，超长行不会触发 StreamReader 的行长度上限，
+        保证管道始终被排空。
+        """
+        stderr = self._process.stderr if self._process else None
+        if stderr is None:
+            return
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        partial = ""
+        while True:
+            try:
+                chunk = await stderr.read(STDERR_CHUNK_SIZE)
+            except Exception as e:
+                logger.debug("读取 stderr 失败: %s", e)
+                break
+            if not chunk:
+                break
+
+            partial += decoder.decode(chunk)
+            *lines, partial = partial.split("\n")
+            self._stderr_ring.extend(line + "\n" for line in lines)
+            if len(partial) >= STDERR_CHUNK_SIZE:
+                self._stderr_ring.append(partial)
+                partial = ""
+
+        partial += decoder.decode(b"", final=True)
+        if partial:
+            self._stderr_ring.append(partial)
+
+    async def read_stderr(self) -> str:
+        """读取最近的 stderr 输出 (用于调试)"""
+        return "".join(self._stderr_ring)
 
     async def __aenter__(self) -> "StdioTransport":
         """异步上下文管理器入口"""
@@ -9,9 +9,7 @@
 
 from .agent_tool import AgentTool
 from .coordinator import (
-    AgentRole as CoordinatorAgentRole,
-)
-from .coordinator import (
+    AgentCoordinator,
     BaseAgent,
     CoordinatorAgent,
     ExecutorAgent,
@@ -20,6 +18,9 @@ from .coordinator import (
     SupervisorAgent,
     Task,
 )
+from .coordinator import (
+    AgentRole as CoordinatorAgentRole,
+)
 from .roles import AgentRole, RoleConfig, create_default_roles
 from .task_agent import TaskAgent, TaskAgentConfig
 
@@ -38,4 +39,5 @@ __all__ = [
     "TaskAgent",
     "TaskAgentConfig",
     "AgentTool",
+    "AgentCoordinator",
 ]
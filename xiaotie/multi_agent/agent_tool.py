@@ -10,6 +10,7 @@ from typing import TYPE_CHECKING, Any, Optional
 
 from ..schema import ToolResult
 from ..tools.base import Tool
+from .roles import AgentRole
 
 if TYPE_CHECKING:
     from .coordinator import AgentCoordinator
@@ -88,8 +89,6 @@ class AgentTool(Tool):
             )
 
         try:
-            from .roles import AgentRole
-
             result = await self._coordinator.spawn_agent(
                 prompt=prompt,
                 role=AgentRole.TASK,
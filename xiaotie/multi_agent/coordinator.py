@@ -5,13 +5,22 @@
 """
 
 import asyncio
+import contextvars
+import dataclasses
+import hashlib
+import itertools
+import re
 import uuid
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 
 from ..events import Event, EventType, get_event_broker
+from .roles import AgentRole as SubAgentRole
+from .roles import RoleConfig, create_default_roles
+from .task_agent import TaskAgent, TaskAgentConfig
 
 
 class AgentRole(Enum):
@@ -338,3 +347,405 @@ class MultiAgentSystem:
             results[task.id] = result
 
         return results
+
+
+# =============================================================================
+# 子 Agent 协调器 (供 AgentTool 使用)
+# =============================================================================
+
+# 当前父任务 ID，沿 asyncio 任务树自动传递，无需逐层传参
+_current_parent_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "parent_id", default="root"
+)
+
+# 进程内自增任务 ID；仅在事件循环线程中调用，无需加锁
+_ID_COUNTER = itertools.count()
+
+
+def _new_id(prefix: str) -> str:
+    """生成进程内唯一的短 ID"""
+    return f"{prefix}-{next(_ID_COUNTER):x}"
+
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """规范化提示词：小写、去标点、压缩空白"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", prompt.lower()).split())
+
+
+@dataclass(slots=True)
+class TaskResult:
+    """子 Agent 任务结果"""
+
+    task_id: str
+    success: bool
+    content: str
+    error: Optional[str] = None
+    iterations: int = 0
+    token_usage: Dict[str, int] = field(default_factory=dict)
+    # 结果是否复用自计划缓存或进行中的相同任务
+    cached: bool = False
+
+
+@dataclass(slots=True)
+class AgentTask:
+    """子 Agent 任务记录"""
+
+    id: str
+    prompt: str
+    role: SubAgentRole
+    parent_id: str
+    status: str = "pending"  # pending, running, completed, failed
+    result: Optional[TaskResult] = None
+
+
+class AgentCoordinator:
+    """子 Agent 协调器
+
+    负责按角色生成 TaskAgent、并行执行子任务并汇总 token 消耗。
+
+    只读的 TASK 角色结果会写入计划缓存 (Agentic Plan Cache)：
+    规范化后 (忽略大小写、标点和多余空白) 完全相同的提示词直接复用
+    缓存结果，跳过完整的 LLM 循环。只换了一个标识符的提示词不会命中。
+    执行写操作后应调用 ``invalidate_cache()``。
+    """
+
+    def __init__(
+        self,
+        llm_client: Any,
+        tools: List[Any],
+        roles: Optional[Dict[SubAgentRole, RoleConfig]] = None,
+        max_concurrent_agents: int = 5,
+        max_cached_plans: int = 256,
+        max_tasks: int = 1000,
+    ):
+        """初始化协调器
+
+        Args:
+            llm_client: LLM 客户端
+            tools: 可供子 Agent 使用的全部工具
+            roles: 角色配置 (默认使用 create_default_roles())
+            max_concurrent_agents: 最大并发子 Agent 数
+            max_cached_plans: 计划缓存最大条目数
+            max_tasks: 保留的任务记录上限 (超出时丢弃最早的记录)
+        """
+        self.llm_client = llm_client
+        self.tools = tools
+        self.roles = roles if roles is not None else create_default_roles()
+        self.max_concurrent_agents = max_concurrent_agents
+        self.max_cached_plans = max_cached_plans
+        self.max_tasks = max_tasks
+
+        # 任务记录 (按插入顺序淘汰，避免长时间运行时无限增长)
+        self._tasks: Dict[str, AgentTask] = {}
+        self._active_agents: Dict[str, TaskAgent] = {}
+
+        # 按角色预先过滤的工具列表，避免每次创建 Agent 都重新过滤
+        self._tools_by_role: Dict[SubAgentRole, List[Any]] = {
+            role: self._filter_tools(cfg) for role, cfg in self.roles.items()
+        }
+
+        # 空闲 TaskAgent 池 (按角色复用过滤后的工具集和工具定义)
+        self._agent_pool: Dict[SubAgentRole, List[TaskAgent]] = defaultdict(list)
+        # 累计 token 消耗 (两个整数计数，读取时再组装字典)
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+
+        # 计划缓存: 规范化提示词的 SHA1 -> 结果 (按插入顺序淘汰)
+        self._plan_cache: Dict[str, TaskResult] = {}
+
+        # 进行中的 TASK 任务: 计划缓存键 -> 结果 Future
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    # ------------------------------------------------------------------
+    # 计划缓存
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _plan_key(prompt: str) -> Optional[str]:
+        """计算计划缓存键 (空提示词不缓存)"""
+        normalized = _normalize_prompt(prompt)
+        if not normalized:
+            return None
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    def _store_plan(self, key: str, result: TaskResult) -> None:
+        """写入计划缓存，超出容量时淘汰最早的条目"""
+        if key not in self._plan_cache and len(self._plan_cache) >= self.max_cached_plans:
+            del self._plan_cache[next(iter(self._plan_cache))]
+        self._plan_cache[key] = result
+
+    def invalidate_cache(self) -> None:
+        """清空计划缓存 (在执行写操作工具后调用)"""
+        self._plan_cache.clear()
+
+    # ------------------------------------------------------------------
+    # 子 Agent 执行
+    # ------------------------------------------------------------------
+
+    def _acquire_agent(
+        self,
+        role: SubAgentRole,
+        role_config: RoleConfig,
+        prompt: str,
+    ) -> TaskAgent:
+        """从池中取出空闲 Agent 并重置，池为空时新建"""
+        pool = self._agent_pool[role]
+        if pool:
+            agent = pool.pop()
+            agent.reset(prompt)
+            return agent
+
+        tools = self._tools_by_role.get(role)
+        if tools is None:
+            tools = self._tools_by_role[role] = self._filter_tools(role_config)
+
+        config = TaskAgentConfig(
+            prompt=prompt,
+            allowed_tools=role_config.allowed_set,
+            max_iterations=role_config.max_iterations,
+            system_prompt_prefix=role_config.system_prompt_prefix,
+        )
+        return TaskAgent(config=config, llm_client=self.llm_client, tools=tools, prefiltered=True)
+
+    def _filter_tools(self, role_config: RoleConfig) -> List[Any]:
+        """返回角色允许使用的工具 (未限制时为全部工具)"""
+        allowed = role_config.allowed_set
+        if not allowed:
+            return self.tools
+        return [t for t in self.tools if t.name in allowed]
+
+    def _release_agent(self, role: SubAgentRole, agent: TaskAgent) -> None:
+        """归还 Agent 到池中 (池大小上限为 max_concurrent_agents * 2)"""
+        pool = self._agent_pool[role]
+        if len(pool) < self.max_concurrent_agents * 2:
+            pool.append(agent)
+
+    async def spawn_agent(
+        self,
+        prompt: str,
+        role: SubAgentRole = SubAgentRole.TASK,
+        parent_id: Optional[str] = None,
+    ) -> TaskResult:
+        """生成子 Agent 并执行任务
+
+        Args:
+            prompt: 任务描述
+            role: 子 Agent 角色
+            parent_id: 父 Agent ID (默认取当前上下文中的父任务，顶层为 "root")
+
+        Returns:
+            TaskResult: 执行结果
+        """
+        role_config = self.roles.get(role)
+        if role_config is None:
+            raise ValueError(f"未知角色: {role}")
+
+        task_id = _new_id("task")
+        task = AgentTask(
+            id=task_id, prompt=prompt, role=role, parent_id=parent_id or _current_parent_id.get()
+        )
+        self._record_task(task)
+
+        plan_key = self._plan_key(prompt) if role == SubAgentRole.TASK else None
+        if plan_key is None:
+            return await self._run_agent(task, role_config)
+
+        cached = self._plan_cache.get(plan_key)
+        if cached is not None:
+            return self._reuse_result(task, cached)
+
+        # 单飞 (single-flight)：相同提示词正在执行时等待其结果，而不是重复调用 LLM
+        inflight = self._inflight.get(plan_key)
+        if inflight is not None:
+            try:
+                shared = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 原任务被取消，由当前调用自行执行
+            else:
+                return self._reuse_result(task, shared)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[plan_key] = future
+        try:
+            task_result = await self._run_agent(task, role_config)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 标记已读取，避免无人等待时告警
+            raise
+        else:
+            future.set_result(task_result)
+        finally:
+            if self._inflight.get(plan_key) is future:
+                del self._inflight[plan_key]
+
+        if task_result.success:
+            self._store_plan(plan_key, task_result)
+        return task_result
+
+    def _reuse_result(self, task: AgentTask, result: TaskResult) -> TaskResult:
+        """复用已有结果 (缓存或进行中的相同任务)，分配新的 task_id 且不计 token"""
+        task_result = dataclasses.replace(
+            result, task_id=task.id, token_usage={"prompt": 0, "completion": 0}, cached=True
+        )
+        task.status = "completed"
+        task.result = task_result
+        return task_result
+
+    async def _run_agent(self, task: AgentTask, role_config: RoleConfig) -> TaskResult:
+        """分配 TaskAgent 执行任务并记录结果"""
+        role = task.role
+        agent = self._acquire_agent(role, role_config, task.prompt)
+
+        self._active_agents[agent.id] = agent
+        task.status = "running"
+        # 子 Agent 运行期间再生成的 Agent 自动以当前任务为父任务
+        token = _current_parent_id.set(task.id)
+        try:
+            result = await agent.run()
+        except asyncio.CancelledError:
+            task.status = "failed"
+            task.result = TaskResult(task_id=task.id, success=False, content="", error="任务已取消")
+            raise
+        finally:
+            _current_parent_id.reset(token)
+            await agent.aclose()
+            del self._active_agents[agent.id]
+            self._release_agent(role, agent)
+
+        usage = result.token_usage
+        self._prompt_tokens += usage.get("prompt", 0)
+        self._completion_tokens += usage.get("completion", 0)
+
+        task_result = TaskResult(
+            task_id=task.id,
+            success=result.success,
+            content=result.content,
+            error=result.error,
+            iterations=result.iterations,
+            token_usage=result.token_usage,
+        )
+        task.status = "completed" if result.success else "failed"
+        task.result = task_result
+        return task_result
+
+    async def spawn_agents_parallel(
+        self,
+        tasks: List[Tuple[str, SubAgentRole]],
+        parent_id: Optional[str] = None,
+    ) -> List[TaskResult]:
+        """并行执行多个子任务
+
+        Args:
+            tasks: (提示词, 角色) 列表
+            parent_id: 父 Agent ID
+
+        Returns:
+            与输入顺序一致的结果列表
+        """
+        if not tasks:
+            return []
+
+        # 有界队列 + 固定数量 worker：同一时刻只存在 worker 数 + 队列容量个待执行任务
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrent_agents * 2)
+        results: List[Optional[TaskResult]] = [None] * len(tasks)
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, prompt, role = item
+                try:
+                    results[index] = await self.spawn_agent(prompt, role, parent_id)
+                except Exception as e:
+                    results[index] = self._error_result(e)
+
+        worker_count = min(self.max_concurrent_agents, len(tasks))
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            for index, (prompt, role) in enumerate(tasks):
+                await queue.put((index, prompt, role))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+
+        return results  # type: ignore[return-value]
+
+    async def iter_spawn_agents(
+        self,
+        tasks: Iterable[Tuple[str, SubAgentRole]],
+        parent_id: Optional[str] = None,
+    ) -> AsyncIterator[TaskResult]:
+        """并行执行子任务，按完成顺序逐个产出结果
+
+        最多同时运行 max_concurrent_agents 个子 Agent，每完成一个再调度下一个，
+        调用方可以边执行边消费结果，无需等待全部完成。
+
+        Args:
+            tasks: (提示词, 角色) 序列
+            parent_id: 父 Agent ID
+        """
+        remaining = iter(tasks)
+        running: Set[asyncio.Task] = set()
+
+        def schedule_next() -> None:
+            for prompt, role in remaining:
+                running.add(asyncio.create_task(self.spawn_agent(prompt, role, parent_id)))
+                return
+
+        try:
+            for _ in range(self.max_concurrent_agents):
+                schedule_next()
+
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    running.discard(finished)
+                    schedule_next()
+                    exc = finished.exception()
+                    yield self._error_result(exc) if exc is not None else finished.result()
+        finally:
+            # 调用方提前停止消费时，取消并等待仍在运行的子任务
+            for pending in running:
+                pending.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    @staticmethod
+    def _error_result(error: BaseException) -> TaskResult:
+        """将异常转换为失败结果"""
+        return TaskResult(
+            task_id=_new_id("task"),
+            success=False,
+            content="",
+            error=str(error),
+        )
+
+    def cancel_all(self) -> None:
+        """取消所有运行中的子 Agent"""
+        for agent in self._active_agents.values():
+            agent.cancel()
+
+    def _record_task(self, task: AgentTask) -> None:
+        """记录任务，超出上限时丢弃最早的记录"""
+        if len(self._tasks) >= self.max_tasks:
+            del self._tasks[next(iter(self._tasks))]
+        self._tasks[task.id] = task
+
+    def get_task(self, task_id: str) -> Optional[AgentTask]:
+        """获取任务记录"""
+        return self._tasks.get(task_id)
+
+    def get_total_tokens(self) -> Dict[str, int]:
+        """获取所有子 Agent 的累计 token 消耗"""
+        return {"prompt": self._prompt_tokens, "completion": self._completion_tokens}
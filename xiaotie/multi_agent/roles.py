@@ -7,7 +7,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import FrozenSet, Optional
 
 
 class AgentRole(Enum):
@@ -29,19 +29,19 @@ class AgentRole(Enum):
     DOCUMENTER = "documenter"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RoleConfig:
-    """角色配置"""
+    """角色配置 (不可变，默认角色在所有调用间共享)"""
 
     role: AgentRole
     name: str
     description: str
 
     # 允许的工具列表 (None 表示所有工具)
-    allowed_tools: Optional[list[str]] = None
+    allowed_tools: Optional[tuple[str, ...]] = None
 
     # 禁止的工具列表
-    forbidden_tools: list[str] = field(default_factory=list)
+    forbidden_tools: tuple[str, ...] = ()
 
     # 系统提示词前缀
     system_prompt_prefix: str = ""
@@ -52,20 +52,30 @@ class RoleConfig:
     # 是否可以生成子 Agent
     can_spawn_agents: bool = False
 
-    def get_tool_filter(self) -> tuple[Optional[list[str]], list[str]]:
+    # 允许的工具名集合 (空集合表示所有工具)，构造时计算
+    allowed_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # 冻结 dataclass 只能通过 object.__setattr__ 规范化字段
+        if self.allowed_tools is not None:
+            object.__setattr__(self, "allowed_tools", tuple(self.allowed_tools))
+        object.__setattr__(self, "forbidden_tools", tuple(self.forbidden_tools))
+        object.__setattr__(self, "allowed_set", frozenset(self.allowed_tools or ()))
+
+    def get_tool_filter(self) -> tuple[Optional[tuple[str, ...]], tuple[str, ...]]:
         """获取工具过滤器"""
         return self.allowed_tools, self.forbidden_tools
 
 
-def create_default_roles() -> dict[AgentRole, RoleConfig]:
-    """创建默认角色配置"""
+def _build_default_roles() -> dict[AgentRole, RoleConfig]:
+    """构建默认角色配置"""
     return {
         AgentRole.MAIN: RoleConfig(
             role=AgentRole.MAIN,
             name="主 Agent",
             description="完整功能的主 Agent，可以执行所有操作",
             allowed_tools=None,  # 所有工具
-            forbidden_tools=[],
+            forbidden_tools=(),
             system_prompt_prefix="你是一个强大的 AI 编程助手。",
             max_iterations=50,
             can_spawn_agents=True,
@@ -74,19 +84,19 @@ def create_default_roles() -> dict[AgentRole, RoleConfig]:
             role=AgentRole.TASK,
             name="任务 Agent",
             description="用于探索和搜索的只读 Agent",
-            allowed_tools=[
+            allowed_tools=(
                 "read_file",
                 "glob",
                 "grep",
                 "list_dir",
                 "code_analysis",
-            ],
-            forbidden_tools=[
+            ),
+            forbidden_tools=(
                 "write_file",
                 "edit_file",
                 "bash",
                 "python",
-            ],
+            ),
             system_prompt_prefix=(
                 "你是一个专注于代码探索和搜索的 Agent。你只能读取和分析代码，不能修改任何文件。"
             ),
@@ -97,19 +107,19 @@ def create_default_roles() -> dict[AgentRole, RoleConfig]:
             role=AgentRole.ANALYZER,
             name="分析 Agent",
             description="专注于代码分析和理解",
-            allowed_tools=[
+            allowed_tools=(
                 "read_file",
                 "glob",
                 "grep",
                 "list_dir",
                 "code_analysis",
                 "diagnostics",
-            ],
-            forbidden_tools=[
+            ),
+            forbidden_tools=(
                 "write_file",
                 "edit_file",
                 "bash",
-            ],
+            ),
             system_prompt_prefix=(
                 "你是一个代码分析专家。你的任务是深入理解代码结构、依赖关系和潜在问题。"
             ),
@@ -120,17 +130,17 @@ def create_default_roles() -> dict[AgentRole, RoleConfig]:
             role=AgentRole.TESTER,
             name="测试 Agent",
             description="专注于测试执行和验证",
-            allowed_tools=[
+            allowed_tools=(
                 "read_file",
                 "glob",
                 "grep",
                 "bash",
                 "python",
-            ],
-            forbidden_tools=[
+            ),
+            forbidden_tools=(
                 "write_file",
                 "edit_file",
-            ],
+            ),
             system_prompt_prefix=(
                 "你是一个测试专家。"
                 "你的任务是运行测试、分析测试结果并报告问题。"
@@ -143,17 +153,17 @@ def create_default_roles() -> dict[AgentRole, RoleConfig]:
             role=AgentRole.DOCUMENTER,
             name="文档 Agent",
             description="专注于文档生成和更新",
-            allowed_tools=[
+            allowed_tools=(
                 "read_file",
                 "write_file",
                 "glob",
                 "grep",
-            ],
-            forbidden_tools=[
+            ),
+            forbidden_tools=(
                 "bash",
                 "python",
                 "edit_file",
-            ],
+            ),
             system_prompt_prefix=(
                 "你是一个文档专家。"
                 "你的任务是生成和更新项目文档。"
@@ -163,3 +173,15 @@ def create_default_roles() -> dict[AgentRole, RoleConfig]:
             can_spawn_agents=False,
         ),
     }
+
+
+# 默认角色配置是不可变常量，只在模块加载时构建一次
+_DEFAULT_ROLES = _build_default_roles()
+
+
+def create_default_roles() -> dict[AgentRole, RoleConfig]:
+    """创建默认角色配置
+
+    返回新的字典，但其中的 RoleConfig 对象在所有调用间共享。
+    """
+    return dict(_DEFAULT_ROLES)
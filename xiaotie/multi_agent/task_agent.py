@@ -7,28 +7,77 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
+import re
+from collections import deque
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Optional
-from uuid import uuid4
+from typing import TYPE_CHECKING, Any, Callable, Collection, Optional
 
-from ..schema import Message, ToolResult
+from ..schema import FunctionCall, Message, ToolCall, ToolResult
 
 if TYPE_CHECKING:
     pass
 
+# 进程内自增 ID；仅在事件循环线程中调用，无需加锁
+_ID_COUNTER = itertools.count()
+
+
+def _new_id(prefix: str) -> str:
+    """生成进程内唯一的短 ID"""
+    return f"{prefix}-{next(_ID_COUNTER):x}"
+
+
+# 可以安全并发执行的只读工具
+_READ_ONLY_TOOLS = frozenset(
+    {"read_file", "glob", "grep", "list_dir", "code_analysis", "diagnostics"}
+)
+
+# 可直接映射为单次工具调用的简单提示词: (正则, 工具名, 参数构造)
+# 只匹配形式明确的请求，自然语言描述仍交给 LLM 规划
+_PROMPT_TEMPLATES: tuple[
+    tuple[re.Pattern[str], str, Callable[[re.Match[str]], dict[str, Any]]], ...
+] = (
+    (
+        re.compile(r"""^(?:grep|search\s+for|find)\s+(['"])(.+?)\1(?:\s+in\s+(\S+))?$""", re.I),
+        "grep",
+        lambda m: {"pattern": m.group(2), "path": m.group(3) or "."},
+    ),
+    (
+        re.compile(r"^grep\s+([^\s'\"]+)(?:\s+in\s+(\S+))?$", re.I),
+        "grep",
+        lambda m: {"pattern": m.group(1), "path": m.group(2) or "."},
+    ),
+    (
+        re.compile(r"^(?:read|cat)\s+(?:file\s+)?(\S+)$", re.I),
+        "read_file",
+        lambda m: {"path": m.group(1)},
+    ),
+)
+
+# 系统提示词在所有任务 Agent 间保持不变，作为稳定前缀便于 LLM 提供商做提示缓存
+_SYSTEM_PROMPT = """你是一个专注于代码探索和搜索的 AI 助手。
 
-@dataclass
+你的任务是根据用户的请求，使用提供的工具来搜索和分析代码。
+
+重要规则：
+1. 你只能读取和分析代码，不能修改任何文件
+2. 使用 glob 工具查找文件
+3. 使用 grep 工具搜索代码内容
+4. 使用 read_file 工具读取文件内容
+5. 完成任务后，提供清晰、简洁的总结
+
+请高效地完成任务，避免不必要的工具调用。"""
+
+
+@dataclass(slots=True)
 class TaskAgentConfig:
     """任务 Agent 配置"""
 
-    # 父 Agent ID
-    parent_id: str
-
     # 任务提示词
     prompt: str
 
-    # 允许的工具列表
-    allowed_tools: list[str] = field(
+    # 允许的工具列表 (也可以直接传入预先构建的 frozenset)
+    allowed_tools: Collection[str] = field(
         default_factory=lambda: [
             "read_file",
             "glob",
@@ -43,8 +92,18 @@ class TaskAgentConfig:
     # 超时时间 (秒)
     timeout: float = 300.0
 
+    # 系统提示词前缀 (通常来自角色配置)
+    system_prompt_prefix: str = ""
 
-@dataclass
+    # 同一轮的多个工具调用是否并发执行
+    # None 表示自动判断：仅当过滤后的工具全部为只读工具时并发
+    parallel_tools: Optional[bool] = None
+
+    # 发送给 LLM 的最大消息数 (包含系统提示词和用户任务)
+    max_history_messages: int = 20
+
+
+@dataclass(slots=True)
 class TaskAgentResult:
     """任务 Agent 执行结果"""
 
@@ -71,19 +130,43 @@ class TaskAgent:
         config: TaskAgentConfig,
         llm_client: Any,
         tools: list[Any],
+        prefiltered: bool = False,
     ):
-        self.id = str(uuid4())
+        self.id = _new_id("agent")
         self.config = config
         self.llm_client = llm_client
-        self.tools = self._filter_tools(tools)
+        # prefiltered=True 表示调用方已按 allowed_tools 过滤过工具列表
+        self.tools = tools if prefiltered else self._filter_tools(tools)
+        self._tool_by_name: dict[str, Any] = {t.name: t for t in self.tools}
+        self._parallel_tools = (
+            config.parallel_tools
+            if config.parallel_tools is not None
+            else self._tool_by_name.keys() <= _READ_ONLY_TOOLS
+        )
         self._cancelled = False
+        self._run_task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+
+        # 工具集和提示词在构造后不再变化，只计算一次
+        self._tool_defs = self._get_tool_definitions()
+        self._system_prompt = self._build_system_prompt()
+
+    def reset(self, prompt: str) -> None:
+        """重置为新任务以便复用 (工具集与提示词缓存保持不变)"""
+        self.id = _new_id("agent")
+        self.config.prompt = prompt
+        self._cancelled = False
+        self._run_task = None
+        self._inflight = None
 
     def _filter_tools(self, tools: list[Any]) -> list[Any]:
         """过滤工具，只保留允许的工具"""
         if not self.config.allowed_tools:
             return tools
 
-        allowed = set(self.config.allowed_tools)
+        allowed = self.config.allowed_tools
+        if not isinstance(allowed, frozenset):
+            allowed = frozenset(allowed)
         return [t for t in tools if t.name in allowed]
 
     async def run(self) -> TaskAgentResult:
@@ -100,8 +183,9 @@ class TaskAgent:
             )
 
         try:
+            self._run_task = asyncio.create_task(self._execute())
             result = await asyncio.wait_for(
-                self._execute(),
+                self._run_task,
                 timeout=self.config.timeout,
             )
             return result
@@ -120,20 +204,34 @@ class TaskAgent:
 
     async def _execute(self) -> TaskAgentResult:
         """内部执行逻辑"""
-        messages = [
-            Message(
-                role="system",
-                content=self._build_system_prompt(),
-            ),
-            Message(
-                role="user",
-                content=self.config.prompt,
-            ),
-        ]
+        messages: deque[Message] = deque(
+            [
+                Message(
+                    role="system",
+                    content=self._system_prompt,
+                ),
+                Message(
+                    role="user",
+                    content=self.config.prompt,
+                ),
+            ]
+        )
 
         iterations = 0
         total_tokens = {"prompt": 0, "completion": 0}
 
+        # 简单的单工具请求直接执行，省去一次 LLM 调用；失败时回退到正常流程
+        template_call = self._match_template(self.config.prompt)
+        if template_call is not None:
+            result = await self._run_one_tool(template_call)
+            if result.success:
+                return TaskAgentResult(
+                    success=True,
+                    content=result.content,
+                    iterations=0,
+                    token_usage=total_tokens,
+                )
+
         while iterations < self.config.max_iterations:
             if self._cancelled:
                 return TaskAgentResult(
@@ -146,11 +244,27 @@ class TaskAgent:
 
             iterations += 1
 
-            # 调用 LLM
-            response = await self.llm_client.chat(
-                messages=messages,
-                tools=self._get_tool_definitions(),
+            # 调用 LLM (保存任务引用，cancel() 可以直接中断进行中的请求)
+            self._inflight = asyncio.create_task(
+                self.llm_client.chat(
+                    messages=list(messages),
+                    tools=self._tool_defs,
+                )
             )
+            try:
+                response = await self._inflight
+            except asyncio.CancelledError:
+                if not self._cancelled:
+                    raise
+                return TaskAgentResult(
+                    success=False,
+                    content="",
+                    error="任务已取消",
+                    iterations=iterations,
+                    token_usage=total_tokens,
+                )
+            finally:
+                self._inflight = None
 
             # 更新 token 统计
             if response.usage:
@@ -180,6 +294,8 @@ class TaskAgent:
                             tool_call_id=tc.id,
                         )
                     )
+
+                self._trim_history(messages)
             else:
                 # 没有工具调用，返回最终结果
                 return TaskAgentResult(
@@ -197,40 +313,64 @@ class TaskAgent:
             token_usage=total_tokens,
         )
 
-    async def _execute_tools(self, tool_calls: list) -> list[ToolResult]:
-        """执行工具调用"""
-        results = []
-
-        for tc in tool_calls:
-            tool = self._find_tool(tc.function.name)
-            if tool is None:
-                results.append(
-                    ToolResult(
-                        success=False,
-                        error=f"未知工具: {tc.function.name}",
-                    )
-                )
-                continue
+    def _trim_history(self, messages: deque[Message]) -> None:
+        """将历史消息限制在窗口内
 
-            try:
-                result = await tool.execute(**tc.function.arguments)
-                results.append(result)
-            except Exception as e:
-                results.append(
-                    ToolResult(
-                        success=False,
-                        error=f"工具执行失败: {e}",
-                    )
+        始终保留系统提示词和用户任务 (稳定前缀，便于提示缓存) 以及最近一轮，
+        从最早的一轮开始整体移除助手消息及其工具结果，避免留下孤立的 tool 消息。
+        """
+        limit = self.config.max_history_messages
+        while len(messages) > limit:
+            # 最早一轮: messages[2] 为助手消息，其后紧跟该轮的工具结果
+            end = 3
+            while end < len(messages) and messages[end].role == "tool":
+                end += 1
+            if end >= len(messages):
+                # 只剩最近一轮，即使超出窗口也保留
+                break
+            for _ in range(end - 2):
+                del messages[2]
+
+    def _match_template(self, prompt: str) -> Optional[ToolCall]:
+        """将提示词匹配为直接工具调用 (对应工具不可用时不匹配)"""
+        prompt = prompt.strip()
+        for pattern, tool_name, build_args in _PROMPT_TEMPLATES:
+            if tool_name not in self._tool_by_name:
+                continue
+            match = pattern.match(prompt)
+            if match:
+                return ToolCall(
+                    id=_new_id("call"),
+                    function=FunctionCall(name=tool_name, arguments=build_args(match)),
                 )
+        return None
 
-        return results
+    async def _execute_tools(self, tool_calls: list) -> list[ToolResult]:
+        """执行工具调用 (结果顺序与调用顺序一致)"""
+        if self._parallel_tools and len(tool_calls) > 1:
+            return list(await asyncio.gather(*(self._run_one_tool(tc) for tc in tool_calls)))
+        return [await self._run_one_tool(tc) for tc in tool_calls]
+
+    async def _run_one_tool(self, tc: Any) -> ToolResult:
+        """执行单个工具调用，异常转换为失败结果"""
+        tool = self._find_tool(tc.function.name)
+        if tool is None:
+            return ToolResult(
+                success=False,
+                error=f"未知工具: {tc.function.name}",
+            )
+
+        try:
+            return await tool.execute(**tc.function.arguments)
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"工具执行失败: {e}",
+            )
 
     def _find_tool(self, name: str) -> Optional[Any]:
         """查找工具"""
-        for tool in self.tools:
-            if tool.name == name:
-                return tool
-        return None
+        return self._tool_by_name.get(name)
 
     def _get_tool_definitions(self) -> list[dict]:
         """获取工具定义"""
@@ -248,19 +388,22 @@ class TaskAgent:
 
     def _build_system_prompt(self) -> str:
         """构建系统提示词"""
-        return """你是一个专注于代码探索和搜索的 AI 助手。
-
-你的任务是根据用户的请求，使用提供的工具来搜索和分析代码。
-
-重要规则：
-1. 你只能读取和分析代码，不能修改任何文件
-2. 使用 glob 工具查找文件
-3. 使用 grep 工具搜索代码内容
-4. 使用 read_file 工具读取文件内容
-5. 完成任务后，提供清晰、简洁的总结
-
-请高效地完成任务，避免不必要的工具调用。"""
+        prefix = self.config.system_prompt_prefix
+        if not prefix:
+            return _SYSTEM_PROMPT
+        # 角色前缀通常不以换行结尾，空行分隔以免与通用提示词连成一段
+        return f"{prefix}\n\n{_SYSTEM_PROMPT}"
+
+    async def aclose(self) -> None:
+        """取消并等待仍在运行的执行任务，释放其持有的引用"""
+        task = self._run_task
+        self._run_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     def cancel(self) -> None:
-        """取消任务"""
+        """取消任务 (同时中断进行中的 LLM 请求)"""
         self._cancelled = True
+        if self._inflight is not None and not self._inflight.done():
+            self._inflight.cancel()
@@ -27,11 +27,15 @@ Agent 编排模块
 """
 
 import asyncio
+import hashlib
+import json
+import sys
 import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Union
 
 
 class ExecutionMode(Enum):
@@ -87,6 +91,9 @@ class WorkflowResult:
     final_output: Any = None
     total_time: float = 0.0
     error: Optional[str] = None
+    # 步骤名 -> 索引 (首次按名称查询时构建，步骤数变化或命中校验失败时重建)
+    _index: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _indexed_count: int = field(default=-1, init=False, repr=False, compare=False)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -98,11 +105,23 @@ class WorkflowResult:
         }
 
     def get_step(self, name: str) -> Optional[StepResult]:
-        """获取指定步骤的结果"""
-        for step in self.steps:
-            if step.name == name:
-                return step
-        return None
+        """获取指定步骤的结果 (同名步骤返回第一个)"""
+        if self._indexed_count == len(self.steps):
+            i = self._index.get(name)
+            if i is not None and self.steps[i].name == name:
+                return self.steps[i]
+        # 未命中或索引已过期 (步骤被原地替换/重排但数量不变) 时重建后再查
+        self._rebuild_index()
+        i = self._index.get(name)
+        return self.steps[i] if i is not None else None
+
+    def _rebuild_index(self) -> None:
+        """重建步骤名索引"""
+        index: Dict[str, int] = {}
+        for i, step in enumerate(self.steps):
+            index.setdefault(step.name, i)
+        self._index = index
+        self._indexed_count = len(self.steps)
 
 
 class OrchestrationError(Exception):
@@ -119,10 +138,77 @@ class StepExecutionError(OrchestrationError):
         super().__init__(f"Step '{step_name}' failed: {message}")
 
 
+# asyncio.TaskGroup 需要 Python 3.11+
+_HAS_TASK_GROUP = hasattr(asyncio, "TaskGroup")
+
+if sys.version_info >= (3, 11):
+
+    async def _with_timeout(coro: Awaitable[Any], timeout: float) -> Any:
+        """带超时等待 (asyncio.timeout 只注册一个定时器，不额外包装任务)"""
+        async with asyncio.timeout(timeout):
+            return await coro
+
+else:
+    _with_timeout = asyncio.wait_for
+
 # Agent 协议
 AgentCallable = Callable[[Any], Awaitable[Any]]
 
 
+_MISSING = object()
+
+
+class AgentCache:
+    """步骤结果 LRU 缓存
+
+    以 (agent, 输入数据的规范 JSON 哈希) 为键缓存 agent 的原始输出，相同 agent
+    处理相同输入时直接返回缓存结果，跳过 agent 调用。可在多个步骤间共享
+    (各步骤的 transform_output 在命中后分别应用)。
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    @staticmethod
+    def make_key(agent: AgentCallable, input_data: Any) -> tuple:
+        """计算缓存键
+
+        键直接持有 agent 对象 (而非 id)，agent 被回收后其 id 复用也不会误命中。
+
+        Raises:
+            TypeError: agent 不可哈希或输入无法序列化
+            ValueError: 输入无法序列化 (如循环引用)
+        """
+        payload = json.dumps(input_data, sort_keys=True, default=str).encode()
+        key = (agent, hashlib.blake2b(payload, digest_size=16).digest())
+        hash(key)
+        return key
+
+    def get(self, key: tuple, default: Any = _MISSING) -> Any:
+        """读取缓存 (命中时移到最近使用)"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
 class Step:
     """工作流步骤"""
 
@@ -135,6 +221,7 @@ class Step:
         transform_output: Optional[Callable[[Any], Any]] = None,
         on_error: Optional[Callable[[Exception], Any]] = None,
         timeout: Optional[float] = None,
+        cache: Optional[AgentCache] = None,
     ):
         self.name = name
         self.agent = agent
@@ -143,34 +230,61 @@ class Step:
         self.transform_output = transform_output
         self.on_error = on_error
         self.timeout = timeout
+        self.cache = cache
+
+    def _skip_result(self, input_data: Any) -> Optional[StepResult]:
+        """条件不满足时返回跳过结果"""
+        if self.condition is not None and not self.condition(input_data):
+            return StepResult(name=self.name, status=StepStatus.SKIPPED)
+        return None
 
     async def execute(self, input_data: Any, context: Dict[str, Any] = None) -> StepResult:
         """执行步骤"""
-        start_time = time.time()
-        context = context or {}
+        skipped = self._skip_result(input_data)
+        if skipped is not None:
+            return skipped
+        return await self._run(input_data)
 
-        # 检查条件
-        if self.condition and not self.condition(input_data):
-            return StepResult(
-                name=self.name,
-                status=StepStatus.SKIPPED,
-                execution_time=time.time() - start_time,
-            )
+    async def _run(self, input_data: Any) -> StepResult:
+        """执行步骤 (不检查条件)"""
+        start_time = time.perf_counter()
 
         try:
             # 转换输入
             if self.transform_input:
                 input_data = self.transform_input(input_data)
 
+            # 检查缓存
+            cache_key = None
+            if self.cache is not None:
+                try:
+                    cache_key = AgentCache.make_key(self.agent, input_data)
+                except (TypeError, ValueError):
+                    # 不可哈希的 agent 或无法序列化的输入 (如循环引用) 不缓存
+                    pass
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not _MISSING:
+                    if self.transform_output:
+                        cached = self.transform_output(cached)
+                    return StepResult(
+                        name=self.name,
+                        status=StepStatus.COMPLETED,
+                        output=cached,
+                        execution_time=time.perf_counter() - start_time,
+                        metadata={"cache": "hit"},
+                    )
+
             # 执行 agent
             if self.timeout:
-                output = await asyncio.wait_for(
-                    self.agent(input_data),
-                    timeout=self.timeout,
-                )
+                output = await _with_timeout(self.agent(input_data), self.timeout)
             else:
                 output = await self.agent(input_data)
 
+            # 缓存 agent 原始输出，共享缓存的步骤各自应用 transform_output
+            if cache_key is not None:
+                self.cache.put(cache_key, output)
+
             # 转换输出
             if self.transform_output:
                 output = self.transform_output(output)
@@ -179,7 +293,7 @@ class Step:
                 name=self.name,
                 status=StepStatus.COMPLETED,
                 output=output,
-                execution_time=time.time() - start_time,
+                execution_time=time.perf_counter() - start_time,
             )
 
         except asyncio.TimeoutError:
@@ -187,7 +301,7 @@ class Step:
                 name=self.name,
                 status=StepStatus.FAILED,
                 error=f"Timeout after {self.timeout}s",
-                execution_time=time.time() - start_time,
+                execution_time=time.perf_counter() - start_time,
             )
         except Exception as e:
             # 错误处理
@@ -198,7 +312,7 @@ class Step:
                         name=self.name,
                         status=StepStatus.COMPLETED,
                         output=fallback_output,
-                        execution_time=time.time() - start_time,
+                        execution_time=time.perf_counter() - start_time,
                         metadata={"fallback": True, "original_error": str(e)},
                     )
                 except Exception:
@@ -208,10 +322,20 @@ class Step:
                 name=self.name,
                 status=StepStatus.FAILED,
                 error=str(e),
-                execution_time=time.time() - start_time,
+                execution_time=time.perf_counter() - start_time,
             )
 
 
+def _normalize_step_spec(spec: Union[tuple, Step]) -> Step:
+    """将 Step 或 (name, agent[, kwargs]) 元组转换为 Step"""
+    if isinstance(spec, Step):
+        return spec
+    if isinstance(spec, tuple):
+        name, agent, *rest = spec
+        return Step(name=name, agent=agent, **(rest[0] if rest else {}))
+    raise ValueError(f"无效的步骤类型: {type(spec)}")
+
+
 class Workflow(ABC):
     """工作流基类"""
 
@@ -226,12 +350,19 @@ class Workflow(ABC):
 
     def _notify_callbacks(self, result: StepResult):
         """通知回调"""
-        for callback in self._callbacks:
+        callbacks = self._callbacks
+        if not callbacks:
+            return
+        for callback in callbacks:
             try:
                 callback(result)
             except Exception:
                 pass
 
+    def _normalize_steps(self, steps: List[Union[tuple, Step]]) -> List[Step]:
+        """标准化步骤"""
+        return [_normalize_step_spec(step) for step in steps]
+
     @abstractmethod
     async def run(self, input_data: Any) -> WorkflowResult:
         """执行工作流"""
@@ -251,25 +382,13 @@ class Pipeline(Workflow):
         self.steps = self._normalize_steps(steps)
         self.stop_on_error = stop_on_error
 
-    def _normalize_steps(self, steps: List[Union[tuple, Step]]) -> List[Step]:
-        """标准化步骤"""
-        normalized = []
-        for step in steps:
-            if isinstance(step, Step):
-                normalized.append(step)
-            elif isinstance(step, tuple):
-                name, agent = step[0], step[1]
-                kwargs = step[2] if len(step) > 2 else {}
-                normalized.append(Step(name=name, agent=agent, **kwargs))
-            else:
-                raise ValueError(f"无效的步骤类型: {type(step)}")
-        return normalized
-
     async def run(self, input_data: Any) -> WorkflowResult:
         """执行管道"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         results = []
         current_input = input_data
+        # 最近一次成功步骤的输出 (没有成功步骤时为 None)
+        final_output = None
         error = None
 
         for step in self.steps:
@@ -282,20 +401,13 @@ class Pipeline(Workflow):
                     error = f"Step '{step.name}' failed: {result.error}"
                     break
             elif result.status == StepStatus.COMPLETED:
-                current_input = result.output
-
-        # 获取最终输出
-        final_output = None
-        for result in reversed(results):
-            if result.status == StepStatus.COMPLETED:
-                final_output = result.output
-                break
+                current_input = final_output = result.output
 
         return WorkflowResult(
             success=error is None,
             steps=results,
             final_output=final_output,
-            total_time=time.time() - start_time,
+            total_time=time.perf_counter() - start_time,
             error=error,
         )
 
@@ -312,108 +424,128 @@ class Parallel(Workflow):
         super().__init__(name)
         self.steps = self._normalize_steps(steps)
         self.max_concurrency = max_concurrency
-
-    def _normalize_steps(self, steps: List[Union[tuple, Step]]) -> List[Step]:
-        """标准化步骤"""
-        normalized = []
-        for step in steps:
-            if isinstance(step, Step):
-                normalized.append(step)
-            elif isinstance(step, tuple):
-                name, agent = step[0], step[1]
-                kwargs = step[2] if len(step) > 2 else {}
-                normalized.append(Step(name=name, agent=agent, **kwargs))
-        return normalized
+        # 并发信号量在首次运行时创建并跨多次 run 复用 (asyncio 原语绑定事件循环)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
 
     async def run(self, input_data: Any) -> WorkflowResult:
         """并行执行所有步骤"""
-        start_time = time.time()
-
-        if self.max_concurrency:
-            semaphore = asyncio.Semaphore(self.max_concurrency)
-
-            async def limited_execute(step: Step):
-                async with semaphore:
-                    return await step.execute(input_data)
-
-            tasks = [limited_execute(step) for step in self.steps]
+        start_time = time.perf_counter()
+        semaphore = self._get_semaphore()
+
+        if _HAS_TASK_GROUP:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(self._safe_execute(step, input_data, semaphore))
+                    for step in self.steps
+                ]
+            step_results = [t.result() for t in tasks]
         else:
-            tasks = [step.execute(input_data) for step in self.steps]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 处理结果
-        step_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                step_results.append(
-                    StepResult(
-                        name=self.steps[i].name,
-                        status=StepStatus.FAILED,
-                        error=str(result),
-                    )
+            step_results = list(
+                await asyncio.gather(
+                    *(self._safe_execute(step, input_data, semaphore) for step in self.steps)
                 )
-            else:
-                step_results.append(result)
-                self._notify_callbacks(result)
-
-        # 检查是否全部成功
-        all_success = all(r.status == StepStatus.COMPLETED for r in step_results)
+            )
 
-        # 合并输出
-        outputs = {r.name: r.output for r in step_results if r.status == StepStatus.COMPLETED}
+        # 一次遍历完成回调通知、成功判断和输出合并
+        outputs = {}
+        all_success = True
+        for result in step_results:
+            if result.status is StepStatus.COMPLETED:
+                outputs[result.name] = result.output
+            else:
+                all_success = False
+            self._notify_callbacks(result)
 
         return WorkflowResult(
             success=all_success,
             steps=step_results,
             final_output=outputs,
-            total_time=time.time() - start_time,
+            total_time=time.perf_counter() - start_time,
         )
 
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """获取并发信号量 (未限制并发时为 None，事件循环变化时重建)"""
+        if not self.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    @staticmethod
+    async def _safe_execute(
+        step: Step, input_data: Any, semaphore: Optional[asyncio.Semaphore]
+    ) -> StepResult:
+        """执行单个步骤，异常转换为失败结果 (不会穿过 TaskGroup 边界)"""
+        try:
+            if semaphore is None:
+                return await step.execute(input_data)
+            async with semaphore:
+                return await step.execute(input_data)
+        except Exception as e:
+            return StepResult(name=step.name, status=StepStatus.FAILED, error=str(e))
+
 
 class Router(Workflow):
-    """条件路由"""
+    """条件路由
+
+    两种路由方式:
+    - 谓词列表: routes=[(condition, step), ...]，依次调用 condition 直到匹配
+    - 键路由: key=函数, routes={键: step, ...}，只调用一次 key 后查表
+
+    使用示例:
+        router = Router(
+            {"code": ("coder", coder_agent), "doc": ("writer", writer_agent)},
+            key=lambda x: x["category"],
+        )
+    """
 
     def __init__(
         self,
-        routes: List[tuple],  # [(condition, step), ...]
+        routes: Union[List[tuple], Dict[Hashable, Union[tuple, Step]]],
         default: Optional[Union[tuple, Step]] = None,
         name: str = "router",
+        key: Optional[Callable[[Any], Hashable]] = None,
     ):
         super().__init__(name)
-        self.routes = [(cond, self._normalize_step(step)) for cond, step in routes]
+        self._key = key
+        if key is not None:
+            if not isinstance(routes, dict):
+                raise ValueError("使用 key 路由时 routes 必须是 {键: 步骤} 字典")
+            self.routes = []
+            self._route_map = {k: self._normalize_step(step) for k, step in routes.items()}
+        else:
+            self.routes = [(cond, self._normalize_step(step)) for cond, step in routes]
+            self._route_map = {}
         self.default = self._normalize_step(default) if default else None
 
     def _normalize_step(self, step: Union[tuple, Step, None]) -> Optional[Step]:
         """标准化步骤"""
-        if step is None:
-            return None
-        if isinstance(step, Step):
-            return step
-        if isinstance(step, tuple):
-            name, agent = step[0], step[1]
-            kwargs = step[2] if len(step) > 2 else {}
-            return Step(name=name, agent=agent, **kwargs)
-        raise ValueError(f"无效的步骤类型: {type(step)}")
+        return None if step is None else _normalize_step_spec(step)
 
     async def run(self, input_data: Any) -> WorkflowResult:
         """根据条件路由执行"""
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # 查找匹配的路由
-        selected_step = None
-        for condition, step in self.routes:
-            if condition(input_data):
-                selected_step = step
-                break
+        if self._key is not None:
+            selected_step = self._route_map.get(self._key(input_data), self.default)
+        else:
+            selected_step = None
+            for condition, step in self.routes:
+                if condition(input_data):
+                    selected_step = step
+                    break
 
-        if selected_step is None:
-            selected_step = self.default
+            if selected_step is None:
+                selected_step = self.default
 
         if selected_step is None:
             return WorkflowResult(
                 success=False,
-                total_time=time.time() - start_time,
+                total_time=time.perf_counter() - start_time,
                 error="No matching route found",
             )
 
@@ -425,7 +557,7 @@ class Router(Workflow):
             success=result.status == StepStatus.COMPLETED,
             steps=[result],
             final_output=result.output,
-            total_time=time.time() - start_time,
+            total_time=time.perf_counter() - start_time,
             error=result.error,
         )
 
@@ -436,18 +568,68 @@ class Orchestrator:
     def __init__(self, name: str = "orchestrator"):
         self.name = name
         self._workflows: Dict[str, Workflow] = {}
+        # 不依赖上一个工作流输出的工作流名称
+        self._independent: Set[str] = set()
         self._context: Dict[str, Any] = {}
         self._callbacks: List[Callable[[WorkflowResult], None]] = []
 
-    def register(self, name: str, workflow: Workflow) -> "Orchestrator":
-        """注册工作流"""
+    @staticmethod
+    def configure_loop() -> bool:
+        """为当前事件循环启用 eager 任务工厂 (Python 3.12+)
+
+        启用后，创建任务时协程立即同步执行到第一次挂起，缓存命中、
+        条件跳过等无需等待 IO 的步骤不再经过事件循环调度。
+        需在事件循环内调用。
+
+        Returns:
+            是否已启用 (Python 3.12 以下返回 False)
+        """
+        factory = getattr(asyncio, "eager_task_factory", None)
+        if factory is None:
+            return False
+        asyncio.get_running_loop().set_task_factory(factory)
+        return True
+
+    @staticmethod
+    def install_uvloop() -> bool:
+        """将 uvloop 设为默认事件循环策略 (可选依赖: pip install xiaotie[uvloop])
+
+        uvloop 降低任务调度开销，run_parallel 和 Parallel 大量并发短步骤时收益最明显。
+        需在创建事件循环 (asyncio.run) 之前调用；未安装 uvloop (如 Windows) 时静默跳过。
+
+        Returns:
+            是否已启用 uvloop
+        """
+        try:
+            import uvloop
+        except ImportError:
+            return False
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return True
+
+    def register(
+        self, name: str, workflow: Workflow, needs_previous_output: bool = True
+    ) -> "Orchestrator":
+        """注册工作流
+
+        Args:
+            name: 工作流名称
+            workflow: 工作流
+            needs_previous_output: 在 run_sequence 中是否以上一个工作流的输出为输入；
+                为 False 时始终使用序列的原始输入，可被提前启动
+        """
         self._workflows[name] = workflow
+        if needs_previous_output:
+            self._independent.discard(name)
+        else:
+            self._independent.add(name)
         return self
 
     def unregister(self, name: str) -> bool:
         """注销工作流"""
         if name in self._workflows:
             del self._workflows[name]
+            self._independent.discard(name)
             return True
         return False
 
@@ -471,7 +653,10 @@ class Orchestrator:
 
     def _notify_callbacks(self, result: WorkflowResult):
         """通知回调"""
-        for callback in self._callbacks:
+        callbacks = self._callbacks
+        if not callbacks:
+            return
+        for callback in callbacks:
             try:
                 callback(result)
             except Exception:
@@ -494,28 +679,55 @@ class Orchestrator:
         self,
         workflow_names: List[str],
         input_data: Any,
+        speculative: bool = False,
     ) -> WorkflowResult:
-        """顺序执行多个工作流"""
-        start_time = time.time()
+        """顺序执行多个工作流
+
+        Args:
+            workflow_names: 工作流名称列表
+            input_data: 输入数据
+            speculative: 是否提前启动下一个不依赖上游输出的工作流
+                (注册时 needs_previous_output=False)，使其与当前工作流重叠执行
+        """
+        start_time = time.perf_counter()
         all_steps = []
         current_input = input_data
         error = None
+        prefetched: Dict[int, asyncio.Task] = {}
 
-        for name in workflow_names:
-            result = await self.run(name, current_input)
-            all_steps.extend(result.steps)
+        try:
+            for i, name in enumerate(workflow_names):
+                if speculative and i + 1 < len(workflow_names):
+                    next_name = workflow_names[i + 1]
+                    if next_name in self._independent and i + 1 not in prefetched:
+                        prefetched[i + 1] = asyncio.create_task(self.run(next_name, input_data))
+
+                task = prefetched.pop(i, None)
+                if task is not None:
+                    result = await task
+                elif name in self._independent:
+                    result = await self.run(name, input_data)
+                else:
+                    result = await self.run(name, current_input)
+                all_steps.extend(result.steps)
 
-            if not result.success:
-                error = f"Workflow '{name}' failed: {result.error}"
-                break
+                if not result.success:
+                    error = f"Workflow '{name}' failed: {result.error}"
+                    break
 
-            current_input = result.final_output
+                current_input = result.final_output
+        finally:
+            # 序列提前结束时取消尚未使用的预启动工作流
+            for task in prefetched.values():
+                task.cancel()
+            if prefetched:
+                await asyncio.gather(*prefetched.values(), return_exceptions=True)
 
         return WorkflowResult(
             success=error is None,
             steps=all_steps,
             final_output=current_input if error is None else None,
-            total_time=time.time() - start_time,
+            total_time=time.perf_counter() - start_time,
             error=error,
         )
 
@@ -523,33 +735,61 @@ class Orchestrator:
         self,
         workflow_names: List[str],
         input_data: Any,
+        max_concurrency: Optional[int] = None,
     ) -> WorkflowResult:
-        """并行执行多个工作流"""
-        start_time = time.time()
-
-        tasks = [self.run(name, input_data) for name in workflow_names]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        """并行执行多个工作流
+
+        Args:
+            workflow_names: 工作流名称列表
+            input_data: 输入数据
+            max_concurrency: 同时运行的工作流上限 (默认全部同时运行)；
+                采用滑动窗口，任一工作流完成后立即启动下一个
+        """
+        start_time = time.perf_counter()
+        limit = max_concurrency or len(workflow_names) or 1
+
+        results: List[Any] = [None] * len(workflow_names)
+        pending = deque(enumerate(workflow_names))
+        active: Dict[asyncio.Task, int] = {}
+        try:
+            while pending or active:
+                while pending and len(active) < limit:
+                    index, name = pending.popleft()
+                    active[asyncio.create_task(self.run(name, input_data))] = index
+                done, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = active.pop(task)
+                    # 被单独取消的任务调用 exception() 会抛出 CancelledError
+                    if task.cancelled():
+                        results[index] = asyncio.CancelledError()
+                    else:
+                        results[index] = task.exception() or task.result()
+        finally:
+            # 被取消时等待仍在运行的工作流结束，避免遗留任务
+            for task in active:
+                task.cancel()
+            if active:
+                await asyncio.gather(*active, return_exceptions=True)
 
         all_steps = []
         outputs = {}
         all_success = True
 
-        for i, result in enumerate(results):
-            name = workflow_names[i]
-            if isinstance(result, Exception):
-                all_success = False
-            elif isinstance(result, WorkflowResult):
+        for name, result in zip(workflow_names, results):
+            if isinstance(result, WorkflowResult):
                 all_steps.extend(result.steps)
                 if result.success:
                     outputs[name] = result.final_output
                 else:
                     all_success = False
+            else:
+                all_success = False
 
         return WorkflowResult(
             success=all_success,
             steps=all_steps,
             final_output=outputs,
-            total_time=time.time() - start_time,
+            total_time=time.perf_counter() - start_time,
         )
 
 
@@ -564,6 +804,6 @@ def parallel(steps: List[Union[tuple, Step]], **kwargs) -> Parallel:
     return Parallel(steps, **kwargs)
 
 
-def router(routes: List[tuple], **kwargs) -> Router:
+def router(routes: Union[List[tuple], Dict[Hashable, Any]], **kwargs) -> Router:
     """创建路由"""
     return Router(routes, **kwargs)
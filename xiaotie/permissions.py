@@ -13,7 +13,9 @@ import re
 import time
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Set
+from functools import lru_cache
+from itertools import chain, product
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
 
 class RiskLevel(Enum):
@@ -56,6 +58,12 @@ DEFAULT_RISK_RULES: Dict[str, RiskLevel] = {
     "git_commit": RiskLevel.MEDIUM,
 }
 
+# 热路径使用的预绑定查找和枚举成员 (原地修改 DEFAULT_RISK_RULES 仍然生效)
+_get_default_risk = DEFAULT_RISK_RULES.get
+_LOW = RiskLevel.LOW
+_MEDIUM = RiskLevel.MEDIUM
+_CRITICAL = RiskLevel.CRITICAL
+
 # 危险命令模式
 DANGEROUS_PATTERNS = [
     # 删除操作
@@ -109,6 +117,70 @@ SAFE_PATTERNS = [
 ]
 
 
+# 反向引用 (\1 或 (?P=name))：合并后分组编号/名称会改变，此类模式不能合并
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _fuse_patterns(patterns: Iterable[str]) -> tuple[re.Pattern[str], ...]:
+    """编译一组模式 (忽略大小写)
+
+    能安全合并时返回单个交替正则，一次扫描完成匹配；含反向引用、内联全局
+    标志 (如 (?i)) 等无法合并的模式时逐个编译。无模式时返回空元组。
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return ()
+    if not any(_BACKREF_RE.search(p) for p in patterns):
+        try:
+            return (re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE),)
+        except re.error:
+            pass
+    return tuple(re.compile(p, re.IGNORECASE) for p in patterns)
+
+
+@lru_cache(maxsize=32)
+def _compile_patterns(patterns: tuple[str, ...]) -> tuple[re.Pattern[str], ...]:
+    """按模式元组缓存编译结果 (模式列表被修改后元组不同，自动重新编译)"""
+    return _fuse_patterns(patterns)
+
+
+# 权限决策 (哨兵对象，用 is 比较)
+_ALLOW = object()
+_DENY = object()
+_PROMPT = object()
+_DOUBLE_PROMPT = object()
+
+
+def _decide(
+    risk_level: RiskLevel,
+    interactive: bool,
+    auto_low: bool,
+    auto_medium: bool,
+    double_confirm: bool,
+) -> tuple[object, str]:
+    """非白名单、非危险操作的决策规则 (仅用于构建决策表)"""
+    if auto_low and risk_level is RiskLevel.LOW:
+        return _ALLOW, "低风险自动批准"
+    if auto_medium and risk_level is RiskLevel.MEDIUM:
+        return _ALLOW, "中风险自动批准"
+    if not interactive:
+        if risk_level in (RiskLevel.LOW, RiskLevel.MEDIUM):
+            return _ALLOW, "非交互模式自动批准"
+        return _DENY, "非交互模式拒绝高风险操作"
+    if risk_level is RiskLevel.HIGH and double_confirm:
+        return _DOUBLE_PROMPT, ""
+    return _PROMPT, ""
+
+
+# (风险等级, 交互模式, 低风险自动批准, 中风险自动批准, 高风险二次确认) -> (决策, 原因)
+# 按所有配置组合预先展开，配置在运行时修改也无需重建
+_DECISION_TABLE: Dict[tuple, tuple[object, str]] = {
+    (level, *flags): _decide(level, *flags)
+    for level in (RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH)
+    for flags in product((False, True), repeat=4)
+}
+
+
 @dataclass
 class PermissionRequest:
     """权限请求"""
@@ -143,6 +215,9 @@ class PermissionManager:
         self._session_whitelist: Set[str] = set()
         # 永久白名单
         self._permanent_whitelist: Set[str] = set()
+        # 白名单编译结果 (白名单变化后在下次检查时重建)
+        self._whitelist_res: tuple[re.Pattern[str], ...] = ()
+        self._whitelist_dirty = False
         # 审批历史
         self._approval_history: List[PermissionRequest] = []
         self._decision_history: List[Dict[str, Any]] = []
@@ -159,32 +234,39 @@ class PermissionManager:
             self._permanent_whitelist.add(pattern)
         else:
             self._session_whitelist.add(pattern)
+        self._whitelist_dirty = True
 
     def _get_risk_level(self, tool_name: str, arguments: Dict[str, Any]) -> RiskLevel:
         """获取风险等级"""
-        base_risk = DEFAULT_RISK_RULES.get(tool_name, RiskLevel.MEDIUM)
-
         # 对 bash 命令进行额外检查
         if tool_name == "bash":
             command = arguments.get("command", "")
 
-            # 检查危险模式
-            for pattern in self.deny_patterns:
-                if re.search(pattern, command, re.IGNORECASE):
-                    return RiskLevel.CRITICAL
+            # 检查危险模式 (按当前模式列表取编译结果，列表修改后自动重新编译)
+            for regex in _compile_patterns(tuple(self.deny_patterns)):
+                if regex.search(command):
+                    return _CRITICAL
 
             # 检查安全模式
-            for pattern in self.auto_approve_patterns:
-                if re.match(pattern, command, re.IGNORECASE):
-                    return RiskLevel.LOW
+            for regex in _compile_patterns(tuple(self.auto_approve_patterns)):
+                if regex.match(command):
+                    return _LOW
 
-        return base_risk
+        return _get_default_risk(tool_name, _MEDIUM)
 
     def get_risk_level(self, tool_name: str, arguments: Dict[str, Any]) -> RiskLevel:
         return self._get_risk_level(tool_name, arguments)
 
     def _is_whitelisted(self, tool_name: str, arguments: Dict[str, Any]) -> bool:
         """检查是否在白名单中"""
+        if self._whitelist_dirty:
+            self._whitelist_res = _fuse_patterns(
+                chain(self._session_whitelist, self._permanent_whitelist)
+            )
+            self._whitelist_dirty = False
+        if not self._whitelist_res:
+            return False
+
         # 构建检查字符串
         if tool_name == "bash":
             check_str = arguments.get("command", "")
@@ -192,11 +274,7 @@ class PermissionManager:
             check_str = f"{tool_name}:{arguments}"
 
         # 检查白名单
-        for pattern in self._session_whitelist | self._permanent_whitelist:
-            if re.search(pattern, check_str, re.IGNORECASE):
-                return True
-
-        return False
+        return any(regex.search(check_str) for regex in self._whitelist_res)
 
     def _format_request(self, request: PermissionRequest) -> str:
         """格式化权限请求显示"""
@@ -233,6 +311,10 @@ class PermissionManager:
         Returns:
             (是否允许, 原因)
         """
+        # 检查白名单 (白名单命中时无需计算风险和格式化描述)
+        if self._is_whitelisted(tool_name, arguments):
+            return True, "白名单"
+
         risk_level = self._get_risk_level(tool_name, arguments)
 
         # 创建请求
@@ -243,33 +325,27 @@ class PermissionManager:
             description=self._format_request_description(tool_name, arguments),
         )
 
-        # 检查白名单
-        if self._is_whitelisted(tool_name, arguments):
-            return True, "白名单"
-
-        # 低风险自动批准
-        if self.auto_approve_low_risk and risk_level == RiskLevel.LOW:
-            self._record_decision(request, True, "低风险自动批准")
-            return True, "低风险自动批准"
-
-        if self.auto_approve_medium_risk and risk_level == RiskLevel.MEDIUM:
-            self._record_decision(request, True, "中风险自动批准")
-            return True, "中风险自动批准"
-
         # 危险操作拒绝
-        if risk_level == RiskLevel.CRITICAL:
+        if risk_level is RiskLevel.CRITICAL:
             self._record_decision(request, False, "危险操作被拒绝")
             return False, f"危险操作被拒绝: {request.description}"
 
-        # 非交互模式
-        if not self.interactive:
-            if risk_level in (RiskLevel.LOW, RiskLevel.MEDIUM):
-                self._record_decision(request, True, "非交互模式自动批准")
-                return True, "非交互模式自动批准"
-            self._record_decision(request, False, "非交互模式拒绝高风险操作")
-            return False, "非交互模式拒绝高风险操作"
+        # 表键只含 True/False，配置可能被设为其他真值/假值 (如 0、1、None)
+        decision, reason = _DECISION_TABLE[
+            (
+                risk_level,
+                bool(self.interactive),
+                bool(self.auto_approve_low_risk),
+                bool(self.auto_approve_medium_risk),
+                bool(self.require_double_confirm_high_risk),
+            )
+        ]
+        if decision is _ALLOW or decision is _DENY:
+            approved = decision is _ALLOW
+            self._record_decision(request, approved, reason)
+            return approved, reason
 
-        if risk_level == RiskLevel.HIGH and self.require_double_confirm_high_risk:
+        if decision is _DOUBLE_PROMPT:
             approved, reason = await self._ask_for_approval(request)
             if not approved:
                 self._record_decision(request, False, reason)
@@ -5,7 +5,26 @@
 使用方法:
 1. 在 ~/.xiaotie/plugins/ 目录下创建 Python 文件
 2. 定义继承自 Tool 的类
-3. 启动时自动发现和加载
+3. 启动时自动发现，首次调用工具时才导入插件模块
+
+插件的工具元数据 (name/description/parameters) 优先从同名 .toml 清单读取，
+否则通过 AST 静态解析插件源码获得；两者都无法得到时回退为立即导入。
+
+可选的 TOML 清单:
+```toml
+# ~/.xiaotie/plugins/my_tool.toml
+[[tools]]
+class = "MyCustomTool"
+name = "my_tool"
+description = "我的自定义工具"
+
+[tools.parameters]
+type = "object"
+required = ["input"]
+
+[tools.parameters.properties.input]
+type = "string"
+```
 
 示例插件:
 ```python
@@ -38,13 +57,95 @@ class MyCustomTool(Tool):
 
 from __future__ import annotations
 
+import ast
 import importlib.util
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional
 
+from .schema import ToolResult
 from .tools.base import Tool
 
+try:
+    import tomllib
+except ImportError:  # Python 3.10: 没有 tomllib 时只使用 AST 解析
+    tomllib = None
+
+
+@dataclass
+class PluginManifest:
+    """插件工具元数据 (无需导入插件模块即可注册工具)"""
+
+    name: str
+    description: str
+    parameters: dict
+    module_path: Path
+    class_name: str
+
+
+class LazyToolProxy(Tool):
+    """延迟加载的插件工具
+
+    注册时只持有清单中的元数据，首次执行时才导入插件模块并实例化真正的工具。
+    """
+
+    def __init__(self, manager: "PluginManager", manifest: PluginManifest):
+        super().__init__()
+        self._manager = manager
+        self._manifest = manifest
+        self._tool: Optional[Tool] = None
+
+    @property
+    def name(self) -> str:
+        return self._manifest.name
+
+    @property
+    def description(self) -> str:
+        return self._manifest.description
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return self._manifest.parameters
+
+    @property
+    def is_loaded(self) -> bool:
+        """插件模块是否已导入"""
+        return self._tool is not None
+
+    def resolve(self) -> Tool:
+        """导入插件模块并返回真正的工具实例 (结果会缓存)"""
+        if self._tool is None:
+            module = self._manager._import_plugin(self._manifest.module_path)
+            tool = getattr(module, self._manifest.class_name)()
+            tool.agent = self.agent
+            self._tool = tool
+        return self._tool
+
+    async def execute(self, **kwargs) -> ToolResult:
+        try:
+            tool = self.resolve()
+        except Exception as e:
+            return ToolResult(success=False, error=f"加载插件工具 {self.name} 失败: {e}")
+        return await tool.execute(**kwargs)
+
+
+def _is_tool_base(node: ast.expr) -> bool:
+    """基类表达式是否为 Tool (Tool 或 xxx.Tool)"""
+    if isinstance(node, ast.Name):
+        return node.id == "Tool"
+    return isinstance(node, ast.Attribute) and node.attr == "Tool"
+
+
+def _static_return(func: ast.FunctionDef) -> Any:
+    """返回函数体中唯一 return 语句的字面量值 (非字面量时抛出 ValueError)"""
+    body = func.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]  # 跳过文档字符串
+    if len(body) != 1 or not isinstance(body[0], ast.Return) or body[0].value is None:
+        raise ValueError(f"{func.name} 不是单一 return 语句")
+    return ast.literal_eval(body[0].value)
+
 
 class PluginManager:
     """插件管理器"""
@@ -63,6 +164,13 @@ class PluginManager:
         self.plugin_dirs = plugin_dirs or self.DEFAULT_PLUGIN_DIRS
         self._loaded_tools: dict[str, Tool] = {}
         self._loaded_modules: dict[str, object] = {}
+        # 模块名 -> 该模块执行时定义的 Tool 子类 (按定义顺序)
+        self._module_tool_classes: dict[str, List[type]] = {}
+        # load_all_plugins 期间缓存的加载信息，结束后一次性输出
+        self._pending_messages: Optional[List[str]] = None
+        # 插件文件修改时间 (含 .toml 清单) 及对应工具，文件未变化时直接复用
+        self._mtimes: dict[Path, tuple[int, Optional[int]]] = {}
+        self._tools_by_path: dict[Path, List[Tool]] = {}
 
     def discover_plugins(self) -> List[Path]:
         """发现所有插件文件"""
@@ -80,54 +188,185 @@ class PluginManager:
 
         return plugin_files
 
+    def read_manifests(self, plugin_path: Path) -> Optional[List[PluginManifest]]:
+        """读取插件工具元数据 (不执行插件代码)
+
+        优先读取同名 .toml 清单，否则静态解析源码中直接继承 Tool 的类。
+        存在继承本文件其他类的类时无法静态确定，返回 None。
+
+        Returns:
+            元数据列表；无法静态确定时返回 None (需要立即导入)
+        """
+        toml_path = plugin_path.with_suffix(".toml")
+        if tomllib is not None and toml_path.exists():
+            try:
+                with toml_path.open("rb") as f:
+                    data = tomllib.load(f)
+                return [
+                    PluginManifest(
+                        name=entry["name"],
+                        description=entry.get("description", ""),
+                        parameters=entry.get("parameters", {"type": "object", "properties": {}}),
+                        module_path=plugin_path,
+                        class_name=entry["class"],
+                    )
+                    for entry in data.get("tools", [])
+                ] or None
+            except (OSError, KeyError, TypeError, tomllib.TOMLDecodeError):
+                return None
+
+        try:
+            tree = ast.parse(plugin_path.read_text(encoding="utf-8"), filename=str(plugin_path))
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+        manifests = []
+        local_classes: set[str] = set()
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            # 继承本文件中定义的类 (如 class BTool(ATool)) 时无法静态确定是否为工具
+            if any(isinstance(base, ast.Name) and base.id in local_classes for base in node.bases):
+                return None
+            local_classes.add(node.name)
+            if node.name.startswith("_"):
+                continue
+            if not any(_is_tool_base(base) for base in node.bases):
+                continue
+            props = {
+                item.name: item
+                for item in node.body
+                if isinstance(item, ast.FunctionDef)
+                and item.name in ("name", "description", "parameters")
+            }
+            if len(props) != 3:
+                return None
+            try:
+                manifests.append(
+                    PluginManifest(
+                        name=_static_return(props["name"]),
+                        description=_static_return(props["description"]),
+                        parameters=_static_return(props["parameters"]),
+                        module_path=plugin_path,
+                        class_name=node.name,
+                    )
+                )
+            except ValueError:
+                return None
+
+        return manifests or None
+
+    def _import_plugin(self, plugin_path: Path) -> Any:
+        """导入插件模块 (同一文件只执行一次)"""
+        module_name = f"xiaotie_plugin_{plugin_path.stem}"
+        module = self._loaded_modules.get(module_name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.spec_from_file_location(module_name, plugin_path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"无法加载插件: {plugin_path}")
+
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        # 仅在执行模块期间收集新定义的 Tool 子类，结束后恢复 (支持嵌套导入)
+        collected: List[type] = []
+        previous, Tool._collector = Tool._collector, collected
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            Tool._collector = previous
+            if previous is not None:
+                previous.extend(collected)
+
+        self._loaded_modules[module_name] = module
+        self._module_tool_classes[module_name] = [
+            cls for cls in collected if cls.__module__ == module_name
+        ]
+        return module
+
     def load_plugin(self, plugin_path: Path) -> List[Tool]:
         """加载单个插件文件
 
+        能静态获取工具元数据时注册延迟加载代理，否则立即导入模块。
+
         Args:
             plugin_path: 插件文件路径
 
         Returns:
             加载的工具列表
         """
-        tools = []
+        try:
+            mtime = self._plugin_mtime(plugin_path)
+        except OSError as e:
+            self._report(f"⚠️ 加载插件 {plugin_path.name} 失败: {e}")
+            return []
+        cached = self._mtimes.get(plugin_path)
+        if cached == mtime:
+            return self._tools_by_path[plugin_path]
+        if cached is not None:
+            # 文件已修改: 丢弃旧模块和旧工具，避免继续执行过期代码
+            self._unload_plugin(plugin_path)
+
+        manifests = self.read_manifests(plugin_path)
+        if manifests is not None:
+            tools: List[Tool] = []
+            for manifest in manifests:
+                proxy = LazyToolProxy(self, manifest)
+                tools.append(proxy)
+                self._loaded_tools[proxy.name] = proxy
+                self._report(f"  ✓ 注册工具: {proxy.name}")
+        else:
+            tools = self._load_plugin_eager(plugin_path)
+
+        # 加载失败的插件不缓存，下次调用时重试
+        if tools:
+            self._mtimes[plugin_path] = mtime
+            self._tools_by_path[plugin_path] = tools
+        return tools
 
+    def _unload_plugin(self, plugin_path: Path) -> None:
+        """卸载插件模块，并移除其注册的工具和缓存"""
+        module_name = f"xiaotie_plugin_{plugin_path.stem}"
+        sys.modules.pop(module_name, None)
+        self._loaded_modules.pop(module_name, None)
+        self._module_tool_classes.pop(module_name, None)
+        self._mtimes.pop(plugin_path, None)
+        for tool in self._tools_by_path.pop(plugin_path, ()):
+            if self._loaded_tools.get(tool.name) is tool:
+                del self._loaded_tools[tool.name]
+
+    @staticmethod
+    def _plugin_mtime(plugin_path: Path) -> tuple[int, Optional[int]]:
+        """插件文件及其 .toml 清单的修改时间 (纳秒)"""
         try:
-            # 动态导入模块
-            module_name = f"xiaotie_plugin_{plugin_path.stem}"
-            spec = importlib.util.spec_from_file_location(module_name, plugin_path)
+            toml_mtime: Optional[int] = plugin_path.with_suffix(".toml").stat().st_mtime_ns
+        except OSError:
+            toml_mtime = None
+        return plugin_path.stat().st_mtime_ns, toml_mtime
 
-            if spec is None or spec.loader is None:
-                print(f"⚠️ 无法加载插件: {plugin_path}")
-                return tools
+    def _load_plugin_eager(self, plugin_path: Path) -> List[Tool]:
+        """立即导入插件模块并实例化其中的工具"""
+        tools = []
 
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
+        try:
+            module = self._import_plugin(plugin_path)
 
-            self._loaded_modules[module_name] = module
-
-            # 查找所有 Tool 子类
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-
-                # 检查是否是 Tool 的子类（但不是 Tool 本身）
-                if (
-                    isinstance(attr, type)
-                    and issubclass(attr, Tool)
-                    and attr is not Tool
-                    and not attr_name.startswith("_")
-                ):
-                    try:
-                        # 实例化工具
-                        tool_instance = attr()
-                        tools.append(tool_instance)
-                        self._loaded_tools[tool_instance.name] = tool_instance
-                        print(f"  ✓ 加载工具: {tool_instance.name}")
-                    except Exception as e:
-                        print(f"  ✗ 实例化工具 {attr_name} 失败: {e}")
+            # 模块中定义的 Tool 子类 (执行模块期间由 Tool.__init_subclass__ 收集)
+            for tool_cls in self._module_tool_classes[module.__name__]:
+                if tool_cls.__name__.startswith("_"):
+                    continue
+                try:
+                    # 实例化工具
+                    tool_instance = tool_cls()
+                    tools.append(tool_instance)
+                    self._loaded_tools[tool_instance.name] = tool_instance
+                    self._report(f"  ✓ 加载工具: {tool_instance.name}")
+                except Exception as e:
+                    self._report(f"  ✗ 实例化工具 {tool_cls.__name__} 失败: {e}")
 
         except Exception as e:
-            print(f"⚠️ 加载插件 {plugin_path.name} 失败: {e}")
+            self._report(f"⚠️ 加载插件 {plugin_path.name} 失败: {e}")
 
         return tools
 
@@ -143,14 +382,25 @@ class PluginManager:
         if not plugin_files:
             return all_tools
 
-        print(f"📦 发现 {len(plugin_files)} 个插件...")
-
-        for plugin_path in plugin_files:
-            tools = self.load_plugin(plugin_path)
-            all_tools.extend(tools)
+        # 逐条 print 会在终端上反复写入和刷新，这里收集后一次性输出
+        self._pending_messages = messages = [f"📦 发现 {len(plugin_files)} 个插件..."]
+        try:
+            for plugin_path in plugin_files:
+                tools = self.load_plugin(plugin_path)
+                all_tools.extend(tools)
+        finally:
+            self._pending_messages = None
+            print("\n".join(messages))
 
         return all_tools
 
+    def _report(self, message: str) -> None:
+        """输出加载信息 (批量加载期间先缓存)"""
+        if self._pending_messages is not None:
+            self._pending_messages.append(message)
+        else:
+            print(message)
+
     def get_loaded_tools(self) -> dict[str, Tool]:
         """获取所有已加载的工具"""
         return self._loaded_tools.copy()
@@ -168,12 +418,8 @@ class PluginManager:
         for plugin_dir in self.plugin_dirs:
             plugin_path = plugin_dir / f"{plugin_name}.py"
             if plugin_path.exists():
-                # 卸载旧模块
-                module_name = f"xiaotie_plugin_{plugin_name}"
-                if module_name in sys.modules:
-                    del sys.modules[module_name]
-                if module_name in self._loaded_modules:
-                    del self._loaded_modules[module_name]
+                # 卸载旧模块并清除缓存，强制重新加载
+                self._unload_plugin(plugin_path)
 
                 # 重新加载
                 tools = self.load_plugin(plugin_path)
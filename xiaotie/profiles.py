@@ -9,16 +9,14 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import yaml
-
 from .llm.providers import MIMO_DEFAULT_MODEL
 
 
-@dataclass
+@dataclass(slots=True)
 class ProfileConfig:
     """Profile 配置"""
 
@@ -75,6 +73,12 @@ class ProfileConfig:
     env: Dict[str, str] = field(default_factory=dict)
 
 
+# 运行时配置可以覆盖的 ProfileConfig 字段 (随字段定义自动更新)
+_MERGEABLE_FIELDS = frozenset(
+    f.name for f in fields(ProfileConfig) if f.name not in ("name", "description", "env")
+)
+
+
 class ProfileManager:
     """Profile 管理器"""
 
@@ -86,6 +90,8 @@ class ProfileManager:
 
         self.profiles_dir.mkdir(parents=True, exist_ok=True)
         self._profiles: Dict[str, ProfileConfig] = {}
+        # profile 名 -> 缓存对应的文件 st_mtime_ns
+        self._profile_mtimes: Dict[str, int] = {}
         self._current_profile: Optional[str] = None
 
     def _get_profile_path(self, name: str) -> Path:
@@ -100,17 +106,25 @@ class ProfileManager:
         return sorted(profiles)
 
     def load_profile(self, name: str) -> ProfileConfig:
-        """加载 profile"""
+        """加载 profile (文件未修改时直接返回缓存)"""
+        path = self._get_profile_path(name)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Profile 不存在: {name}") from None
+
         # 检查缓存
-        if name in self._profiles:
-            return self._profiles[name]
+        cached = self._profiles.get(name)
+        if cached is not None and self._profile_mtimes.get(name) == mtime:
+            return cached
 
-        path = self._get_profile_path(name)
-        if not path.exists():
-            raise FileNotFoundError(f"Profile 不存在: {name}")
+        # 延迟导入：只有真正读写 profile 文件时才加载 PyYAML
+        import yaml
 
+        # 有 libyaml 时用 C 实现的加载器，比纯 Python 的 SafeLoader 快数倍
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
         with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
+            data = yaml.load(f, Loader=loader) or {}
 
         # 处理环境变量引用
         data = self._expand_env_vars(data)
@@ -118,6 +132,7 @@ class ProfileManager:
         # 创建配置
         config = ProfileConfig(name=name, **data)
         self._profiles[name] = config
+        self._profile_mtimes[name] = mtime
 
         return config
 
@@ -161,11 +176,14 @@ class ProfileManager:
         if config.env:
             data["env"] = config.env
 
+        import yaml
+
         with open(path, "w", encoding="utf-8") as f:
             yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
 
         # 更新缓存
         self._profiles[config.name] = config
+        self._profile_mtimes[config.name] = path.stat().st_mtime_ns
 
     def delete_profile(self, name: str):
         """删除 profile"""
@@ -173,6 +191,7 @@ class ProfileManager:
         if path.exists():
             path.unlink()
         self._profiles.pop(name, None)
+        self._profile_mtimes.pop(name, None)
 
     def create_default_profile(self) -> ProfileConfig:
         """创建默认 profile"""
@@ -203,52 +222,34 @@ class ProfileManager:
         return None
 
     def _expand_env_vars(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """展开环境变量引用"""
-        result = {}
+        """展开环境变量引用
+
+        只处理整串 ``${VAR}`` 形式，用 str 方法判断而非正则。
+        写时复制：没有需要展开的值时原样返回 data，不逐层重建字典。
+        """
+        result = None
         for key, value in data.items():
-            if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
-                env_var = value[2:-1]
-                result[key] = os.environ.get(env_var, "")
+            if isinstance(value, str):
+                if not (value.startswith("${") and value.endswith("}")):
+                    continue
+                expanded = os.environ.get(value[2:-1], "")
             elif isinstance(value, dict):
-                result[key] = self._expand_env_vars(value)
+                expanded = self._expand_env_vars(value)
+                if expanded is value:
+                    continue
             else:
-                result[key] = value
-        return result
+                continue
+
+            if result is None:
+                result = dict(data)
+            result[key] = expanded
+        return data if result is None else result
 
     def merge_with_config(self, profile: ProfileConfig, config: Dict[str, Any]) -> ProfileConfig:
-        """合并 profile 和运行时配置"""
-        # 创建副本
-        merged = ProfileConfig(
-            name=profile.name,
-            description=profile.description,
-            provider=config.get("provider", profile.provider),
-            model=config.get("model", profile.model),
-            api_key=config.get("api_key", profile.api_key),
-            api_base=config.get("api_base", profile.api_base),
-            temperature=config.get("temperature", profile.temperature),
-            max_tokens=config.get("max_tokens", profile.max_tokens),
-            system_prompt=config.get("system_prompt", profile.system_prompt),
-            system_prompt_path=config.get("system_prompt_path", profile.system_prompt_path),
-            max_steps=config.get("max_steps", profile.max_steps),
-            token_limit=config.get("token_limit", profile.token_limit),
-            stream=config.get("stream", profile.stream),
-            enable_thinking=config.get("enable_thinking", profile.enable_thinking),
-            parallel_tools=config.get("parallel_tools", profile.parallel_tools),
-            auto_lint=config.get("auto_lint", profile.auto_lint),
-            auto_test=config.get("auto_test", profile.auto_test),
-            auto_approve_low_risk=config.get(
-                "auto_approve_low_risk", profile.auto_approve_low_risk
-            ),
-            interactive_permissions=config.get(
-                "interactive_permissions", profile.interactive_permissions
-            ),
-            enabled_tools=config.get("enabled_tools", profile.enabled_tools),
-            disabled_tools=config.get("disabled_tools", profile.disabled_tools),
-            lint_cmd=config.get("lint_cmd", profile.lint_cmd),
-            test_cmd=config.get("test_cmd", profile.test_cmd),
-            env={**profile.env, **config.get("env", {})},
-        )
-        return merged
+        """合并 profile 和运行时配置 (name/description 保持不变，env 逐键合并)"""
+        updates = {key: value for key, value in config.items() if key in _MERGEABLE_FIELDS}
+        updates["env"] = {**profile.env, **config.get("env", {})}
+        return replace(profile, **updates)
 
 
 # 预设 Profiles
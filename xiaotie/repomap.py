@@ -9,11 +9,18 @@
 
 from __future__ import annotations
 
+import ast
+import hashlib
+import heapq
+import json
 import os
 import re
-from dataclasses import dataclass, field
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 # 常见的忽略模式
 DEFAULT_IGNORE_PATTERNS = {
@@ -117,7 +124,59 @@ IMPORTANT_FILES = {
 }
 
 
-@dataclass
+# 代码概览中各类定义的图标
+_KIND_ICONS = {"class": "📦", "function": "🔧", "method": "🔹"}
+
+# 不忽略的隐藏文件
+_KEEP_HIDDEN = frozenset({".env.example", ".gitignore"})
+
+# 扫描结果磁盘缓存目录
+DEFAULT_CACHE_DIR = Path.home() / ".xiaotie" / "cache"
+_CACHE_VERSION = 1
+
+# 待解析文件达到该数量时才启用线程池并发读取 (文件读取期间释放 GIL)
+_PARALLEL_READ_THRESHOLD = 16
+_MAX_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 代码定义匹配模式 (模块加载时编译一次；各模式合并为一个分支正则，一次扫描全文)
+_PY_DEF_RE = re.compile(
+    r"^class\s+(?P<cls>\w+)(?:\([^)]*\))?:"
+    r"|^(?:async\s+)?def\s+(?P<fn>\w+)\s*\([^)]*\)(?:\s*->\s*[^:]+)?:",
+    re.MULTILINE,
+)
+_JS_DEF_RE = re.compile(
+    r"(?:export\s+)?class\s+(?P<cls>\w+)(?:\s+extends\s+\w+)?(?:\s+implements\s+[\w,\s]+)?\s*\{"
+    r"|(?:export\s+)?(?:async\s+)?function\s+(?P<fn>\w+)\s*\("
+    r"|(?:export\s+)?const\s+(?P<arrow>\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>"
+    r"|(?:export\s+)?const\s+(?P<fexpr>\w+)\s*=\s*(?:async\s+)?function"
+)
+
+
+def _read_bytes(file_info: FileInfo) -> Optional[bytes]:
+    """按字节读取文件内容，失败时返回 None"""
+    try:
+        with open(file_info.path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class _LineIndex:
+    """字符偏移 -> 行号 (换行位置只在首次查询时计算一次，之后二分查找)"""
+
+    __slots__ = ("_content", "_newlines")
+
+    def __init__(self, content: str):
+        self._content = content
+        self._newlines: Optional[List[int]] = None
+
+    def __call__(self, pos: int) -> int:
+        if self._newlines is None:
+            self._newlines = [m.start() for m in re.finditer("\n", self._content)]
+        return bisect_left(self._newlines, pos) + 1
+
+
+@dataclass(slots=True)
 class CodeDefinition:
     """代码定义"""
 
@@ -128,7 +187,7 @@ class CodeDefinition:
     signature: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class FileInfo:
     """文件信息"""
 
@@ -148,68 +207,138 @@ class RepoMap:
         workspace_dir: str,
         ignore_patterns: Optional[Set[str]] = None,
         max_file_size: int = 100_000,  # 100KB
+        cache_dir: Optional[Union[str, Path]] = None,
     ):
+        """
+        Args:
+            workspace_dir: 工作目录
+            ignore_patterns: 忽略模式
+            max_file_size: 超过该大小的文件不扫描
+            cache_dir: 扫描结果磁盘缓存目录，None 表示不落盘 (如 DEFAULT_CACHE_DIR)
+        """
         self.workspace = Path(workspace_dir).absolute()
         self.ignore_patterns = ignore_patterns or DEFAULT_IGNORE_PATTERNS
         self.max_file_size = max_file_size
+        self._ignore_suffixes = tuple(p[1:] for p in self.ignore_patterns if p.startswith("*"))
         self._cache: Dict[str, FileInfo] = {}
+        # 相对路径 -> ((st_mtime_ns, st_size), FileInfo)，文件未变化时直接复用
+        self._known: Dict[str, Tuple[Tuple[int, int], FileInfo]] = {}
+        # find_relevant_files 用的预先小写化的索引，随扫描结果失效
+        self._search_index: Optional[List[Tuple[FileInfo, str, str, Tuple[str, ...], str]]] = None
+        self._cache_file: Optional[Path] = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(str(self.workspace).encode("utf-8")).hexdigest()
+            self._cache_file = Path(cache_dir).expanduser() / f"repomap_{digest}.json"
+            self._load_disk_cache()
+
+    def _load_disk_cache(self) -> None:
+        """从磁盘加载上次的扫描结果 (损坏或版本不符时忽略)"""
+        try:
+            with open(self._cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _CACHE_VERSION:
+                return
+            known = {}
+            for relative_path, (stamp, info) in data["files"].items():
+                info["definitions"] = [CodeDefinition(**d) for d in info["definitions"]]
+                known[relative_path] = (tuple(stamp), FileInfo(**info))
+        except (OSError, ValueError, TypeError, KeyError):
+            return
+        self._known = known
+
+    def _save_disk_cache(self) -> None:
+        """把扫描结果写回磁盘 (先写临时文件再替换，失败时静默忽略)"""
+        data = {
+            "version": _CACHE_VERSION,
+            "files": {
+                relative_path: [list(stamp), asdict(info)]
+                for relative_path, (stamp, info) in self._known.items()
+            },
+        }
+        tmp_path = self._cache_file.with_suffix(".tmp")
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self._cache_file)
+        except OSError:
+            pass
 
     def _should_ignore(self, path: Path) -> bool:
         """检查是否应该忽略"""
-        name = path.name
+        return self._should_ignore_name(path.name)
 
-        # 检查目录/文件名
-        if name in self.ignore_patterns:
+    def _should_ignore_name(self, name: str) -> bool:
+        """按文件/目录名检查是否应该忽略"""
+        # 检查目录/文件名；通配符模式 (*.xxx) 用一次 str.endswith(tuple) 判断
+        if name in self.ignore_patterns or name.endswith(self._ignore_suffixes):
             return True
 
-        # 检查通配符模式
-        for pattern in self.ignore_patterns:
-            if pattern.startswith("*") and name.endswith(pattern[1:]):
-                return True
-
         # 检查隐藏文件（除了重要的配置文件）
-        if name.startswith(".") and name not in {".env.example", ".gitignore"}:
-            return True
-
-        return False
+        return name.startswith(".") and name not in _KEEP_HIDDEN
 
     def _is_code_file(self, path: Path) -> bool:
         """检查是否是代码文件"""
         return path.suffix.lower() in CODE_EXTENSIONS
 
     def _extract_python_definitions(self, content: str, file_path: str) -> List[CodeDefinition]:
-        """提取 Python 代码定义"""
+        """提取 Python 代码定义
+
+        用 ast 解析一次即可拿到准确的类/函数/方法及行号，只遍历模块顶层和类体，
+        嵌套闭包不计入。源码有语法错误时回退到正则匹配。
+        """
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return self._extract_python_definitions_regex(content, file_path)
+
         definitions = []
+        lines = content.splitlines()
 
-        # 匹配类定义
-        class_pattern = r"^class\s+(\w+)(?:\([^)]*\))?:"
-        for match in re.finditer(class_pattern, content, re.MULTILINE):
-            line_num = content[: match.start()].count("\n") + 1
+        def add(node: ast.AST, kind: str) -> None:
+            header = lines[node.lineno - 1].strip() if node.lineno <= len(lines) else ""
             definitions.append(
                 CodeDefinition(
-                    name=match.group(1),
-                    kind="class",
+                    name=node.name,
+                    kind=kind,
                     file_path=file_path,
-                    line_number=line_num,
-                    signature=match.group(0).rstrip(":"),
+                    line_number=node.lineno,
+                    signature=header.rstrip(":"),
                 )
             )
 
-        # 匹配函数定义
-        func_pattern = r"^(?:async\s+)?def\s+(\w+)\s*\([^)]*\)(?:\s*->\s*[^:]+)?:"
-        for match in re.finditer(func_pattern, content, re.MULTILINE):
-            line_num = content[: match.start()].count("\n") + 1
-            # 检查是否是方法（缩进）
-            line_start = content.rfind("\n", 0, match.start()) + 1
-            indent = match.start() - line_start
-            kind = "method" if indent > 0 else "function"
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                add(node, "class")
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        add(child, "method")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(node, "function")
+
+        return definitions
+
+    def _extract_python_definitions_regex(
+        self, content: str, file_path: str
+    ) -> List[CodeDefinition]:
+        """提取 Python 代码定义 (正则回退，用于无法解析的源码)"""
+        definitions = []
+        line_of = _LineIndex(content)
+
+        for match in _PY_DEF_RE.finditer(content):
+            if match.lastgroup == "cls":
+                kind = "class"
+            else:
+                # 检查是否是方法（缩进）
+                line_start = content.rfind("\n", 0, match.start()) + 1
+                kind = "method" if match.start() > line_start else "function"
 
             definitions.append(
                 CodeDefinition(
-                    name=match.group(1),
+                    name=match.group(match.lastgroup),
                     kind=kind,
                     file_path=file_path,
-                    line_number=line_num,
+                    line_number=line_of(match.start()),
                     signature=match.group(0).rstrip(":"),
                 )
             )
@@ -219,40 +348,18 @@ class RepoMap:
     def _extract_js_definitions(self, content: str, file_path: str) -> List[CodeDefinition]:
         """提取 JavaScript/TypeScript 代码定义"""
         definitions = []
+        line_of = _LineIndex(content)
 
-        # 匹配类定义
-        class_pattern = (
-            r"(?:export\s+)?class\s+(\w+)(?:\s+extends\s+\w+)?(?:\s+implements\s+[\w,\s]+)?\s*\{"
-        )
-        for match in re.finditer(class_pattern, content):
-            line_num = content[: match.start()].count("\n") + 1
+        for match in _JS_DEF_RE.finditer(content):
             definitions.append(
                 CodeDefinition(
-                    name=match.group(1),
-                    kind="class",
+                    name=match.group(match.lastgroup),
+                    kind="class" if match.lastgroup == "cls" else "function",
                     file_path=file_path,
-                    line_number=line_num,
+                    line_number=line_of(match.start()),
                 )
             )
 
-        # 匹配函数定义
-        func_patterns = [
-            r"(?:export\s+)?(?:async\s+)?function\s+(\w+)\s*\(",
-            r"(?:export\s+)?const\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>",
-            r"(?:export\s+)?const\s+(\w+)\s*=\s*(?:async\s+)?function",
-        ]
-        for pattern in func_patterns:
-            for match in re.finditer(pattern, content):
-                line_num = content[: match.start()].count("\n") + 1
-                definitions.append(
-                    CodeDefinition(
-                        name=match.group(1),
-                        kind="function",
-                        file_path=file_path,
-                        line_number=line_num,
-                    )
-                )
-
         return definitions
 
     def _extract_definitions(self, content: str, file_path: str) -> List[CodeDefinition]:
@@ -266,51 +373,104 @@ class RepoMap:
 
         return []
 
-    def scan_files(self) -> List[FileInfo]:
-        """扫描工作目录中的文件"""
-        files = []
-
-        for root, dirs, filenames in os.walk(self.workspace):
-            # 过滤目录
-            dirs[:] = [d for d in dirs if not self._should_ignore(Path(root) / d)]
+    def _iter_entries(self, dir_path: str) -> Iterator[os.DirEntry]:
+        """递归遍历目录中未被忽略的文件 (先当前目录文件，再子目录)
 
-            for filename in filenames:
-                file_path = Path(root) / filename
+        使用 os.scandir，DirEntry 自带类型信息与 stat 缓存，避免逐个构造 Path 和额外 stat。
+        """
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if self._should_ignore_name(entry.name):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            # 与 os.walk 一致：不进入目录符号链接
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            return
+
+        for subdir in subdirs:
+            yield from self._iter_entries(subdir)
+
+    def _load_definitions(self, file_info: FileInfo, data: Optional[bytes]) -> None:
+        """根据文件内容填充行数和代码定义 (读取失败时保持为空)"""
+        if data is None:
+            return
+        try:
+            # 行数直接在 bytes 上统计，解码只做一次
+            file_info.lines = data.count(b"\n") + 1
+            content = data.decode("utf-8", errors="ignore")
+            file_info.definitions = self._extract_definitions(content, file_info.relative_path)
+        except Exception:
+            pass
 
-                if self._should_ignore(file_path):
-                    continue
+    def scan_files(self) -> List[FileInfo]:
+        """扫描工作目录中的文件
 
-                try:
-                    stat = file_path.stat()
-                    if stat.st_size > self.max_file_size:
-                        continue
+        按 (mtime, size) 判断文件是否变化：未变化的文件复用上次的 FileInfo，
+        不再读取和解析；有变化时刷新内存缓存，并在配置了 cache_dir 时写回磁盘。
+        先遍历目录，再统一读取需要解析的代码文件，数量较多时用线程池并发读取。
+        """
+        files = []
+        pending: List[FileInfo] = []
+        known: Dict[str, Tuple[Tuple[int, int], FileInfo]] = {}
+        changed = False
+        prefix_len = len(os.path.join(str(self.workspace), ""))
 
-                    relative_path = str(file_path.relative_to(self.workspace))
-                    is_important = filename in IMPORTANT_FILES
+        for entry in self._iter_entries(str(self.workspace)):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            size = st.st_size
+            if size > self.max_file_size:
+                continue
 
-                    file_info = FileInfo(
-                        path=str(file_path),
-                        relative_path=relative_path,
-                        size=stat.st_size,
-                        is_important=is_important,
-                    )
+            relative_path = entry.path[prefix_len:]
+            stamp = (st.st_mtime_ns, size)
+            previous = self._known.get(relative_path)
+            if previous is not None and previous[0] == stamp:
+                file_info = previous[1]
+            else:
+                changed = True
+                file_info = FileInfo(
+                    path=entry.path,
+                    relative_path=relative_path,
+                    size=size,
+                    is_important=entry.name in IMPORTANT_FILES,
+                )
 
-                    # 对代码文件提取定义
-                    if self._is_code_file(file_path):
-                        try:
-                            content = file_path.read_text(encoding="utf-8", errors="ignore")
-                            file_info.lines = content.count("\n") + 1
-                            file_info.definitions = self._extract_definitions(
-                                content, relative_path
-                            )
-                        except Exception:
-                            pass
-
-                    files.append(file_info)
-                    self._cache[relative_path] = file_info
-
-                except (OSError, PermissionError):
-                    continue
+                # 对代码文件提取定义
+                if os.path.splitext(entry.name)[1].lower() in CODE_EXTENSIONS:
+                    pending.append(file_info)
+
+            known[relative_path] = (stamp, file_info)
+            files.append(file_info)
+
+        if len(pending) >= _PARALLEL_READ_THRESHOLD:
+            # 线程池只负责读文件 (I/O 期间释放 GIL)，解析在当前线程按顺序进行，
+            # 后续文件的读取与前面文件的解析重叠
+            with ThreadPoolExecutor(max_workers=_MAX_READ_WORKERS) as pool:
+                for file_info, data in zip(pending, pool.map(_read_bytes, pending)):
+                    self._load_definitions(file_info, data)
+        else:
+            for file_info in pending:
+                self._load_definitions(file_info, _read_bytes(file_info))
+
+        # 已删除的文件不再保留
+        changed = changed or len(known) != len(self._known)
+        self._known = known
+        self._cache = {relative_path: info for relative_path, (_, info) in known.items()}
+        self._search_index = None
+        if changed and self._cache_file is not None:
+            self._save_disk_cache()
 
         return files
 
@@ -318,35 +478,40 @@ class RepoMap:
         """生成目录树"""
         lines = [f"📁 {self.workspace.name}/"]
 
-        def add_tree(path: Path, prefix: str, depth: int):
+        def add_tree(path: str, prefix: str, depth: int):
             if depth > max_depth:
                 return
 
+            # os.scandir 的 DirEntry 缓存了类型信息，排序和判断目录时不再逐个 stat；
+            # 先过滤再排序，每个条目只判断一次是否为目录
             try:
-                items = sorted(path.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-            except PermissionError:
+                with os.scandir(path) as it:
+                    items = [
+                        (not entry.is_dir(), entry.name.lower(), entry)
+                        for entry in it
+                        if not self._should_ignore_name(entry.name)
+                    ]
+            except OSError:
                 return
+            items.sort(key=lambda item: item[:2])
 
-            # 过滤
-            items = [i for i in items if not self._should_ignore(i)]
-
-            for i, item in enumerate(items):
-                is_last = i == len(items) - 1
+            last = len(items) - 1
+            for i, (is_file, _, entry) in enumerate(items):
+                is_last = i == last
                 connector = "└── " if is_last else "├── "
-                new_prefix = prefix + ("    " if is_last else "│   ")
 
-                if item.is_dir():
-                    lines.append(f"{prefix}{connector}📁 {item.name}/")
-                    add_tree(item, new_prefix, depth + 1)
+                if not is_file:
+                    lines.append(f"{prefix}{connector}📁 {entry.name}/")
+                    add_tree(entry.path, prefix + ("    " if is_last else "│   "), depth + 1)
                 else:
                     icon = "📄"
-                    if item.name in IMPORTANT_FILES:
+                    if entry.name in IMPORTANT_FILES:
                         icon = "⭐"
-                    elif self._is_code_file(item):
+                    elif os.path.splitext(entry.name)[1].lower() in CODE_EXTENSIONS:
                         icon = "📝"
-                    lines.append(f"{prefix}{connector}{icon} {item.name}")
+                    lines.append(f"{prefix}{connector}{icon} {entry.name}")
 
-        add_tree(self.workspace, "", 1)
+        add_tree(str(self.workspace), "", 1)
         return "\n".join(lines)
 
     def get_repo_map(self, max_tokens: int = 2000) -> str:
@@ -386,23 +551,26 @@ class RepoMap:
             if not file_info.definitions:
                 continue
 
-            file_section = [f"### {file_info.relative_path}"]
+            # 边生成边累计 token，超出预算立即停止，不再生成本节剩余内容
+            header = f"### {file_info.relative_path}"
+            file_section = [header]
+            budget = max_tokens - current_tokens - len(header) // 4
             for defn in file_info.definitions:
-                if defn.kind == "class":
-                    file_section.append(f"  - 📦 `{defn.name}` (class, L{defn.line_number})")
-                elif defn.kind == "function":
-                    file_section.append(f"  - 🔧 `{defn.name}` (function, L{defn.line_number})")
-                elif defn.kind == "method":
-                    file_section.append(f"  - 🔹 `{defn.name}` (method, L{defn.line_number})")
-
-            section_tokens = sum(len(line) // 4 for line in file_section)
+                icon = _KIND_ICONS.get(defn.kind)
+                if icon is None:
+                    continue
+                line = f"  - {icon} `{defn.name}` ({defn.kind}, L{defn.line_number})"
+                budget -= len(line) // 4
+                if budget < 0:
+                    break
+                file_section.append(line)
 
-            if current_tokens + section_tokens > max_tokens:
+            if budget < 0:
                 lines.append("\n... (更多文件省略)")
                 break
 
             lines.extend(file_section)
-            current_tokens += section_tokens
+            current_tokens = max_tokens - budget
 
         return "\n".join(lines)
 
@@ -419,36 +587,48 @@ class RepoMap:
         if not self._cache:
             self.scan_files()
 
+        if self._search_index is None:
+            index = []
+            for file_info in self._cache.values():
+                defn_names = tuple(defn.name.lower() for defn in file_info.definitions)
+                index.append(
+                    (
+                        file_info,
+                        os.path.basename(file_info.relative_path).lower(),
+                        file_info.relative_path.lower(),
+                        defn_names,
+                        # 所有定义名拼成一个串，用于快速排除完全不相关的文件
+                        "\n".join(defn_names),
+                    )
+                )
+            self._search_index = index
+
         query_lower = query.lower()
         query_words = set(query_lower.split())
 
         scored_files = []
 
-        for file_info in self._cache.values():
+        for file_info, filename, path_lower, defn_names, defn_blob in self._search_index:
             score = 0
 
             # 文件名匹配
-            filename = Path(file_info.relative_path).name.lower()
             if query_lower in filename:
                 score += 10
-            for word in query_words:
-                if word in filename:
-                    score += 5
-
-            # 路径匹配
-            path_lower = file_info.relative_path.lower()
             for word in query_words:
                 if word in path_lower:
+                    # 路径匹配
                     score += 2
+                    if word in filename:
+                        score += 5
 
             # 定义名称匹配
-            for defn in file_info.definitions:
-                defn_name_lower = defn.name.lower()
-                if query_lower in defn_name_lower:
-                    score += 8
-                for word in query_words:
-                    if word in defn_name_lower:
-                        score += 3
+            if query_lower in defn_blob or any(word in defn_blob for word in query_words):
+                for defn_name_lower in defn_names:
+                    if query_lower in defn_name_lower:
+                        score += 8
+                    for word in query_words:
+                        if word in defn_name_lower:
+                            score += 3
 
             # 重要文件加分
             if file_info.is_important:
@@ -457,7 +637,5 @@ class RepoMap:
             if score > 0:
                 scored_files.append((score, file_info))
 
-        # 按分数排序
-        scored_files.sort(key=lambda x: -x[0])
-
-        return [f for _, f in scored_files[:limit]]
+        # 按分数取前 limit 个 (同分保持扫描顺序)
+        return [f for _, f in heapq.nlargest(limit, scored_files, key=itemgetter(0))]
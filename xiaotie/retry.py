@@ -10,10 +10,10 @@ from __future__ import annotations
 
 import asyncio
 import functools
-import random
 import time
 from dataclasses import dataclass, field
 from enum import Enum
+from random import random as _random
 from typing import Callable, List, Optional, Type, TypeVar
 
 T = TypeVar("T")
@@ -91,9 +91,24 @@ class RetryExhaustedError(Exception):
         super().__init__(f"重试 {attempts} 次后失败: {last_exception}")
 
 
-@dataclass
+# 预计算延迟表的最大长度，超出部分按公式现算
+_MAX_PRECOMPUTED_DELAYS = 64
+
+
+def _fibonacci_table(n: int) -> tuple[int, ...]:
+    """斐波那契退避倍数 1, 1, 2, 3, 5, ... 的前 n 项"""
+    table = [1, 1]
+    while len(table) < n:
+        table.append(table[-1] + table[-2])
+    return tuple(table[:n])
+
+
+_FIBONACCI = _fibonacci_table(_MAX_PRECOMPUTED_DELAYS + 1)
+
+
+@dataclass(frozen=True, slots=True)
 class RetryConfig:
-    """重试配置"""
+    """重试配置 (不可变，退避延迟表在创建时预先计算)"""
 
     enabled: bool = True
     max_retries: int = 3
@@ -101,17 +116,23 @@ class RetryConfig:
     initial_delay: float = 1.0  # 基础延迟（秒）
     max_delay: float = 60.0  # 最大延迟（秒）
     exponential_base: float = 2.0
-    jitter: bool = True  # 是否添加随机抖动
+    jitter: bool = True  # 是否添加随机抖动 (Full Jitter: 在 [0, 退避上限] 内均匀取值)
     retryable_exceptions: tuple[Type[Exception], ...] = field(default_factory=lambda: (Exception,))
+    # 各次尝试的退避上限 (整数毫秒)
+    _delays_ms: tuple[int, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # isinstance 直接接受类型元组，在 C 层一次完成匹配
+        object.__setattr__(self, "retryable_exceptions", tuple(self.retryable_exceptions))
+        count = min(self.max_retries, _MAX_PRECOMPUTED_DELAYS) + 1
+        object.__setattr__(self, "_delays_ms", tuple(self._base_delay_ms(i) for i in range(count)))
 
     def should_retry(self, error: Exception) -> bool:
         """判断是否应该重试"""
-        return self.enabled and any(
-            isinstance(error, err_type) for err_type in self.retryable_exceptions
-        )
+        return self.enabled and isinstance(error, self.retryable_exceptions)
 
-    def calculate_delay(self, attempt: int) -> float:
-        """计算退避延迟"""
+    def _base_delay(self, attempt: int) -> float:
+        """按退避策略计算不含抖动的延迟"""
         if self.backoff == BackoffStrategy.CONSTANT:
             delay = self.initial_delay
         elif self.backoff == BackoffStrategy.LINEAR:
@@ -119,32 +140,46 @@ class RetryConfig:
         elif self.backoff == BackoffStrategy.EXPONENTIAL:
             delay = self.initial_delay * (self.exponential_base**attempt)
         elif self.backoff == BackoffStrategy.FIBONACCI:
-            a, b = 1, 1
-            for _ in range(attempt):
-                a, b = b, a + b
-            delay = self.initial_delay * a
+            if attempt < len(_FIBONACCI):
+                factor = _FIBONACCI[attempt]
+            else:
+                factor = _fibonacci_table(attempt + 1)[attempt]
+            delay = self.initial_delay * factor
         else:
             delay = self.initial_delay
 
-        delay = min(delay, self.max_delay)
+        return min(delay, self.max_delay)
+
+    def _base_delay_ms(self, attempt: int) -> int:
+        """不含抖动的延迟 (整数毫秒)"""
+        return round(self._base_delay(attempt) * 1000)
+
+    def calculate_delay(self, attempt: int) -> float:
+        """计算退避延迟 (秒)
+
+        热路径只做整数运算：查表得到毫秒上限，开启抖动时按 AWS Full Jitter
+        在 [0, 上限] 内均匀取整数毫秒，最后换算回秒。
+        """
+        delays_ms = self._delays_ms
+        cap_ms = delays_ms[attempt] if attempt < len(delays_ms) else self._base_delay_ms(attempt)
         if self.jitter:
-            delay = delay * (0.75 + random.random() * 0.5)
+            cap_ms = int(_random() * (cap_ms + 1))
 
-        return delay
+        return cap_ms / 1000
 
 
-@dataclass
+@dataclass(slots=True)
 class RetryState:
     """重试状态"""
 
     attempt: int = 0
     total_delay: float = 0.0
     errors: List[Exception] = field(default_factory=list)
-    start_time: float = field(default_factory=time.time)
+    start_time: float = field(default_factory=time.monotonic)
 
     @property
     def elapsed_time(self) -> float:
-        return time.time() - self.start_time
+        return time.monotonic() - self.start_time
 
 
 class CircuitBreakerOpen(Exception):
@@ -153,6 +188,10 @@ class CircuitBreakerOpen(Exception):
     pass
 
 
+# 断路器内部状态用整数表示，热路径上只做整数比较
+_CLOSED, _OPEN, _HALF_OPEN = 0, 1, 2
+
+
 class CircuitBreaker:
     """断路器"""
 
@@ -161,6 +200,9 @@ class CircuitBreaker:
         OPEN = "open"
         HALF_OPEN = "half_open"
 
+    # 内部整数状态 -> 对外暴露的枚举
+    _STATE_ENUMS = (State.CLOSED, State.OPEN, State.HALF_OPEN)
+
     def __init__(
         self,
         failure_threshold: int = 5,
@@ -171,57 +213,66 @@ class CircuitBreaker:
         self.recovery_timeout = recovery_timeout
         self.half_open_max_calls = half_open_max_calls
 
-        self._state = self.State.CLOSED
+        self._state = _CLOSED
         self._failure_count = 0
         self._success_count = 0
-        self._last_failure_time: Optional[float] = None
+        # 最近一次失败后可以进入半开状态的时刻 (单调时钟，不受系统时间调整影响)
+        self._reopen_at = 0.0
         self._half_open_calls = 0
 
+    def _snapshot(self) -> int:
+        """当前整数状态的只读快照 (OPEN 超过恢复时间视为 HALF_OPEN)"""
+        state = self._state
+        if state == _OPEN and time.monotonic() >= self._reopen_at:
+            return _HALF_OPEN
+        return state
+
+    def _current_state(self) -> int:
+        """当前整数状态，并落实 OPEN -> HALF_OPEN 的转换 (仅供会修改状态的方法调用)"""
+        state = self._snapshot()
+        if state != self._state:
+            self._state = state
+            self._half_open_calls = 0
+        return state
+
     @property
     def state(self) -> State:
-        if self._state == self.State.OPEN:
-            if (
-                self._last_failure_time
-                and time.time() - self._last_failure_time >= self.recovery_timeout
-            ):
-                self._state = self.State.HALF_OPEN
-                self._half_open_calls = 0
-        return self._state
+        return self._STATE_ENUMS[self._snapshot()]
 
     def allow_request(self) -> bool:
-        state = self.state
-        if state == self.State.CLOSED:
+        # 稳态下断路器关闭，一次整数比较即可返回，不必检查恢复时间
+        if self._state == _CLOSED:
             return True
-        elif state == self.State.OPEN:
+        if self._current_state() == _OPEN:
             return False
-        else:
-            return self._half_open_calls < self.half_open_max_calls
+        return self._half_open_calls < self.half_open_max_calls
 
     def record_success(self) -> None:
-        if self._state == self.State.HALF_OPEN:
+        if self._current_state() == _HALF_OPEN:
             self._success_count += 1
             if self._success_count >= self.half_open_max_calls:
-                self._state = self.State.CLOSED
+                self._state = _CLOSED
                 self._failure_count = 0
                 self._success_count = 0
         else:
             self._failure_count = 0
 
     def record_failure(self) -> None:
+        state = self._current_state()
         self._failure_count += 1
-        self._last_failure_time = time.time()
+        self._reopen_at = time.monotonic() + self.recovery_timeout
 
-        if self._state == self.State.HALF_OPEN:
-            self._state = self.State.OPEN
+        if state == _HALF_OPEN:
+            self._state = _OPEN
             self._half_open_calls = 0
         elif self._failure_count >= self.failure_threshold:
-            self._state = self.State.OPEN
+            self._state = _OPEN
 
     def reset(self) -> None:
-        self._state = self.State.CLOSED
+        self._state = _CLOSED
         self._failure_count = 0
         self._success_count = 0
-        self._last_failure_time = None
+        self._reopen_at = 0.0
         self._half_open_calls = 0
 
 
@@ -232,6 +283,12 @@ def async_retry(
 ):
     """异步重试装饰器，集成断路器模式"""
 
+    # 配置不可变，热路径上用到的属性和方法在装饰时一次性绑定
+    max_retries = config.max_retries
+    should_retry = config.should_retry
+    calculate_delay = config.calculate_delay
+    sleep = asyncio.sleep
+
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
@@ -251,8 +308,7 @@ def async_retry(
             if circuit_breaker and not circuit_breaker.allow_request():
                 raise CircuitBreakerOpen("Circuit breaker is open")
 
-            last_exception = None
-            for attempt in range(config.max_retries + 1):
+            for attempt in range(max_retries + 1):
                 try:
                     result = await func(*args, **kwargs)
                     if circuit_breaker:
@@ -263,19 +319,17 @@ def async_retry(
                     if circuit_breaker:
                         circuit_breaker.record_failure()
 
-                    last_exception = e
-                    if not config.should_retry(e) or attempt >= config.max_retries:
-                        raise RetryExhaustedError(e, attempt + 1)
+                    # 最后一次尝试必然走到这里，循环结束后无需再兜底 raise
+                    if not should_retry(e) or attempt >= max_retries:
+                        raise RetryExhaustedError(e, attempt + 1) from e
 
-                    delay = config.calculate_delay(attempt)
+                    delay = calculate_delay(attempt)
                     if isinstance(e, RateLimitError) and e.retry_after:
                         delay = max(delay, e.retry_after)
 
                     if on_retry:
                         on_retry(e, attempt + 1)
-                    await asyncio.sleep(delay)
-
-            raise RetryExhaustedError(last_exception, config.max_retries + 1)
+                    await sleep(delay)
 
         return wrapper
 
@@ -25,22 +25,34 @@
 
 from __future__ import annotations
 
+import ast
 import asyncio
+import functools
+import itertools
+import json
 import logging
 import os
 import resource
+import select
+import selectors
+import struct
 import subprocess
 import sys
 import tempfile
 import threading
 import time
+import weakref
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterator, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# 进程级资源限制与管道 select 仅在非 Windows 平台可用，导入时判定一次
+_IS_POSIX = sys.platform != "win32"
+
 
 class SandboxRuntime(Enum):
     """沙箱运行时类型"""
@@ -59,7 +71,7 @@ class ExecutionStatus(Enum):
     KILLED = "killed"
 
 
-@dataclass
+@dataclass(slots=True)
 class SandboxConfig:
     """沙箱配置"""
 
@@ -72,10 +84,19 @@ class SandboxConfig:
     blocked_imports: Optional[list[str]] = None  # 阻止的模块
     working_dir: Optional[str] = None
     env_vars: dict[str, str] = field(default_factory=dict)
+    # 单个输出流 (stdout/stderr) 最多保留的字节数，超出部分读取后丢弃
+    max_output_bytes: int = 10 * 1024 * 1024
+    # 常驻 worker 进程数 (仅 subprocess 运行时)。0 表示每次执行启动新进程；
+    # 大于 0 时复用已启动的解释器，省去进程启动开销，但各次执行共享同一进程
+    # (模块缓存、工作目录等副作用会保留)，内存限制作用于整个 worker 生命周期
+    warm_workers: int = 0
 
     # Docker 特定配置
     docker_image: str = "python:3.9-slim"
     docker_volumes: dict[str, str] = field(default_factory=dict)
+    # 复用常驻容器，通过 docker exec 执行代码，省去每次创建容器的开销；
+    # 各次执行共享容器内的 /tmp 等状态，超时或内存超限时容器会被销毁重建
+    docker_persistent: bool = False
 
     def __post_init__(self):
         if self.blocked_imports is None:
@@ -89,7 +110,7 @@ class SandboxConfig:
             ]
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionResult:
     """执行结果"""
 
@@ -143,26 +164,100 @@ class SecurityError(SandboxError):
     pass
 
 
+# 前缀树终止标记 (单字符键之外的空串，不会与模块名字符冲突)
+_TRIE_END = ""
+
+
+def _build_prefix_trie(prefixes: set[str]) -> dict:
+    """按字符构建前缀树"""
+    root: dict = {}
+    for prefix in prefixes:
+        node = root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = True
+    return root
+
+
+def _trie_overlaps(trie: dict, name: str) -> bool:
+    """判断 name 与前缀树中任一规则互为前缀
+
+    等价于 any(name.startswith(p) or p.startswith(name) for p in prefixes)：
+    沿途遇到终止标记说明某条规则是 name 的前缀；name 走完仍在树内说明
+    name 是某条规则的前缀。
+    """
+    if not trie:
+        return False
+    node = trie
+    for char in name:
+        if _TRIE_END in node:
+            return True
+        node = node.get(char)
+        if node is None:
+            return False
+    return True
+
+
+# 可能包含语句的子节点类型；导入只能以语句形式出现
+_STATEMENT_CONTAINERS = (ast.stmt, ast.excepthandler, ast.match_case)
+
+
+def _iter_imports(tree: ast.AST) -> Iterator[Union[ast.Import, ast.ImportFrom]]:
+    """按 ast.walk 的广度优先顺序产出所有导入语句
+
+    只沿语句列表 (body/orelse/finalbody/handlers/cases 等) 下钻，跳过表达式
+    子树；函数与类体内的导入同样会被检查。
+    """
+    queue = deque([tree])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+            continue
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if value and isinstance(value, list) and isinstance(value[0], _STATEMENT_CONTAINERS):
+                queue.extend(value)
+
+
 class ImportChecker:
     """导入检查器"""
 
+    # 判定结果缓存上限，超出后整体清空
+    _CACHE_LIMIT = 1024
+    # 整段代码检查结果缓存上限 (按源码全文为键，条目较大，上限更小)
+    _CODE_CACHE_LIMIT = 256
+
     def __init__(self, allowed: Optional[list[str]] = None, blocked: Optional[list[str]] = None):
         self.allowed = set(allowed) if allowed else None
         self.blocked = set(blocked) if blocked else set()
+        self._blocked_trie = _build_prefix_trie(self.blocked)
+        self._allowed_trie = _build_prefix_trie(self.allowed) if self.allowed is not None else None
+        self._cache: dict[str, bool] = {}
+        self._code_cache: dict[str, tuple[str, ...]] = {}
 
     def check_code(self, code: str) -> list[str]:
         """检查代码中的导入，返回违规列表"""
+        # 规则在构造后不变，同一段代码的检查结果可直接复用 (以全文为键，避免哈希碰撞误判)
+        cached = self._code_cache.get(code)
+        if cached is None:
+            cached = tuple(self._scan_code(code))
+            if len(self._code_cache) >= self._CODE_CACHE_LIMIT:
+                self._code_cache.clear()
+            self._code_cache[code] = cached
+        return list(cached)
+
+    def _scan_code(self, code: str) -> list[str]:
+        """解析代码并收集违规导入"""
         violations = []
 
         # 简单的导入检测
-        import ast
-
         try:
             tree = ast.parse(code)
         except SyntaxError:
             return violations
 
-        for node in ast.walk(tree):
+        for node in _iter_imports(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
                     if not self._is_allowed(alias.name):
@@ -178,19 +273,237 @@ class ImportChecker:
 
     def _is_allowed(self, module: str) -> bool:
         """检查模块是否允许"""
-        # 检查是否在阻止列表
-        for blocked in self.blocked:
-            if module.startswith(blocked) or blocked.startswith(module):
-                return False
-
-        # 如果有白名单，检查是否在白名单
-        if self.allowed is not None:
-            for allowed in self.allowed:
-                if module.startswith(allowed) or allowed.startswith(module):
-                    return True
-            return False
+        cached = self._cache.get(module)
+        if cached is not None:
+            return cached
+
+        # 检查是否在阻止列表；如果有白名单，检查是否在白名单
+        if _trie_overlaps(self._blocked_trie, module):
+            result = False
+        elif self._allowed_trie is not None:
+            result = _trie_overlaps(self._allowed_trie, module)
+        else:
+            result = True
+
+        if len(self._cache) >= self._CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[module] = result
+        return result
+
+
+# 常驻 worker 的驱动脚本：从专用管道循环读取长度前缀的代码帧，在全新命名空间中
+# 执行，并以长度前缀的 JSON 帧经另一条专用管道回写。执行期间 fd 1/2 在系统层面
+# 重定向到临时文件，用户代码 (含 C 扩展与子进程) 的任何输出都不会混入控制协议
+_WORKER_DRIVER = r"""
+import json, os, struct, sys, tempfile, traceback
+
+cmd_fd, reply_fd, limit = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+os.set_inheritable(cmd_fd, False)
+os.set_inheritable(reply_fd, False)
+commands = os.fdopen(cmd_fd, "rb")
+replies = os.fdopen(reply_fd, "wb")
+saved_fds = (os.dup(1), os.dup(2))
+capture_files = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+
+
+def read_back(f):
+    # 与冷启动路径一致：每个输出流最多保留 limit 字节，超出部分丢弃并追加提示
+    f.seek(0)
+    data = f.read(limit + 1)
+    f.seek(0)
+    f.truncate()
+    if len(data) > limit:
+        data = data[:limit] + f"\n[输出超过 {limit} 字节，已截断]\n".encode("utf-8")
+    return data.decode("utf-8", "replace")
+
+
+while True:
+    header = commands.read(4)
+    if len(header) < 4:
+        break
+    code = commands.read(struct.unpack(">I", header)[0]).decode("utf-8")
+    os.dup2(capture_files[0].fileno(), 1)
+    os.dup2(capture_files[1].fileno(), 2)
+    exit_code = 0
+    try:
+        exec(compile(code, "<sandbox>", "exec"), {"__name__": "__main__"})
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.__stderr__)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc(file=sys.__stderr__)
+        exit_code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr, sys.__stdout__, sys.__stderr__):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+    reply = json.dumps(
+        {
+            "stdout": read_back(capture_files[0]),
+            "stderr": read_back(capture_files[1]),
+            "exit_code": exit_code,
+        }
+    ).encode("utf-8")
+    replies.write(struct.pack(">I", len(reply)) + reply)
+    replies.flush()
+"""
 
-        return True
+
+class _WarmWorker:
+    """常驻 Python 子进程，通过专用管道逐条接收代码并返回执行结果"""
+
+    def __init__(self, config: SandboxConfig, env: dict[str, str]):
+        # 控制协议走独立的管道，与用户代码可见的 stdin/stdout 完全分离
+        cmd_read, cmd_write = os.pipe()
+        reply_read, reply_write = os.pipe()
+        env = {**env, "PYTHONIOENCODING": "utf-8"}
+        try:
+            self.process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    _WORKER_DRIVER,
+                    str(cmd_read),
+                    str(reply_write),
+                    str(config.max_output_bytes),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=(cmd_read, reply_write),
+                env=env,
+                cwd=config.working_dir,
+                preexec_fn=(
+                    functools.partial(_set_memory_limit, config.memory_limit_mb)
+                    if _IS_POSIX
+                    else None
+                ),
+            )
+        except BaseException:
+            os.close(cmd_write)
+            os.close(reply_read)
+            raise
+        finally:
+            os.close(cmd_read)
+            os.close(reply_write)
+        self._commands = os.fdopen(cmd_write, "wb")
+        self._replies = reply_read
+
+    def run(self, code: str, timeout: float) -> Optional[dict[str, Any]]:
+        """执行代码，超时返回 None；worker 异常退出时抛出 EOFError/OSError"""
+        payload = code.encode("utf-8")
+        self._commands.write(struct.pack(">I", len(payload)) + payload)
+        self._commands.flush()
+
+        deadline = time.monotonic() + timeout
+        header = self._read_exact(4, deadline)
+        if header is None:
+            return None
+        body = self._read_exact(struct.unpack(">I", header)[0], deadline)
+        if body is None:
+            return None
+        return json.loads(body)
+
+    def _read_exact(self, size: int, deadline: float) -> Optional[bytes]:
+        fd = self._replies
+        chunks = []
+        while size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(fd, size)
+            if not chunk:
+                raise EOFError("worker 进程已退出")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        """终止 worker 进程"""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        try:
+            self._commands.close()
+        except OSError:
+            pass
+        if self._replies >= 0:
+            os.close(self._replies)
+            self._replies = -1
+
+
+def _communicate_capped(
+    process: subprocess.Popen, data: bytes, timeout: float, limit: int
+) -> tuple[bytes, bytes]:
+    """与 Popen.communicate 相同，但每个输出流最多保留 limit 字节 (Unix only)
+
+    超出部分仍会被读取 (避免子进程因管道写满而阻塞)，只是不再保存，并在
+    截断处追加提示。超时抛出 subprocess.TimeoutExpired。
+    """
+    deadline = time.monotonic() + timeout
+    buffers = {process.stdout.fileno(): bytearray(), process.stderr.fileno(): bytearray()}
+    truncated: set[int] = set()
+    view = memoryview(data)
+    offset = 0
+
+    with selectors.DefaultSelector() as selector:
+        if data:
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        else:
+            process.stdin.close()
+        selector.register(process.stdout, selectors.EVENT_READ)
+        selector.register(process.stderr, selectors.EVENT_READ)
+
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            for key, _ in selector.select(remaining):
+                if key.fileobj is process.stdin:
+                    try:
+                        offset += os.write(key.fd, view[offset : offset + select.PIPE_BUF])
+                    except BrokenPipeError:
+                        offset = len(data)
+                    if offset >= len(data):
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    continue
+
+                chunk = os.read(key.fd, 32768)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    continue
+                buffer = buffers[key.fd]
+                room = limit - len(buffer)
+                if len(chunk) > room:
+                    truncated.add(key.fd)
+                    chunk = chunk[: max(room, 0)]
+                buffer += chunk
+
+    process.wait(timeout=max(deadline - time.monotonic(), 0))
+
+    stdout_fd, stderr_fd = buffers
+    for fd in truncated:
+        buffers[fd] += f"\n[输出超过 {limit} 字节，已截断]\n".encode("utf-8")
+    return bytes(buffers[stdout_fd]), bytes(buffers[stderr_fd])
+
+
+def _set_memory_limit(memory_limit_mb: int) -> None:
+    """设置内存限制 (Unix only)"""
+    memory_bytes = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (ValueError, resource.error):
+        pass
 
 
 class SubprocessExecutor:
@@ -198,73 +511,140 @@ class SubprocessExecutor:
 
     def __init__(self, config: SandboxConfig):
         self.config = config
+        self._idle_workers: list[_WarmWorker] = []
+        self._workers_lock = threading.Lock()
 
     def execute(self, code: str) -> ExecutionResult:
         """在子进程中执行代码"""
+        if self.config.warm_workers > 0:
+            return self._execute_warm(code)
+
         start_time = time.time()
 
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-            # 包装代码以捕获输出
-            wrapped_code = self._wrap_code(code)
-            f.write(wrapped_code)
-            temp_file = f.name
+        # 包装代码以捕获输出
+        wrapped_code = self._wrap_code(code)
+
+        # 准备环境变量
+        env = os.environ.copy()
+        env.update(self.config.env_vars)
+
+        # 执行 (代码经 stdin 传入解释器，无需落盘临时文件)
+        process = subprocess.Popen(
+            [sys.executable, "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=self.config.working_dir,
+            preexec_fn=self._set_limits if _IS_POSIX else None,
+        )
 
         try:
-            # 准备环境变量
+            if _IS_POSIX:
+                stdout, stderr = _communicate_capped(
+                    process,
+                    wrapped_code.encode("utf-8"),
+                    self.config.timeout,
+                    self.config.max_output_bytes,
+                )
+            else:
+                stdout, stderr = process.communicate(
+                    input=wrapped_code.encode("utf-8"), timeout=self.config.timeout
+                )
+            execution_time = time.time() - start_time
+
+            stdout_str = stdout.decode("utf-8", errors="replace")
+            stderr_str = stderr.decode("utf-8", errors="replace")
+
+            if process.returncode == 0:
+                return ExecutionResult(
+                    status=ExecutionStatus.SUCCESS,
+                    stdout=stdout_str,
+                    stderr=stderr_str,
+                    execution_time=execution_time,
+                    exit_code=0,
+                )
+            else:
+                return ExecutionResult(
+                    status=ExecutionStatus.ERROR,
+                    stdout=stdout_str,
+                    stderr=stderr_str,
+                    execution_time=execution_time,
+                    exit_code=process.returncode,
+                    error_message=stderr_str or f"退出码: {process.returncode}",
+                )
+
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            return ExecutionResult(
+                status=ExecutionStatus.TIMEOUT,
+                execution_time=self.config.timeout,
+                error_message=f"执行超时（{self.config.timeout}秒）",
+            )
+
+    def _execute_warm(self, code: str) -> ExecutionResult:
+        """在常驻 worker 中执行代码 (空闲 worker 不足时新启动一个)"""
+        start_time = time.time()
+        with self._workers_lock:
+            worker = self._idle_workers.pop() if self._idle_workers else None
+        if worker is None:
             env = os.environ.copy()
             env.update(self.config.env_vars)
+            worker = _WarmWorker(self.config, env)
 
-            # 执行
-            process = subprocess.Popen(
-                [sys.executable, temp_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=env,
-                cwd=self.config.working_dir,
-                preexec_fn=self._set_limits if sys.platform != "win32" else None,
+        try:
+            reply = worker.run(code, self.config.timeout)
+        except (EOFError, OSError, ValueError):
+            # worker 被杀 (如超出内存限制) 或输出损坏，丢弃该 worker
+            worker.close()
+            return ExecutionResult(
+                status=ExecutionStatus.ERROR,
+                execution_time=time.time() - start_time,
+                exit_code=worker.process.returncode,
+                error_message=f"worker 进程异常退出: {worker.process.returncode}",
             )
 
-            try:
-                stdout, stderr = process.communicate(timeout=self.config.timeout)
-                execution_time = time.time() - start_time
-
-                stdout_str = stdout.decode("utf-8", errors="replace")
-                stderr_str = stderr.decode("utf-8", errors="replace")
+        if reply is None:
+            worker.close()
+            return ExecutionResult(
+                status=ExecutionStatus.TIMEOUT,
+                execution_time=self.config.timeout,
+                error_message=f"执行超时（{self.config.timeout}秒）",
+            )
 
-                if process.returncode == 0:
-                    return ExecutionResult(
-                        status=ExecutionStatus.SUCCESS,
-                        stdout=stdout_str,
-                        stderr=stderr_str,
-                        execution_time=execution_time,
-                        exit_code=0,
-                    )
-                else:
-                    return ExecutionResult(
-                        status=ExecutionStatus.ERROR,
-                        stdout=stdout_str,
-                        stderr=stderr_str,
-                        execution_time=execution_time,
-                        exit_code=process.returncode,
-                        error_message=stderr_str or f"退出码: {process.returncode}",
-                    )
+        with self._workers_lock:
+            if len(self._idle_workers) < self.config.warm_workers:
+                self._idle_workers.append(worker)
+                worker = None
+        if worker is not None:
+            worker.close()
 
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
-                return ExecutionResult(
-                    status=ExecutionStatus.TIMEOUT,
-                    execution_time=self.config.timeout,
-                    error_message=f"执行超时（{self.config.timeout}秒）",
-                )
+        execution_time = time.time() - start_time
+        exit_code = reply["exit_code"]
+        if exit_code == 0:
+            return ExecutionResult(
+                status=ExecutionStatus.SUCCESS,
+                stdout=reply["stdout"],
+                stderr=reply["stderr"],
+                execution_time=execution_time,
+                exit_code=0,
+            )
+        return ExecutionResult(
+            status=ExecutionStatus.ERROR,
+            stdout=reply["stdout"],
+            stderr=reply["stderr"],
+            execution_time=execution_time,
+            exit_code=exit_code,
+            error_message=reply["stderr"] or f"退出码: {exit_code}",
+        )
 
-        finally:
-            # 清理临时文件
-            try:
-                os.unlink(temp_file)
-            except OSError:
-                pass
+    def close(self) -> None:
+        """终止所有空闲的常驻 worker"""
+        with self._workers_lock:
+            workers, self._idle_workers = self._idle_workers, []
+        for worker in workers:
+            worker.close()
 
     def _wrap_code(self, code: str) -> str:
         """包装代码"""
@@ -281,17 +661,13 @@ except Exception as e:
 
     def _indent_code(self, code: str) -> str:
         """缩进代码"""
-        lines = code.split("\n")
-        return "\n".join("    " + line for line in lines)
+        # 单次 replace，避免 split + join 生成逐行中间列表
+        return "    " + code.replace("\n", "\n    ")
 
     def _set_limits(self):
         """设置资源限制 (Unix only)"""
         # 内存限制
-        memory_bytes = self.config.memory_limit_mb * 1024 * 1024
-        try:
-            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
-        except (ValueError, resource.error):
-            pass
+        _set_memory_limit(self.config.memory_limit_mb)
 
         # CPU 时间限制
         cpu_seconds = int(self.config.timeout) + 5
@@ -301,12 +677,29 @@ except Exception as e:
             pass
 
 
+# 容器名称序号，保证同一进程内的多个容器互不冲突
+_container_ids = itertools.count()
+
+
+def _remove_container(name: str) -> None:
+    """强制删除容器"""
+    try:
+        subprocess.run(["docker", "rm", "-f", name], capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        logger.warning("删除沙箱容器失败: %s", name, exc_info=True)
+
+
 class DockerExecutor:
     """Docker 执行器"""
 
     def __init__(self, config: SandboxConfig):
         self.config = config
         self._check_docker()
+        # 资源限制、网络、环境变量与卷参数在执行器生命周期内不变，只构建一次
+        self._run_options = self._container_options()
+        self._container: Optional[str] = None
+        self._container_finalizer: Optional[weakref.finalize] = None
+        self._container_lock = threading.Lock()
 
     def _check_docker(self):
         """检查 Docker 是否可用"""
@@ -325,6 +718,9 @@ class DockerExecutor:
 
     def execute(self, code: str) -> ExecutionResult:
         """在 Docker 容器中执行代码"""
+        if self.config.docker_persistent:
+            return self._execute_persistent(code)
+
         start_time = time.time()
 
         # 创建临时目录
@@ -333,8 +729,9 @@ class DockerExecutor:
             code_file = Path(temp_dir) / "code.py"
             code_file.write_text(code)
 
-            # 构建 Docker 命令
-            cmd = self._build_docker_command(temp_dir)
+            # 构建 Docker 命令 (每次执行使用独立的容器名，避免并发执行互相冲突)
+            name = f"sandbox_{os.getpid()}_{next(_container_ids)}"
+            cmd = self._build_docker_command(temp_dir, name)
 
             try:
                 process = subprocess.Popen(
@@ -347,42 +744,14 @@ class DockerExecutor:
                     stdout, stderr = process.communicate(
                         timeout=self.config.timeout + 10  # 额外时间用于容器启动
                     )
-                    execution_time = time.time() - start_time
-
-                    stdout_str = stdout.decode("utf-8", errors="replace")
-                    stderr_str = stderr.decode("utf-8", errors="replace")
-
-                    if process.returncode == 0:
-                        return ExecutionResult(
-                            status=ExecutionStatus.SUCCESS,
-                            stdout=stdout_str,
-                            stderr=stderr_str,
-                            execution_time=execution_time,
-                            exit_code=0,
-                        )
-                    elif process.returncode == 137:  # OOM killed
-                        return ExecutionResult(
-                            status=ExecutionStatus.MEMORY_EXCEEDED,
-                            stdout=stdout_str,
-                            stderr=stderr_str,
-                            execution_time=execution_time,
-                            exit_code=137,
-                            error_message="容器因内存超限被终止",
-                        )
-                    else:
-                        return ExecutionResult(
-                            status=ExecutionStatus.ERROR,
-                            stdout=stdout_str,
-                            stderr=stderr_str,
-                            execution_time=execution_time,
-                            exit_code=process.returncode,
-                            error_message=stderr_str or f"退出码: {process.returncode}",
-                        )
+                    return self._build_result(
+                        process.returncode, stdout, stderr, time.time() - start_time
+                    )
 
                 except subprocess.TimeoutExpired:
                     # 强制停止容器
                     subprocess.run(
-                        ["docker", "kill", f"sandbox_{os.getpid()}"],
+                        ["docker", "kill", name],
                         capture_output=True,
                     )
                     process.kill()
@@ -400,46 +769,150 @@ class DockerExecutor:
                     error_message=str(e),
                 )
 
-    def _build_docker_command(self, temp_dir: str) -> list[str]:
-        """构建 Docker 命令"""
-        cmd = [
-            "docker",
-            "run",
-            "--rm",
-            f"--name=sandbox_{os.getpid()}",
+    def _execute_persistent(self, code: str) -> ExecutionResult:
+        """在常驻容器中通过 docker exec 执行代码 (代码经 stdin 传入)"""
+        start_time = time.time()
+        try:
+            container = self._ensure_container()
+            process = subprocess.Popen(
+                ["docker", "exec", "-i", container, "python", "-"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except Exception as e:
+            return ExecutionResult(
+                status=ExecutionStatus.ERROR,
+                execution_time=time.time() - start_time,
+                error_message=str(e),
+            )
+
+        try:
+            stdout, stderr = process.communicate(
+                input=code.encode("utf-8"), timeout=self.config.timeout
+            )
+        except subprocess.TimeoutExpired:
+            # 容器内的进程不会随 docker exec 客户端退出，直接销毁容器
+            process.kill()
+            process.wait()
+            self.close()
+            return ExecutionResult(
+                status=ExecutionStatus.TIMEOUT,
+                execution_time=self.config.timeout,
+                error_message=f"执行超时（{self.config.timeout}秒）",
+            )
+
+        if process.returncode == 137:
+            self.close()
+        return self._build_result(process.returncode, stdout, stderr, time.time() - start_time)
+
+    def _ensure_container(self) -> str:
+        """启动 (或复用) 常驻容器，返回容器名称"""
+        with self._container_lock:
+            if self._container is None:
+                name = f"sandbox_{os.getpid()}_{next(_container_ids)}"
+                cmd = [
+                    "docker",
+                    "run",
+                    "-d",
+                    "--rm",
+                    f"--name={name}",
+                    *self._run_options,
+                    self.config.docker_image,
+                    "sleep",
+                    "infinity",
+                ]
+                result = subprocess.run(cmd, capture_output=True, timeout=60)
+                if result.returncode != 0:
+                    stderr = result.stderr.decode("utf-8", errors="replace").strip()
+                    raise SandboxError(f"启动沙箱容器失败: {stderr}")
+                self._container = name
+                self._container_finalizer = weakref.finalize(self, _remove_container, name)
+            return self._container
+
+    def close(self) -> None:
+        """销毁常驻容器 (下次执行时重新创建)"""
+        with self._container_lock:
+            finalizer, self._container_finalizer = self._container_finalizer, None
+            self._container = None
+        if finalizer is not None:
+            finalizer()
+
+    def _build_result(
+        self, returncode: int, stdout: bytes, stderr: bytes, execution_time: float
+    ) -> ExecutionResult:
+        """根据容器退出码构建执行结果"""
+        stdout_str = stdout.decode("utf-8", errors="replace")
+        stderr_str = stderr.decode("utf-8", errors="replace")
+
+        if returncode == 0:
+            return ExecutionResult(
+                status=ExecutionStatus.SUCCESS,
+                stdout=stdout_str,
+                stderr=stderr_str,
+                execution_time=execution_time,
+                exit_code=0,
+            )
+        elif returncode == 137:  # OOM killed
+            return ExecutionResult(
+                status=ExecutionStatus.MEMORY_EXCEEDED,
+                stdout=stdout_str,
+                stderr=stderr_str,
+                execution_time=execution_time,
+                exit_code=137,
+                error_message="容器因内存超限被终止",
+            )
+        else:
+            return ExecutionResult(
+                status=ExecutionStatus.ERROR,
+                stdout=stdout_str,
+                stderr=stderr_str,
+                execution_time=execution_time,
+                exit_code=returncode,
+                error_message=stderr_str or f"退出码: {returncode}",
+            )
+
+    def _container_options(self) -> list[str]:
+        """容器资源限制、网络、环境变量与额外卷参数"""
+        options = [
             f"--memory={self.config.memory_limit_mb}m",
             f"--cpus={self.config.cpu_limit}",
             "--pids-limit=100",
             "--read-only",
             "--tmpfs=/tmp:size=64m",
-            "-v",
-            f"{temp_dir}:/code:ro",
-            "-w",
-            "/code",
         ]
 
         # 网络设置
         if not self.config.network_enabled:
-            cmd.append("--network=none")
+            options.append("--network=none")
 
         # 环境变量
         for key, value in self.config.env_vars.items():
-            cmd.extend(["-e", f"{key}={value}"])
+            options.extend(["-e", f"{key}={value}"])
 
         # 额外卷
         for host_path, container_path in self.config.docker_volumes.items():
-            cmd.extend(["-v", f"{host_path}:{container_path}:ro"])
-
-        # 镜像和命令
-        cmd.extend(
-            [
-                self.config.docker_image,
-                "python",
-                "/code/code.py",
-            ]
-        )
+            options.extend(["-v", f"{host_path}:{container_path}:ro"])
+
+        return options
 
-        return cmd
+    def _build_docker_command(self, temp_dir: str, name: str) -> list[str]:
+        """构建 Docker 命令 (仅代码目录与容器名随每次执行变化)"""
+        return [
+            "docker",
+            "run",
+            "--rm",
+            f"--name={name}",
+            "-v",
+            f"{temp_dir}:/code:ro",
+            "-w",
+            "/code",
+            *self._run_options,
+            # 镜像和命令
+            self.config.docker_image,
+            "python",
+            "/code/code.py",
+        ]
 
 
 class Sandbox:
@@ -519,26 +992,73 @@ class SandboxPool:
         self.pool_size = pool_size
         self._sandboxes: list[Sandbox] = []
         self._lock = threading.Lock()
-        self._available: list[Sandbox] = []
+        self._available: deque[Sandbox] = deque()
+        # 成员与空闲集合，release 时 O(1) 判重
+        self._members: set[Sandbox] = set()
+        self._idle: set[Sandbox] = set()
+        # acquire_async 的等待者，release 时直接移交沙箱
+        self._waiters: deque[asyncio.Future] = deque()
 
         # 初始化沙箱池
         for _ in range(pool_size):
             sandbox = Sandbox(self.config)
             self._sandboxes.append(sandbox)
             self._available.append(sandbox)
+        self._members.update(self._sandboxes)
+        self._idle.update(self._sandboxes)
 
     def acquire(self) -> Optional[Sandbox]:
         """获取一个可用的沙箱"""
         with self._lock:
-            if self._available:
-                return self._available.pop()
-            return None
+            return self._pop_available()
+
+    async def acquire_async(self) -> Sandbox:
+        """获取一个可用的沙箱，池空时等待其他调用方释放"""
+        with self._lock:
+            sandbox = self._pop_available()
+            if sandbox is not None:
+                return sandbox
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            # 已移交但调用方被取消，归还沙箱
+            if waiter.done() and not waiter.cancelled():
+                self.release(waiter.result())
+            raise
 
     def release(self, sandbox: Sandbox):
         """释放沙箱"""
         with self._lock:
-            if sandbox in self._sandboxes and sandbox not in self._available:
-                self._available.append(sandbox)
+            if sandbox not in self._members or sandbox in self._idle:
+                return
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    # 移交给等待者；若其在回调执行前已被取消则重新放回池中
+                    waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter, sandbox)
+                    return
+            self._available.append(sandbox)
+            self._idle.add(sandbox)
+
+    def _pop_available(self) -> Optional[Sandbox]:
+        """弹出一个空闲沙箱 (调用方需持有锁)"""
+        if not self._available:
+            return None
+        sandbox = self._available.pop()
+        self._idle.discard(sandbox)
+        return sandbox
+
+    def _hand_over(self, waiter: asyncio.Future, sandbox: Sandbox) -> None:
+        if waiter.done():
+            self.release(sandbox)
+        else:
+            waiter.set_result(sandbox)
 
     async def execute(self, code: str, timeout: float = 30.0) -> ExecutionResult:
         """执行代码，自动管理沙箱"""
@@ -7,11 +7,21 @@
 
 from __future__ import annotations
 
+import hashlib
+import sqlite3
 from abc import ABC, abstractmethod
-from typing import Optional
+from array import array
+from pathlib import Path
+from typing import Optional, Union
 
 import openai
 
+# 嵌入磁盘缓存的默认目录
+DEFAULT_CACHE_DIR = Path.home() / ".xiaotie" / "embedcache"
+
+# 单条 SELECT ... IN (...) 的参数上限 (低于旧版 SQLite 的 999 限制)
+_SQL_BATCH = 500
+
 
 class EmbeddingProvider(ABC):
     """嵌入生成器基类"""
@@ -41,9 +51,18 @@ class OpenAIEmbeddings(EmbeddingProvider):
         api_key: Optional[str] = None,
         api_base: Optional[str] = None,
         model: str = "text-embedding-3-small",
+        cache_dir: Optional[Union[str, Path]] = None,
     ):
+        """
+        Args:
+            cache_dir: 嵌入磁盘缓存目录，None 表示不缓存 (如 DEFAULT_CACHE_DIR)。
+                以 (模型, 文本) 的哈希为键，重复文本不再请求 API
+        """
         self.model = model
         self._dimension = 1536  # text-embedding-3-small 默认维度
+        self._cache: Optional[sqlite3.Connection] = None
+        if cache_dir is not None:
+            self._cache = self._open_cache(Path(cache_dir))
 
         # 配置客户端
         if api_key:
@@ -60,6 +79,9 @@ class OpenAIEmbeddings(EmbeddingProvider):
 
     async def embed_text(self, text: str) -> list[float]:
         """生成单个文本的嵌入"""
+        if self._cache is not None:
+            return (await self.embed_texts([text]))[0]
+
         response = await self.client.embeddings.create(
             model=self.model,
             input=text,
@@ -71,6 +93,13 @@ class OpenAIEmbeddings(EmbeddingProvider):
         if not texts:
             return []
 
+        if self._cache is not None:
+            return await self._embed_texts_cached(texts)
+
+        return await self._request_embeddings(texts)
+
+    async def _request_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """调用 API 批量生成嵌入"""
         # OpenAI 支持批量嵌入
         response = await self.client.embeddings.create(
             model=self.model,
@@ -84,6 +113,61 @@ class OpenAIEmbeddings(EmbeddingProvider):
 
         return embeddings
 
+    async def _embed_texts_cached(self, texts: list[str]) -> list[list[float]]:
+        """先查缓存，只为未命中 (且去重后) 的文本请求 API，结果按原顺序返回"""
+        keys = [self._cache_key(text) for text in texts]
+        found = self._cache_lookup(set(keys))
+
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = await self._request_embeddings(list(missing.values()))
+            rows = list(zip(missing, vectors))
+            with self._cache:
+                self._cache.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, array("f", vector).tobytes()) for key, vector in rows],
+                )
+            found.update(rows)
+
+        return [list(found[key]) for key in keys]
+
+    def _cache_key(self, text: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cache_lookup(self, keys: set[str]) -> dict[str, list[float]]:
+        """批量查询缓存，返回命中的 key -> 嵌入"""
+        found: dict[str, list[float]] = {}
+        pending = list(keys)
+        for start in range(0, len(pending), _SQL_BATCH):
+            batch = pending[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self._cache.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            for key, blob in cursor:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    @staticmethod
+    def _open_cache(cache_dir: Path) -> sqlite3.Connection:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(cache_dir / "embeddings.sqlite3", check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            " WITHOUT ROWID"
+        )
+        return conn
+
 
 class DummyEmbeddings(EmbeddingProvider):
     """测试用的假嵌入生成器"""
@@ -97,19 +181,16 @@ class DummyEmbeddings(EmbeddingProvider):
 
     async def embed_text(self, text: str) -> list[float]:
         """生成基于文本哈希的伪嵌入"""
-        import hashlib
-
-        # 使用文本哈希生成确定性的伪嵌入
-        hash_bytes = hashlib.sha256(text.encode()).digest()
-        # 扩展到所需维度
-        embedding = []
-        for i in range(self._dimension):
-            byte_idx = i % len(hash_bytes)
-            # 归一化到 [-1, 1]
-            value = (hash_bytes[byte_idx] / 127.5) - 1.0
-            embedding.append(value)
-        return embedding
+        return self._embed(text)
 
     async def embed_texts(self, texts: list[str]) -> list[list[float]]:
         """批量生成伪嵌入"""
-        return [await self.embed_text(text) for text in texts]
+        return [self._embed(text) for text in texts]
+
+    def _embed(self, text: str) -> list[float]:
+        # 使用文本哈希生成确定性的伪嵌入，每个字节归一化到 [-1, 1]
+        hash_bytes = hashlib.sha256(text.encode()).digest()
+        values = [byte / 127.5 - 1.0 for byte in hash_bytes]
+        # 扩展到所需维度：整段重复后补齐余数，等价于按 i % 32 取值
+        repeats, remainder = divmod(self._dimension, len(values))
+        return values * repeats + values[:remainder]
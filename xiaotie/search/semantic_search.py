@@ -5,14 +5,30 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import os
 import re
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 from .embeddings import EmbeddingProvider
-from .vector_store import CodeChunk, CodeVectorStore
+from .vector_store import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_EMBED_CONCURRENCY,
+    CodeChunk,
+    CodeVectorStore,
+)
+
+# 每次累积到这么多代码块再写入，使各批嵌入请求可以并发
+_FLUSH_CHUNKS = DEFAULT_BATCH_SIZE * DEFAULT_EMBED_CONCURRENCY
+
+# 同时在线程池中读取并分块的文件数
+_READ_WINDOW = 64
+
+# Python 函数或类定义行 (对去除缩进后的行做 match)；cls 组命中表示类定义
+_PY_DEF_RE = re.compile(r"(?:async\s+)?def\s+\w+\s*\(|(?P<cls>class)\s+\w+")
 
 
 @dataclass
@@ -113,45 +129,107 @@ class SemanticSearch:
         if ext not in self.CODE_EXTENSIONS:
             return 0
 
+        chunks = self._chunk_file(abs_path)
+
+        if chunks:
+            await self.vector_store.update_file(abs_path, chunks)
+
+        return len(chunks)
+
+    def _chunk_file(self, abs_path: str) -> list[CodeChunk]:
+        """读取文件并分割成代码块，读取失败返回空列表"""
         try:
             with open(abs_path, "r", encoding="utf-8", errors="ignore") as f:
                 content = f.read()
         except Exception:
-            return 0
+            return []
 
         # 分割成代码块
-        chunks = self._split_into_chunks(abs_path, content)
-
-        if chunks:
-            await self.vector_store.update_file(abs_path, chunks)
-
-        return len(chunks)
+        return self._split_into_chunks(abs_path, content)
 
     async def index_directory(
         self,
         directory: Optional[str] = None,
         extensions: Optional[set[str]] = None,
     ) -> int:
-        """索引目录，返回索引的文件数量"""
-        target_dir = directory or self.workspace_dir
+        """索引目录，返回索引的文件数量
+
+        跨文件累积代码块，凑满一批后统一删除旧数据并写入向量存储，
+        避免逐文件的 delete + add 往返。文件读取与分块在线程池中并发进行。
+        """
+        target_dir = os.path.abspath(directory or self.workspace_dir)
         extensions = extensions or self.CODE_EXTENSIONS
 
+        # 空存储 (首次索引) 无需删除旧数据
+        replace_existing = self.vector_store.count() > 0
+        pending_files: list[str] = []
+        pending_chunks: list[CodeChunk] = []
         indexed_files = 0
 
-        for root, dirs, files in os.walk(target_dir):
-            # 过滤忽略的目录
-            dirs[:] = [d for d in dirs if d not in self.IGNORE_DIRS]
-
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in extensions:
-                    file_path = os.path.join(root, file)
-                    chunks_count = await self.index_file(file_path)
-                    if chunks_count > 0:
-                        indexed_files += 1
+        async def flush() -> None:
+            if replace_existing:
+                await self.vector_store.delete_by_files(pending_files)
+            await self.vector_store.add_chunks_batched(pending_chunks)
+            pending_files.clear()
+            pending_chunks.clear()
+
+        file_paths = list(self._iter_code_files(target_dir, extensions))
+
+        # 首次索引可整体重建，放宽 SQLite 持久化保证以加速写入；增量更新保持默认
+        bulk = self.vector_store.bulk_mode() if not replace_existing else nullcontext()
+        with bulk:
+            for start in range(0, len(file_paths), _READ_WINDOW):
+                window = file_paths[start : start + _READ_WINDOW]
+                results = await asyncio.gather(
+                    *(asyncio.to_thread(self._chunk_file, path) for path in window)
+                )
+                for file_path, chunks in zip(window, results):
+                    if not chunks:
+                        continue
+                    # 同一文件的代码块总在同一次 flush 中写入，删除旧数据时不会误删
+                    indexed_files += 1
+                    pending_files.append(file_path)
+                    pending_chunks.extend(chunks)
+                    if len(pending_chunks) >= _FLUSH_CHUNKS:
+                        await flush()
+
+            if pending_chunks:
+                await flush()
 
         return indexed_files
 
+    def _iter_code_files(self, root: str, extensions: set[str]) -> Iterator[str]:
+        """用 os.scandir 遍历目录，产出扩展名匹配的文件路径
+
+        忽略目录按名称在下钻前直接跳过；扩展名用 str.endswith 元组匹配，
+        无需逐个 splitext。与 os.walk 一致：不进入指向目录的符号链接，
+        无法读取的目录静默跳过。
+        """
+        suffixes = tuple(extensions)
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if name not in self.IGNORE_DIRS and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif name.lower().endswith(suffixes):
+                    yield entry.path
+            # 逆序入栈，按目录列举顺序下钻
+            stack.extend(reversed(subdirs))
+
     async def search(
         self,
         query: str,
@@ -202,21 +280,16 @@ class SemanticSearch:
 
         # Python 函数和类
         if ext == ".py":
-            # 匹配函数定义
-            func_pattern = r"^(async\s+)?def\s+(\w+)\s*\("
-            class_pattern = r"^class\s+(\w+)"
-
             current_block = None
             current_start = 0
 
             for i, line in enumerate(lines):
                 stripped = line.lstrip()
 
-                # 检查函数定义
-                func_match = re.match(func_pattern, stripped)
-                class_match = re.match(class_pattern, stripped)
+                # 检查函数或类定义 (单次正则匹配)
+                match = _PY_DEF_RE.match(stripped)
 
-                if func_match or class_match:
+                if match:
                     # 保存之前的块
                     if current_block and i - current_start > 2:
                         chunk_content = "\n".join(lines[current_start:i])
@@ -234,7 +307,7 @@ class SemanticSearch:
 
                     # 开始新块
                     current_start = i
-                    current_block = "function" if func_match else "class"
+                    current_block = "class" if match.group("cls") else "function"
 
         return chunks
 
@@ -5,10 +5,13 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 try:
     import chromadb
@@ -20,6 +23,21 @@ except ImportError:
 
 from .embeddings import EmbeddingProvider
 
+logger = logging.getLogger(__name__)
+
+# 单次 collection.add / delete 的条目数 (ChromaDB 推荐每批 50~250 条)
+DEFAULT_BATCH_SIZE = 200
+
+# 批量写入时同时进行的嵌入请求数
+DEFAULT_EMBED_CONCURRENCY = 8
+
+# 批量导入期间使用的 SQLite pragma：关闭 fsync、日志与临时表放在内存
+_BULK_PRAGMAS = (
+    ("synchronous", "OFF"),
+    ("journal_mode", "MEMORY"),
+    ("temp_store", "MEMORY"),
+)
+
 
 @dataclass
 class CodeChunk:
@@ -84,12 +102,14 @@ class CodeVectorStore:
             return
 
         # 生成嵌入
-        texts = [chunk.content for chunk in chunks]
-        embeddings = await self.embedding_provider.embed_texts(texts)
+        embeddings = await self.embedding_provider.embed_texts([c.content for c in chunks])
+        self._add_embedded(chunks, embeddings)
 
+    def _add_embedded(self, chunks: list[CodeChunk], embeddings: list[list[float]]) -> None:
+        """将已生成嵌入的代码块写入集合"""
         # 准备数据
         ids = [chunk.id for chunk in chunks]
-        documents = texts
+        documents = [chunk.content for chunk in chunks]
         metadatas = [
             {
                 "file_path": chunk.file_path,
@@ -109,6 +129,29 @@ class CodeVectorStore:
             metadatas=metadatas,
         )
 
+    async def add_chunks_batched(
+        self,
+        chunks: list[CodeChunk],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_EMBED_CONCURRENCY,
+    ) -> None:
+        """分批添加代码块，每批一次嵌入请求和一次 collection.add
+
+        各批的嵌入请求最多 max_concurrency 个并发进行，写入集合仍按顺序逐批执行。
+        """
+        batches = [
+            chunks[start : start + batch_size] for start in range(0, len(chunks), batch_size)
+        ]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def embed(batch: list[CodeChunk]) -> list[list[float]]:
+            async with semaphore:
+                return await self.embedding_provider.embed_texts([c.content for c in batch])
+
+        embeddings = await asyncio.gather(*(embed(batch) for batch in batches))
+        for batch, batch_embeddings in zip(batches, embeddings):
+            self._add_embedded(batch, batch_embeddings)
+
     async def search(
         self,
         query: str,
@@ -162,11 +205,53 @@ class CodeVectorStore:
         if results["ids"]:
             self.collection.delete(ids=results["ids"])
 
+    async def delete_by_files(
+        self, file_paths: list[str], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        """批量删除多个文件的所有代码块"""
+        for start in range(0, len(file_paths), batch_size):
+            batch = file_paths[start : start + batch_size]
+            self.collection.delete(where={"file_path": {"$in": batch}})
+
     async def update_file(self, file_path: str, chunks: list[CodeChunk]) -> None:
         """更新文件的代码块（先删除再添加）"""
         await self.delete_by_file(file_path)
         await self.add_chunks(chunks)
 
+    @contextmanager
+    def bulk_mode(self) -> Iterator[None]:
+        """批量导入模式：临时放宽底层 SQLite 的持久化保证，退出时恢复
+
+        期间进程崩溃或断电可能损坏索引，只应用于可以整体重建的首次索引，
+        不要用于增量更新。拿不到底层连接 (ChromaDB 内部结构随版本变化) 时
+        不做任何改动。
+        """
+        conn = self._sqlite_connection()
+        previous: list[tuple[str, Any]] = []
+        if conn is not None:
+            try:
+                for name, value in _BULK_PRAGMAS:
+                    previous.append((name, conn.execute(f"PRAGMA {name}").fetchone()[0]))
+                    conn.execute(f"PRAGMA {name}={value}")
+            except Exception:
+                logger.debug("无法切换 ChromaDB 批量导入 pragma", exc_info=True)
+        try:
+            yield
+        finally:
+            for name, value in reversed(previous):
+                try:
+                    conn.execute(f"PRAGMA {name}={value}")
+                except Exception:
+                    logger.debug("无法恢复 ChromaDB pragma %s", name, exc_info=True)
+
+    def _sqlite_connection(self) -> Optional[Any]:
+        """尽力获取 ChromaDB 系统库的 SQLite 连接 (内部 API)"""
+        server = getattr(self.client, "_server", self.client)
+        try:
+            return server._sysdb._conn_pool.connect()
+        except Exception:
+            return None
+
     def count(self) -> int:
         """获取存储的代码块数量"""
         return self.collection.count()
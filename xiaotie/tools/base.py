@@ -5,7 +5,7 @@ from __future__ import annotations
 import asyncio
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, ClassVar, Dict, List, Optional, Type
 
 from ..schema import ToolResult
 
@@ -13,6 +13,15 @@ from ..schema import ToolResult
 class Tool(ABC):
     """工具抽象基类"""
 
+    # 插件导入期间临时设置的收集列表，按定义顺序登记新定义的子类；
+    # 平时为 None，不持有任何类引用
+    _collector: ClassVar[Optional[List[Type[Tool]]]] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if Tool._collector is not None:
+            Tool._collector.append(cls)
+
     def __init__(self):
         self.execution_stats = {
             "call_count": 0,
@@ -152,13 +152,14 @@ class SemanticSearchTool(Tool):
     async def _init_search_engine(self) -> None:
         """初始化搜索引擎"""
         from ..search import SemanticSearch
-        from ..search.embeddings import DummyEmbeddings, OpenAIEmbeddings
+        from ..search.embeddings import DEFAULT_CACHE_DIR, DummyEmbeddings, OpenAIEmbeddings
 
         # 选择嵌入提供者
         if self.api_key:
             embedding_provider = OpenAIEmbeddings(
                 api_key=self.api_key,
                 api_base=self.api_base,
+                cache_dir=DEFAULT_CACHE_DIR,
             )
         else:
             # 如果没有 API key，使用 DummyEmbeddings（基于哈希）